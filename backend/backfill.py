@@ -0,0 +1,199 @@
+"""
+Script to fill derived data of existing photos.
+
+Examples:
+    python backfill.py renditions
+    python backfill.py renditions --all --workers 8
+    python backfill.py hashes
+    python backfill.py metadata --dates
+"""
+import argparse
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from database import SessionLocal
+from models.photo_models import Photo
+from services import photo_service, rendition_service
+from utils.exif_reader import EXIFTOOL_BATCH_SIZE, get_images_metadata
+from utils.file_storage import hash_file
+from utils.renditions import generate_renditions
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Photos whose paths are stored per commit
+BATCH_SIZE = 50
+
+def _render(photo):
+    """Generate the renditions of one (id, file_path) row; errors are returned, not raised."""
+    photo_id, file_path = photo
+    try:
+        return photo_id, generate_renditions(file_path), None
+    except Exception as e:
+        return photo_id, None, e
+
+def backfill_renditions(regenerate: bool = False, workers: int = os.cpu_count() or 1) -> int:
+    """
+    Generate renditions for existing photos.
+
+    Images are encoded in worker threads (Pillow releases the GIL while
+    decoding and encoding); the paths are stored in batches.
+
+    Args:
+        regenerate: Also regenerate photos that already have renditions
+        workers: Number of images processed in parallel
+
+    Returns:
+        Number of photos whose renditions were generated
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Photo.id, Photo.file_path).filter(Photo.file_path.isnot(None))
+        if not regenerate:
+            query = query.filter(Photo.renditions.is_(None))
+        photos = [tuple(row) for row in query.order_by(Photo.id).all()]
+        logger.info(f"Renditsioonid luuakse {len(photos)} fotole")
+
+        done = failed = 0
+        batch = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for photo_id, renditions, error in executor.map(_render, photos):
+                if error is not None:
+                    failed += 1
+                    logger.warning(f"Foto {photo_id} renditsioonide loomine ebaõnnestus: {error}")
+                    continue
+                batch[photo_id] = renditions
+                if len(batch) >= BATCH_SIZE:
+                    rendition_service.store_renditions(db, batch)
+                    done += len(batch)
+                    batch = {}
+                    logger.info(f"Töödeldud {done}/{len(photos)}")
+        rendition_service.store_renditions(db, batch)
+        done += len(batch)
+    finally:
+        db.close()
+    logger.info(f"Renditsioonid loodud {done} fotole, ebaõnnestus {failed}")
+    return done
+
+def _hash(photo):
+    """SHA-256 of one (id, file_path) row's file; errors are returned, not raised."""
+    photo_id, file_path = photo
+    try:
+        return photo_id, hash_file(file_path), None
+    except Exception as e:
+        return photo_id, None, e
+
+def backfill_hashes(workers: int = os.cpu_count() or 1) -> int:
+    """
+    Compute content hashes for photos stored before content addressing.
+
+    Files are not moved. Photos whose file duplicates an already hashed
+    photo keep a null hash (the hash is unique) and are reported, so the
+    duplicates can be reviewed and deleted.
+
+    Args:
+        workers: Number of files hashed in parallel
+
+    Returns:
+        Number of photos whose hash was stored
+    """
+    db = SessionLocal()
+    try:
+        known = {value for (value,) in db.query(Photo.content_hash).filter(Photo.content_hash.isnot(None))}
+        photos = [tuple(row) for row in db.query(Photo.id, Photo.file_path)
+                  .filter(Photo.content_hash.is_(None), Photo.file_path.isnot(None)).order_by(Photo.id)]
+        logger.info(f"Räsi arvutatakse {len(photos)} fotole")
+
+        done = duplicates = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for photo_id, content_hash, error in executor.map(_hash, photos):
+                if error is not None:
+                    failed += 1
+                    logger.warning(f"Foto {photo_id} räsi arvutamine ebaõnnestus: {error}")
+                    continue
+                if content_hash in known:
+                    duplicates += 1
+                    logger.warning(f"Foto {photo_id} fail on teise foto duplikaat (räsi {content_hash})")
+                    continue
+                known.add(content_hash)
+                db.query(Photo).filter(Photo.id == photo_id).update(
+                    {Photo.content_hash: content_hash}, synchronize_session=False
+                )
+                done += 1
+                if done % BATCH_SIZE == 0:
+                    db.commit()
+        db.commit()
+    finally:
+        db.close()
+    logger.info(f"Räsi salvestatud {done} fotole, duplikaate {duplicates}, ebaõnnestus {failed}")
+    return done
+
+def backfill_metadata(reread: bool = False, replace_dates: bool = False) -> int:
+    """
+    Read EXIF metadata of existing photos, e.g. of photos uploaded while
+    exiftool was not installed.
+
+    Files are read in batches with get_images_metadata, which runs several
+    files per exiftool command on all processes of the exiftool pool.
+
+    Args:
+        reread: Also read photos that already have GPS or camera information
+        replace_dates: Replace dates with the EXIF capture dates
+
+    Returns:
+        Number of photos that were changed
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Photo.id, Photo.file_path).filter(Photo.file_path.isnot(None))
+        if not reread:
+            query = query.filter(Photo.gps_latitude.is_(None), Photo.camera_make.is_(None),
+                                 Photo.camera_model.is_(None))
+        photos = [tuple(row) for row in query.order_by(Photo.id).all()]
+        logger.info(f"Metaandmeid loetakse {len(photos)} fotole")
+
+        # Several exiftool commands per database batch keep all pool processes busy
+        batch_size = EXIFTOOL_BATCH_SIZE * 4
+        done = changed = 0
+        for start in range(0, len(photos), batch_size):
+            batch = photos[start:start + batch_size]
+            metadata_by_path = get_images_metadata([file_path for _, file_path in batch])
+            changed += photo_service.fill_photo_metadata(
+                db, {photo_id: metadata_by_path[file_path] for photo_id, file_path in batch
+                     if metadata_by_path.get(file_path)},
+                replace_dates=replace_dates
+            )
+            done += len(batch)
+            logger.info(f"Töödeldud {done}/{len(photos)}")
+    finally:
+        db.close()
+    logger.info(f"Metaandmed uuendatud {changed} fotol")
+    return changed
+
+def main():
+    parser = argparse.ArgumentParser(description="Olemasolevate fotode tuletatud andmete täitmine")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    renditions_parser = subparsers.add_parser("renditions", help="Loo fotodele eelvaated (256/1024/2048 px, WebP ja JPEG)")
+    renditions_parser.add_argument("--all", action="store_true", help="Loo uuesti ka fotodele, millel on eelvaated juba olemas")
+    renditions_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Paralleelselt töödeldavate piltide arv")
+
+    hashes_parser = subparsers.add_parser("hashes", help="Arvuta varem salvestatud failide sisu räsi (SHA-256)")
+    hashes_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Paralleelselt töödeldavate failide arv")
+
+    metadata_parser = subparsers.add_parser("metadata", help="Loe fotode EXIF metaandmed (GPS, kaamera) uuesti failidest")
+    metadata_parser.add_argument("--all", action="store_true", help="Loe ka fotod, millel on GPS või kaamera andmed juba olemas")
+    metadata_parser.add_argument("--dates", action="store_true", help="Asenda kuupäevad EXIF pildistamise ajaga")
+    args = parser.parse_args()
+
+    if args.command == "renditions":
+        backfill_renditions(regenerate=args.all, workers=args.workers)
+    elif args.command == "hashes":
+        backfill_hashes(workers=args.workers)
+    elif args.command == "metadata":
+        backfill_metadata(reread=args.all, replace_dates=args.dates)
+
+if __name__ == "__main__":
+    main()
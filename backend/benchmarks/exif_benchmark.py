@@ -0,0 +1,156 @@
+"""
+Benchmark and conformance check of the in-process EXIF header parser.
+Reads every file of a corpus with the header parser and with exiftool (the
+pooled stay_open processes, and one exiftool process per file as before the
+pool), checks that both give the same normalized metadata and reports the
+time per file. Without --corpus a synthetic corpus of JPEG, TIFF and HEIF
+files with varied EXIF, GPS and camera tags is generated with Pillow.
+
+Usage (from the backend directory):
+    python -m benchmarks.exif_benchmark --files 200 --repeat 5
+    python -m benchmarks.exif_benchmark --corpus ~/Pildid/2024
+"""
+import argparse
+import json
+import logging
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from fractions import Fraction
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Add parent directory to Python path for imports to work
+sys.path.append(str(Path(__file__).parent.parent))
+
+from PIL import Image
+
+from utils import exif_reader
+from utils.exif_parser import parse_header
+
+def _exif(index: int) -> Image.Exif:
+    """EXIF block varying hemispheres, precision and missing tags by index."""
+    exif = Image.Exif()
+    if index % 7:
+        exif[0x010F] = ["Canon", "NIKON CORPORATION", "Apple", "SONY "][index % 4]
+        exif[0x0110] = f"Model {index % 13}"
+    exif[0x0132] = f"2024:{index % 12 + 1:02d}:15 10:00:00"
+    exif_ifd = exif.get_ifd(0x8769)
+    if index % 5:
+        exif_ifd[0x9003] = f"2023:{index % 12 + 1:02d}:{index % 28 + 1:02d} {index % 24:02d}:{index % 60:02d}:07"
+    if index % 3 == 0:
+        exif_ifd[0x9011] = ["+03:00", "-05:00", "+05:30"][index % 9 // 3]
+    if index % 4:
+        gps = exif.get_ifd(0x8825)
+        gps[1], gps[3] = ("N", "E") if index % 2 else ("S", "W")
+        gps[2] = (Fraction(index % 90), Fraction(index * 7 % 60), Fraction(index * 1234 % 6000, 100))
+        gps[4] = (Fraction(index * 3 % 180), Fraction(index * 11 % 60), Fraction(index * 977 % 60000, 1000))
+        if index % 8 > 3:
+            gps[6] = Fraction(index * 37 % 2000, 10)
+    return exif
+
+def _box(box_type: bytes, payload: bytes, version: int = None) -> bytes:
+    if version is not None:
+        payload = bytes([version, 0, 0, 0]) + payload
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+def _write_heif(path: str, exif: bytes) -> None:
+    """Minimal HEIF container with an Exif item (no decodable image; enough for metadata readers)."""
+    item = struct.pack(">I", 6) + exif
+    ftyp = _box(b"ftyp", b"heic\0\0\0\0mif1heic")
+    infe = _box(b"infe", struct.pack(">HH", 1, 0) + b"Exif\0", version=2)
+    iinf = _box(b"iinf", struct.pack(">H", 1) + infe, version=0)
+
+    def meta(item_offset: int) -> bytes:
+        iloc = _box(b"iloc", bytes([0x44, 0x00]) + struct.pack(">HHHHII", 1, 1, 0, 1, item_offset, len(item)),
+                    version=0)
+        return _box(b"meta", _box(b"hdlr", b"\0" * 4 + b"pict" + b"\0" * 13, version=0) + iinf + iloc, version=0)
+
+    item_offset = len(ftyp) + len(meta(0)) + 8
+    with open(path, "wb") as f:
+        f.write(ftyp + meta(item_offset) + _box(b"mdat", item))
+
+def build_corpus(directory: str, files: int) -> List[str]:
+    """Synthetic corpus: mostly JPEG, every tenth file TIFF and every tenth HEIF."""
+    paths = []
+    for index in range(files):
+        exif = _exif(index).tobytes()
+        if index % 10 == 3:
+            path = os.path.join(directory, f"{index:05d}.tif")
+            Image.new("RGB", (64, 48), (index % 256, 120, 40)).save(path, "TIFF", exif=exif)
+        elif index % 10 == 7:
+            path = os.path.join(directory, f"{index:05d}.heic")
+            _write_heif(path, exif)
+        else:
+            path = os.path.join(directory, f"{index:05d}.jpg")
+            Image.new("RGB", (640, 480), (index % 256, 120, 40)).save(path, "JPEG", exif=exif, quality=85)
+        paths.append(path)
+    return paths
+
+def native(path: str) -> Dict:
+    metadata = parse_header(path)
+    return None if metadata is None else exif_reader._normalize_metadata(metadata)
+
+def pooled_exiftool(path: str) -> Dict:
+    return exif_reader._normalize_metadata(exif_reader.run_exiftool(path) or {})
+
+def exiftool_process(path: str) -> Dict:
+    """One exiftool process per file, as run_exiftool did before the pool."""
+    result = subprocess.run(["exiftool", "-json", "-a", "-u", "-g1", path], capture_output=True, text=True)
+    return exif_reader._normalize_metadata(json.loads(result.stdout)[0] if result.stdout else {})
+
+def measure(function: Callable[[str], Dict], paths: List[str], repeat: int) -> float:
+    """Mean milliseconds per file."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            function(path)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(paths))
+
+def main():
+    parser = argparse.ArgumentParser(description="EXIF päiste lugeja kiiruse ja exiftool'iga kooskõla võrdlus")
+    parser.add_argument("--corpus", help="Piltide kaust (vaikimisi luuakse sünteetiline kogum)")
+    parser.add_argument("--files", type=int, default=200, help="Sünteetilise kogumi failide arv")
+    parser.add_argument("--repeat", type=int, default=5, help="Mõõtmiste kordused")
+    args = parser.parse_args()
+    logging.getLogger("utils.exif_reader").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.corpus:
+            paths = sorted(str(path) for path in Path(args.corpus).rglob("*") if path.is_file())
+        else:
+            paths = build_corpus(directory, args.files)
+
+        parsed = {path: native(path) for path in paths}
+        supported = [path for path in paths if parsed[path] is not None]
+        print(f"{len(paths)} faili, päisest loetav {len(supported)} (ülejäänud loetakse exiftool'iga)")
+        if not supported:
+            return
+
+        mismatches = 0
+        if exif_reader.EXIFTOOL_AVAILABLE:
+            for path in supported:
+                expected = pooled_exiftool(path)
+                if parsed[path] != expected:
+                    mismatches += 1
+                    print(f"ERINEB {path}\n  päis:     {parsed[path]}\n  exiftool: {expected}")
+            print(f"Kooskõla: {len(supported) - mismatches}/{len(supported)} faili sama tulemusega")
+
+        native_ms = measure(native, supported, args.repeat)
+        print(f"{'meetod':<34} {'ms/fail':>10} {'kiirendus':>10}")
+        print(f"{'päise lugeja':<34} {native_ms:>10.3f} {'':>10}")
+        if exif_reader.EXIFTOOL_AVAILABLE:
+            for name, function, repeat in (("exiftool, püsivad protsessid", pooled_exiftool, args.repeat),
+                                           ("exiftool, protsess faili kohta", exiftool_process, 1)):
+                ms = measure(function, supported, repeat)
+                print(f"{name:<34} {ms:>10.3f} {ms / native_ms:>9.0f}x")
+        else:
+            print("exiftool puudub: võrdlus ja kooskõla kontroll jäeti vahele")
+        if mismatches:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
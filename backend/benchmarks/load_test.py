@@ -0,0 +1,89 @@
+"""
+Load test for the HTTP API.
+Sends the same GET requests at increasing concurrency and reports throughput
+and latency per level. When the routes under test do not block the event
+loop, throughput grows with concurrency until the database or CPU is
+saturated; a route that blocks the loop stays at its single-request rate.
+
+Usage (from the backend directory, with the server running):
+    python -m benchmarks.load_test --url http://localhost:8001 \\
+        --path "/photos/?limit=20" --path "/photos/1" --concurrency 1,4,16,64
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Sequence
+
+import httpx
+
+async def run_level(client: httpx.AsyncClient, paths: Sequence[str], concurrency: int,
+                    requests: int) -> dict:
+    """
+    Send `requests` GET requests with `concurrency` workers.
+
+    Args:
+        client: HTTP client with the base URL (or an ASGI transport) set
+        paths: Request paths, used in turn
+        concurrency: Number of requests in flight at the same time
+        requests: Total number of requests
+
+    Returns:
+        Throughput, latency percentiles in milliseconds and error count
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.get(paths[i % len(paths)])
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        "errors": errors,
+    }
+
+async def run(url: str, paths: Sequence[str], levels: Sequence[int], requests: int) -> List[dict]:
+    """Run every concurrency level against the server at `url`."""
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        # Soojendus: ühendused ja vahemälud enne mõõtmist
+        await run_level(client, paths, min(levels), min(requests, 20))
+        return [await run_level(client, paths, level, requests) for level in levels]
+
+def main():
+    parser = argparse.ArgumentParser(description="API koormustest erineva samaaegsusega")
+    parser.add_argument("--url", default="http://localhost:8001", help="Serveri aadress")
+    parser.add_argument("--path", action="append", help="Päringu tee (võib korrata), vaikimisi /photos/?limit=20")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Samaaegsuse tasemed komaga eraldatult")
+    parser.add_argument("--requests", type=int, default=500, help="Päringute arv taseme kohta")
+    args = parser.parse_args()
+
+    paths = args.path or ["/photos/?limit=20"]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = asyncio.run(run(args.url, paths, levels, args.requests))
+
+    print(f"{'samaaegsus':>10} {'päringut/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'vigu':>5}")
+    for result in results:
+        print(f"{result['concurrency']:>10} {result['requests_per_second']:>11.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['errors']:>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark for photo text search.
+Compares the legacy ILIKE join path with the trigram-indexed q= search.
+
+Usage (from the backend directory, against a populated database):
+    python -m benchmarks.search_benchmark --terms tallinn taraxacum võilill --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to Python path for imports to work
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import or_
+
+from database import SessionLocal
+from models.photo_models import Photo
+from models.species_models import Species
+from models.relation_models import PhotoSpeciesRelation
+from services import photo_service, query_cache
+
+def legacy_ilike_search(db, term: str, limit: int):
+    """The pre-trigram query: join species and ILIKE every column, then DISTINCT ON."""
+    pattern = f"%{term}%"
+    query = (
+        db.query(Photo)
+        .outerjoin(PhotoSpeciesRelation)
+        .outerjoin(Species)
+        .filter(
+            or_(
+                Photo.location.ilike(pattern),
+                Species.scientific_name.ilike(pattern),
+                Species.common_name.ilike(pattern)
+            )
+        )
+        .order_by(Photo.id.desc())
+        .distinct(Photo.id)
+    )
+    return query.limit(limit).all()
+
+def trigram_search(db, term: str, limit: int):
+    """The q= search path used by GET /photos, without the query cache."""
+    return photo_service.get_photos(db, q=term, limit=limit)
+
+def time_it(func, db, term: str, limit: int, repeat: int):
+    """Run a search repeatedly and return (median ms, result count)."""
+    timings = []
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(func(db, term, limit))
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), count
+
+def main():
+    parser = argparse.ArgumentParser(description="Fotode tekstiotsingu jõudlustest")
+    parser.add_argument("--terms", nargs="+", default=["tallinn", "taraxacum", "võilill"])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # Repeated searches would otherwise be answered from the query cache
+    query_cache.QUERY_CACHE_ENABLED = False
+    db = SessionLocal()
+    try:
+        photo_count = db.query(Photo).count()
+        print(f"Fotosid andmebaasis: {photo_count}")
+        print(f"{'otsingusõna':<20} {'ILIKE ms':>10} {'tulemusi':>9} {'q= ms':>10} {'tulemusi':>9}")
+        for term in args.terms:
+            legacy_ms, legacy_count = time_it(legacy_ilike_search, db, term, args.limit, args.repeat)
+            trigram_ms, trigram_count = time_it(trigram_search, db, term, args.limit, args.repeat)
+            print(f"{term:<20} {legacy_ms:>10.2f} {legacy_count:>9} {trigram_ms:>10.2f} {trigram_count:>9}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
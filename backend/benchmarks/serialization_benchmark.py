@@ -0,0 +1,138 @@
+"""
+Benchmark for JSON serialization of photo list responses.
+Measures CPU time per request for a 500-item photo page through the FastAPI
+stack with the old untyped responses, the validated typed response model and
+the current direct orjson response, with and without compression. Needs no
+database; the page is synthetic.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization_benchmark --items 500 --requests 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add parent directory to Python path for imports to work
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI
+from fastapi.datastructures import Default
+from fastapi.responses import JSONResponse
+
+from models.photo_models import PhotoListItem
+from utils.compression import CompressionMiddleware, brotli
+from utils.responses import FastJSONResponse, orjson
+
+def build_page(items: int) -> List[Dict[str, Any]]:
+    """A photo page shaped like photo_service.get_photos output."""
+    start = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": 100000 - i,
+            "file_path": f"/file_storage/{i:08x}-5f1c-4d7e-9a2b-IMG_{i:04d}.jpg",
+            "date": (start + timedelta(hours=i)).strftime("%Y-%m-%d"),
+            "taken_at": start + timedelta(hours=i),
+            "location": f"{59.4 + i * 0.001:.6f}, {24.7 + i * 0.001:.6f}",
+            "species": [
+                {"id": 1 + i % 50, "scientific_name": "Taraxacum officinale",
+                 "common_name": "Common dandelion", "family": "Asteraceae"},
+                {"id": 51 + i % 50, "scientific_name": "Betula pendula",
+                 "common_name": "Silver birch", "family": "Betulaceae"},
+            ]
+        }
+        for i in range(items)
+    ]
+
+def build_app(page: List[Dict[str, Any]]) -> FastAPI:
+    """Application with one route per serialization variant."""
+    app = FastAPI(default_response_class=Default(FastJSONResponse))
+
+    @app.get("/untyped", response_class=JSONResponse)
+    async def untyped():
+        # Previous GET /photos: no response model, jsonable_encoder + json.dumps
+        return page
+
+    @app.get("/dict", response_model=List[Dict[str, Any]])
+    async def dict_model():
+        # Previous browse route: response_model=List[Dict[str, Any]]
+        return page
+
+    @app.get("/typed", response_model=List[PhotoListItem])
+    async def typed():
+        return page
+
+    @app.get("/orjson")
+    async def untyped_orjson():
+        return page
+
+    @app.get("/direct", response_model=List[PhotoListItem])
+    async def direct():
+        # Current GET /photos: response_model for the schema only, the page
+        # is returned as FastJSONResponse and encoded with orjson directly
+        return FastJSONResponse(page)
+
+    return app
+
+async def _request(app, path: str, accept_encoding: str) -> int:
+    """Send one GET request straight to the ASGI app and return the body size."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"accept-encoding", accept_encoding.encode())],
+        "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return size
+
+async def measure(app, path: str, accept_encoding: str, requests: int):
+    """CPU milliseconds per request and response size."""
+    size = await _request(app, path, accept_encoding)
+    start = time.process_time()
+    for _ in range(requests):
+        await _request(app, path, accept_encoding)
+    return (time.process_time() - start) * 1000 / requests, size
+
+def main():
+    parser = argparse.ArgumentParser(description="Fotode nimekirja JSON serialiseerimise võrdlus")
+    parser.add_argument("--items", type=int, default=500, help="Fotode arv lehel")
+    parser.add_argument("--requests", type=int, default=200, help="Päringute arv variandi kohta")
+    args = parser.parse_args()
+
+    page = build_page(args.items)
+    app = build_app(page)
+    compressed_app = CompressionMiddleware(app, minimum_size=1024)
+
+    variants = [
+        ("untyped, json.dumps (before)", app, "/untyped", "identity"),
+        ("Dict[str, Any] model (before)", app, "/dict", "identity"),
+        ("untyped, orjson", app, "/orjson", "identity"),
+        ("typed model, validated", app, "/typed", "identity"),
+        ("direct orjson response (after)", app, "/direct", "identity"),
+        ("direct orjson + gzip", compressed_app, "/direct", "gzip"),
+    ]
+    if brotli is not None:
+        variants.append(("direct orjson + brotli", compressed_app, "/direct", "br"))
+
+    print(f"{args.items} fotot lehel, {args.requests} päringut variandi kohta, "
+          f"orjson {'olemas' if orjson else 'puudub'}, brotli {'olemas' if brotli else 'puudub'}")
+    print(f"{'variant':<32} {'CPU ms/päring':>14} {'baite':>10}")
+    for name, target, path, encoding in variants:
+        cpu_ms, size = asyncio.run(measure(target, path, encoding, args.requests))
+        print(f"{name:<32} {cpu_ms:>14.2f} {size:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -8,18 +8,23 @@ from pathlib import Path
 # Add parent directory to Python path for imports to work
 sys.path.append(str(Path(__file__).parent.parent))
 
+from sqlalchemy import text
 from database import engine, Base
 
 # Import all model classes to ensure they're registered with SQLAlchemy
 from models.photo_models import Photo
-from models.species_models import Species
+from models.species_models import Species, SpeciesStats
 from models.relation_models import PhotoSpeciesRelation
+from models.version_models import CollectionVersion
 from models.settings_models import AppSettings
 
 def create_tables():
     """
     Create all tables in the database.
     """
+    # Trigram search indexes need the pg_trgm extension
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully!")
 
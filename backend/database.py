@@ -2,11 +2,24 @@
 Database configuration for the application.
 Provides database connection settings and session management.
 """
+import itertools
 import os
 import sys
-from sqlalchemy import create_engine, MetaData
+import uuid
+from sqlalchemy import create_engine, make_url, MetaData
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from starlette.requests import Request
+
+from utils.pool_metrics import TimedQueuePool, TimedAsyncQueuePool, TimedNullPool
+from utils.read_your_writes import ReadYourWrites
+
+# asyncpg is needed for the async session used by async routes
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
 
 # Try to import dotenv, but don't fail if it's not installed
 try:
@@ -30,23 +43,98 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "nature_photo_db")
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
+# Connection pool settings, per engine and per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Sekundid vaba ühenduse ootamiseks
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Sekundid, pärast mida ühendus uuendatakse
+# PgBouncer (transaction pooling): no pool in the application, no named prepared statements
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+# Optional read replicas, comma separated postgresql:// URLs
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+# After a write the same client reads from the primary for this many seconds;
+# should exceed the usual replication lag
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 # Log connection info in debug mode
 if DEBUG:
     print(f"Ühendun andmebaasiga: postgresql://{DB_USER}:******@{DB_HOST}:{DB_PORT}/{DB_NAME}")
     print(f"Keskkond: {os.getenv('ENVIRONMENT', 'pole määratud')}")
 
+def _pool_options(queue_pool_class) -> dict:
+    """Engine pool arguments from the DB_POOL_* settings."""
+    if DB_PGBOUNCER:
+        # PgBouncer hoiab ühendusi ise; rakenduse poolne pool ainult hoiaks neid kinni
+        return {"poolclass": TimedNullPool}
+    return {
+        "poolclass": queue_pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True  # Kontrolli ühendust enne kasutamist
+    }
+
 # Create engine with echo mode for debugging
 engine = create_engine(
     DATABASE_URL,
     echo=DEBUG,  # Logi SQL päringud, kui DEBUG=true
-    pool_pre_ping=True  # Kontrolli ühendust enne kasutamist
+    **_pool_options(TimedQueuePool)
 )
 
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Replica engines for read-only queries; sessions on them are marked with info["replica"]
+replica_engines = [
+    create_engine(url, echo=DEBUG, **_pool_options(TimedQueuePool))
+    for url in DB_REPLICA_URLS
+]
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, info={"replica": True})
+_next_replica = itertools.count()
+
+# Clients that wrote recently, whose reads stay on the primary
+read_your_writes = ReadYourWrites(DB_READ_YOUR_WRITES_SECONDS)
+
+# Async engine and session for async routes, so queries do not block the event loop
+if asyncpg is not None:
+    async_connect_args = {}
+    if DB_PGBOUNCER:
+        # Prepared statements do not survive PgBouncer switching server connections
+        async_connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__"
+        }
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=DEBUG,
+        connect_args=async_connect_args,
+        **_pool_options(TimedAsyncQueuePool)
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    async_replica_engines = [
+        create_async_engine(
+            make_url(url).set(drivername="postgresql+asyncpg"),
+            echo=DEBUG,
+            connect_args=async_connect_args,
+            **_pool_options(TimedAsyncQueuePool)
+        )
+        for url in DB_REPLICA_URLS
+    ]
+    AsyncReplicaSessionLocal = async_sessionmaker(
+        autoflush=False, expire_on_commit=False, info={"replica": True}
+    )
+else:
+    print("Warning: asyncpg not found. Async routes need it (pip install asyncpg).")
+    async_engine = None
+    AsyncSessionLocal = None
+    async_replica_engines = []
+    AsyncReplicaSessionLocal = None
+
 # For backwards compatibility with old code
 Base = declarative_base()
 
@@ -65,6 +153,60 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get async DB session
+async def get_async_db():
+    """
+    Dependency function that yields an async SQLAlchemy database session.
+    Services written for the sync Session run on it through run_sync.
+    Ensures the session is closed after use.
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Asünkroonne andmebaasiühendus vajab asyncpg paketti")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def ReadSessionLocal():
+    """
+    New session for read-only queries.
+    Uses the replicas in turn, or the primary if no replicas are configured.
+    """
+    if not replica_engines:
+        return SessionLocal()
+    return ReplicaSessionLocal(bind=replica_engines[next(_next_replica) % len(replica_engines)])
+
+def _reads_from_primary(request: Request) -> bool:
+    return not replica_engines or read_your_writes.is_recent_writer(request)
+
+# Dependency to get DB session for reads
+def get_read_db(request: Request):
+    """
+    Dependency function that yields a session for read-only routes.
+    Reads go to a replica, except for clients that wrote within the last
+    DB_READ_YOUR_WRITES_SECONDS, so they see their own changes.
+    Ensures the session is closed after use.
+    """
+    db = SessionLocal() if _reads_from_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency to get async DB session for reads
+async def get_async_read_db(request: Request):
+    """
+    Async counterpart of get_read_db.
+    Ensures the session is closed after use.
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Asünkroonne andmebaasiühendus vajab asyncpg paketti")
+    if _reads_from_primary(request):
+        db = AsyncSessionLocal()
+    else:
+        bind = async_replica_engines[next(_next_replica) % len(async_replica_engines)]
+        db = AsyncReplicaSessionLocal(bind=bind)
+    async with db:
+        yield db
+
 # Function to test database connection
 def test_connection():
     """Test database connection and return status."""
@@ -0,0 +1,71 @@
+"""
+Script to write a Parquet or Arrow snapshot of the photo catalog.
+
+Examples:
+    python export_snapshot.py photos.parquet
+    python export_snapshot.py changes.parquet --since-snapshot photos.parquet
+    python export_snapshot.py photos.arrow --format arrow
+"""
+import argparse
+import logging
+import sys
+
+from database import SessionLocal
+from services import export_service, columnar_export
+from utils.date_utils import parse_photo_date
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def export_snapshot(output: str, export_format: str = "parquet", since=None) -> int:
+    """
+    Write the catalog, or the photos changed since a snapshot, to a file.
+
+    Args:
+        output: Output file path
+        export_format: "parquet" or "arrow"
+        since: Optional snapshot time for a delta export
+
+    Returns:
+        Number of exported rows
+    """
+    snapshot_at = export_service.snapshot_time()
+    db = SessionLocal()
+    try:
+        batches = export_service.iter_row_batches(db, columnar_export.ROW_GROUP_SIZE, since)
+        rows = columnar_export.write_batches(output, batches, export_format, snapshot_at, since)
+    finally:
+        db.close()
+    logger.info(f"Eksporditud {rows} rida faili {output}, hetktõmmise aeg {snapshot_at.isoformat()}")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Fotokataloogi Parquet/Arrow eksport")
+    parser.add_argument("output", help="Väljundfail")
+    parser.add_argument("--format", choices=columnar_export.COLUMNAR_FORMATS, default=None,
+                        help="Vorming (vaikimisi faililaiendi järgi, muidu parquet)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--since", help="Ekspordi ainult pärast seda aega muutunud fotod (ISO aeg)")
+    group.add_argument("--since-snapshot", help="Ekspordi ainult pärast selle eelmise ekspordi faili loomist muutunud fotod")
+    args = parser.parse_args()
+
+    if not columnar_export.is_available():
+        logger.error("Parquet/Arrow eksport vajab pyarrow paketti: pip install pyarrow")
+        sys.exit(1)
+
+    export_format = args.format or ("arrow" if args.output.endswith(".arrow") else "parquet")
+    since = None
+    if args.since:
+        since = parse_photo_date(args.since)
+        if since is None:
+            parser.error(f"Vigane --since väärtus: {args.since}")
+    elif args.since_snapshot:
+        since = columnar_export.read_snapshot_time(args.since_snapshot)
+        if since is None:
+            parser.error(f"Failis {args.since_snapshot} pole hetktõmmise aega")
+
+    export_snapshot(args.output, export_format, since)
+
+if __name__ == "__main__":
+    main()
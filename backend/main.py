@@ -3,6 +3,7 @@ Looduspiltide andmebaasi peamine rakenduse moodul.
 Initsialiseerib FastAPI rakenduse ja lisab kõik marsruuterid.
 """
 from fastapi import FastAPI, Request
+from fastapi.datastructures import Default
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError, ResponseValidationError
 import uvicorn
@@ -19,13 +20,19 @@ logger = logging.getLogger(__name__)
 # Lisa ülemkataloog Pythoni otsingusüsteemi, et impordid töötaksid otse käivitatuna
 sys.path.append(str(Path(__file__).parent.parent))
 
-from routers import photo_routes, species_routes, relation_routes, plant_id_api, browse_routes, settings_routes
+from utils.responses import FastJSONResponse
+from utils.compression import CompressionMiddleware
+from utils.read_your_writes import ReadYourWritesMiddleware
+import database
+from routers import photo_routes, species_routes, relation_routes, plant_id_api, browse_routes, settings_routes, map_routes, facet_routes, photo_batch_routes, image_routes, admin_routes, export_routes
 
 # Loo FastAPI rakendus
 app = FastAPI(
     title="Looduspiltide Andmebaasi API",
     description="API looduspiltide ja liikide tuvastamise haldamiseks",
     version="0.1.0",
+    # Default() jätab tüübitud vastustele Pydanticu kiire JSON serialiseerimise
+    default_response_class=Default(FastJSONResponse),
 )
 
 # CORS seadistamine - lubame kõik päritolud arenduse ajal
@@ -40,6 +47,13 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Suurte JSON vastuste pakkimine (brotli või gzip vastavalt Accept-Encoding päisele)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Lugemiskoopiate korral loeb kirjutanud klient oma muudatusi veel mõnda aega põhiandmebaasist
+if database.replica_engines:
+    app.add_middleware(ReadYourWritesMiddleware, tracker=database.read_your_writes)
+
 # Erinditöötleja ResponseValidationError jaoks
 @app.exception_handler(ResponseValidationError)
 async def validation_exception_handler(request: Request, exc: ResponseValidationError):
@@ -62,12 +76,19 @@ async def general_exception_handler(request: Request, exc: Exception):
 
 # Lisa erinevate ressursside marsruuterid
 logger.info("Registreerin marsruuterid...")
+# /photos/clusters ja /photos/facets peavad olema registreeritud enne /photos/{photo_id} marsruuti
+app.include_router(map_routes.router)
+app.include_router(facet_routes.router)
+app.include_router(photo_batch_routes.router)
 app.include_router(photo_routes.router)
 app.include_router(species_routes.router)
 app.include_router(relation_routes.router)
 app.include_router(plant_id_api.router)
 app.include_router(browse_routes.router)
 app.include_router(settings_routes.router)
+app.include_router(export_routes.router)
+app.include_router(image_routes.router)
+app.include_router(admin_routes.router)
 logger.info("Kõik marsruuterid registreeritud!")
 
 # Lisa staatiliste failide teenindus piltide jaoks
@@ -8,9 +8,11 @@ from .base_models import Base
 
 # Then import specific models
 # Photo and species models
-from .photo_models import Photo
-from .species_models import Species
-from .relation_models import PhotoSpeciesRelation
+from .photo_models import Photo, PhotoListItem, PhotoDetail
+from .species_models import Species, SpeciesStats, SpeciesResponse
+from .relation_models import PhotoSpeciesRelation, RelationResponse
+from .version_models import CollectionVersion
+from .deletion_models import DeletedPhoto
 
 # Settings models - import after base models are loaded
 from .settings_models import AppSettings, AppSetting, AppSettingCreate, AppSettingUpdate, AppSettingResponse, AllSettingsResponse
\ No newline at end of file
@@ -0,0 +1,14 @@
+"""
+Deleted photo model definition for the application.
+Keeps the ID and deletion time of every deleted photo, so delta exports can
+tell consumers which photos to remove.
+"""
+from sqlalchemy import Column, Integer, DateTime, func
+from models.base_models import Base
+
+class DeletedPhoto(Base):
+    """Tombstone of a deleted photo."""
+    __tablename__ = "deleted_photos"
+
+    photo_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
@@ -2,7 +2,10 @@
 Photo model definition for the application.
 Represents photos stored in the database with their metadata.
 """
-from sqlalchemy import Column, Integer, String, Float
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, JSON, func
 from sqlalchemy.orm import relationship
 from models.base_models import Base
 
@@ -12,16 +15,82 @@ class Photo(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     file_path = Column(String, unique=True, index=True)
+    # SHA-256 of the file content; identical uploads are stored once
+    content_hash = Column(String(64), nullable=True)
     date = Column(String)
+    # Capture timestamp parsed from EXIF or the date string, used for date filters and ordering
+    taken_at = Column(DateTime(timezone=True), nullable=True)
     location = Column(String)
     
     # GPS coordinates
     gps_latitude = Column(Float, nullable=True)
     gps_longitude = Column(Float, nullable=True) 
     gps_altitude = Column(Float, nullable=True)
+    # Geohash of the coordinates for b-tree backed bounding box and radius queries
+    geohash = Column(String(12, collation="C"), nullable=True, index=True)
     
     # Camera information
     camera_make = Column(String, nullable=True)
     camera_model = Column(String, nullable=True)
 
-    species = relationship("PhotoSpeciesRelation", back_populates="photo")
\ No newline at end of file
+    # Downscaled copies by size and format, paths relative to the file storage
+    # (served under /static), e.g. {"256": {"webp": "renditions/<name>/256.webp", ...}}
+    renditions = Column(JSON, nullable=True)
+
+    # Last change time, used for ETags of the photo
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    species = relationship("PhotoSpeciesRelation", back_populates="photo")
+
+# Unique content hash: the same file is stored and cataloged once
+Index("ix_photos_content_hash", Photo.content_hash, unique=True)
+
+# Capture time index for date range filters and keyset pagination by date
+# (latest first, undated photos last)
+Index("ix_photos_taken_at_id", Photo.taken_at.desc().nullslast(), Photo.id.desc())
+
+# Month-of-year index for seasonal filters across years
+Index("ix_photos_taken_month", func.date_part("month", func.timezone("UTC", Photo.taken_at)))
+
+# Trigram index for location search (requires the pg_trgm extension)
+Index("ix_photos_location_trgm", Photo.location,
+      postgresql_using="gin", postgresql_ops={"location": "gin_trgm_ops"})
+
+
+# Pydantic response schemas
+class PhotoSpeciesSummary(BaseModel):
+    """Species shown with a photo in photo listings."""
+    id: int
+    scientific_name: Optional[str] = None
+    common_name: Optional[str] = None
+    family: Optional[str] = None
+
+class PhotoListItem(BaseModel):
+    """Photo in a photo listing."""
+    id: int
+    file_path: Optional[str] = None
+    date: Optional[str] = None
+    taken_at: Optional[datetime] = None
+    location: Optional[str] = None
+    renditions: Optional[Dict[str, Dict[str, str]]] = None
+    species: List[PhotoSpeciesSummary] = []
+
+class PhotoSpeciesDetail(PhotoSpeciesSummary):
+    """Species shown with a photo in the photo detail view."""
+    relation_category: Optional[str] = None
+    relation_id: int
+
+class PhotoDetail(BaseModel):
+    """Photo with metadata and identified species."""
+    id: int
+    file_path: Optional[str] = None
+    date: Optional[str] = None
+    taken_at: Optional[datetime] = None
+    location: Optional[str] = None
+    gps_latitude: Optional[float] = None
+    gps_longitude: Optional[float] = None
+    gps_altitude: Optional[float] = None
+    camera_make: Optional[str] = None
+    camera_model: Optional[str] = None
+    renditions: Optional[Dict[str, Dict[str, str]]] = None
+    species: List[PhotoSpeciesDetail] = []
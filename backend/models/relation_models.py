@@ -2,7 +2,10 @@
 Relation model definition for the application.
 Represents the many-to-many relationship between photos and species.
 """
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
 from sqlalchemy.orm import relationship
 from models.base_models import Base
 
@@ -11,9 +14,22 @@ class PhotoSpeciesRelation(Base):
     __tablename__ = "photo_species_relation"
 
     id = Column(Integer, primary_key=True, index=True)
-    photo_id = Column(Integer, ForeignKey("photos.id"))
-    species_id = Column(Integer, ForeignKey("species.id"))
+    photo_id = Column(Integer, ForeignKey("photos.id"), index=True)
+    species_id = Column(Integer, ForeignKey("species.id"), index=True)
     category = Column(String)
+    # Last change time, used for ETags of the related photo
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
     photo = relationship("Photo", back_populates="species")
-    species = relationship("Species", back_populates="photos")
\ No newline at end of file
+    species = relationship("Species", back_populates="photos")
+
+# Pydantic response schemas
+class RelationResponse(BaseModel):
+    """Photo-species relation as returned by the relation endpoints."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    photo_id: Optional[int] = None
+    species_id: Optional[int] = None
+    category: Optional[str] = None
+    updated_at: Optional[datetime] = None
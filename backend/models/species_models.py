@@ -2,7 +2,10 @@
 Species model definition for the application.
 Represents species entries stored in the database.
 """
-from sqlalchemy import Column, Integer, String
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from models.base_models import Base
 
@@ -16,5 +19,44 @@ class Species(Base):
     family = Column(String)
     # Estonian localized common name
     estonian_name = Column(String, nullable=True)
+    # Last change time, used for ETags of the species and photos showing it
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
-    photos = relationship("PhotoSpeciesRelation", back_populates="species")
\ No newline at end of file
+    photos = relationship("PhotoSpeciesRelation", back_populates="species")
+
+# Trigram indexes for species name search (requires the pg_trgm extension)
+for _name_column in ("scientific_name", "common_name", "estonian_name"):
+    Index(f"ix_species_{_name_column}_trgm", getattr(Species, _name_column),
+          postgresql_using="gin", postgresql_ops={_name_column: "gin_trgm_ops"})
+
+class SpeciesStats(Base):
+    """
+    Photo statistics of a species, maintained by species_stats_service.
+    Lets species listings sort and filter by photo count and observation
+    time without reading photo_species_relation.
+    """
+    __tablename__ = "species_stats"
+
+    species_id = Column(Integer, ForeignKey("species.id", ondelete="CASCADE"), primary_key=True)
+    photo_count = Column(Integer, nullable=False, default=0, index=True)
+    first_observed_at = Column(DateTime(timezone=True), nullable=True)
+    last_observed_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # Representative photo shown in species listings
+    cover_photo_id = Column(Integer, ForeignKey("photos.id", ondelete="SET NULL"), nullable=True)
+
+
+# Pydantic response schemas
+class SpeciesResponse(BaseModel):
+    """Species as returned by the species endpoints."""
+    id: int
+    scientific_name: Optional[str] = None
+    common_name: Optional[str] = None
+    family: Optional[str] = None
+    estonian_name: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    # Statistics from species_stats
+    photo_count: Optional[int] = None
+    first_observed_at: Optional[datetime] = None
+    last_observed_at: Optional[datetime] = None
+    cover_photo_id: Optional[int] = None
+    cover_file_path: Optional[str] = None
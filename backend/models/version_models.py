@@ -0,0 +1,14 @@
+"""
+Collection version model definition for the application.
+Holds a counter per collection (e.g. "photos", "species") that every write
+to the collection increments, so list responses can be validated with ETags.
+"""
+from sqlalchemy import Column, String, BigInteger
+from models.base_models import Base
+
+class CollectionVersion(Base):
+    """Version counter of a collection of rows."""
+    __tablename__ = "collection_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,56 @@
+"""
+Halduse API marsruuter.
+Pakub rakenduse sisemise oleku (nt vahemälude, andmebaasiühenduste ja exiftool protsesside) jälgimist.
+"""
+from fastapi import APIRouter
+from typing import Dict, Any
+
+import database
+from utils.cache import cache_stats, clear_caches
+from utils.exif_reader import EXIFTOOL_AVAILABLE
+from utils.exiftool_pool import get_pool
+from utils.pool_metrics import pool_stats
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["haldus"],
+    responses={404: {"description": "Ei leitud"}},
+)
+
+@router.get("/cache", response_model=Dict[str, Dict[str, Any]])
+def get_cache_stats():
+    """
+    Tagasta kõigi vahemälude statistika: kirjete arv, hinnanguline maht baitides,
+    tabamuste ja möödalaskmiste arv ning väljatõrjutud kirjete arv.
+    """
+    return cache_stats()
+
+@router.delete("/cache")
+def clear_cache():
+    """
+    Tühjenda kõik vahemälud.
+    """
+    clear_caches()
+    return {"message": "Vahemälud tühjendatud"}
+
+@router.get("/db-pool", response_model=Dict[str, Any])
+def get_db_pool_stats():
+    """
+    Tagasta andmebaasi ühenduste kogumite olek: välja laenatud ja vabad ühendused,
+    ülevool, ühenduse saamise ooteaeg (keskmine, p95, maksimum) ja aegumiste arv.
+    Sünkroonsel ja asünkroonsel mootoril on kummalgi oma kogum.
+    """
+    return {
+        "pgbouncer": database.DB_PGBOUNCER,
+        "sync": pool_stats(database.engine.pool),
+        "async": pool_stats(database.async_engine.pool) if database.async_engine is not None else None
+    }
+
+@router.get("/exiftool", response_model=Dict[str, Any])
+def get_exiftool_pool_stats():
+    """
+    Tagasta metaandmete lugemiseks kasutatavate exiftool protsesside kogumi olek:
+    kogumi suurus, töötavate protsesside arv, käivitatud ja asendatud protsessid
+    ning päringute ja ebaõnnestunud päringute (aegumine, protsessi kokkujooksmine) arv.
+    """
+    return {"available": EXIFTOOL_AVAILABLE, **get_pool().stats()}
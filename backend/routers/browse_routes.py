@@ -2,11 +2,15 @@
 Fotode sirvimise API marsruuter.
 Pakub API lõpp-punkte fotode sirvimiseks ja filtreerimiseks.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-from database import get_db
-from services import photo_service
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database import get_async_read_db
+from services import photo_service, version_service
+from services.photo_fields import LIST_FIELDS, DETAIL_FIELDS, parse_fields
+from models.photo_models import PhotoListItem, PhotoDetail
+from utils.http_cache import check_not_modified, query_string_key
+from utils.responses import FastJSONResponse
 
 router = APIRouter(
     prefix="/photos",
@@ -14,34 +18,83 @@ router = APIRouter(
     responses={404: {"description": "Ei leitud"}},
 )
 
-@router.get("/", response_model=List[Dict[str, Any]])
+@router.get("/", response_model=List[PhotoListItem], response_model_exclude_unset=True)
 async def get_photos(
+    request: Request,
+    response: Response,
     species_id: Optional[int] = Query(None, description="Taimeliigi ID filtreerimiseks"),
     location: Optional[str] = Query(None, description="Asukoht filtreerimiseks"),
-    date: Optional[str] = Query(None, description="Kuupäev filtreerimiseks (YYYY-MM-DD)"),
-    offset: int = Query(0, description="Mitu fotot vahele jätta (leheküljestamine)"),
+    date: Optional[str] = Query(None, description="Kuupäev või periood filtreerimiseks (YYYY, YYYY-MM või YYYY-MM-DD)"),
+    date_from: Optional[str] = Query(None, description="Pildistamise aja alampiir (YYYY-MM-DD või ISO aeg)"),
+    date_to: Optional[str] = Query(None, description="Pildistamise aja ülempiir, kaasa arvatud"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="Kuu (1-12), nt hooajaliste vaatluste jaoks"),
+    year: Optional[int] = Query(None, description="Aasta"),
+    bbox: Optional[str] = Query(None, description="Kaardivaate piirid kujul min_lon,min_lat,max_lon,max_lat"),
+    near: Optional[str] = Query(None, description="Keskpunkt kujul lat,lon raadiusega otsinguks"),
+    radius: float = Query(1000, description="Otsinguraadius meetrites near-punkti ümber"),
+    offset: int = Query(0, description="Mitu fotot vahele jätta (leheküljestamine, vana režiim)"),
     limit: int = Query(20, description="Maksimaalne fotode arv vastuses"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Eelmise lehe X-Next-Cursor päise väärtus"),
+    order: str = Query("id", description="Järjestus: 'id' (uuemad enne) või 'date' (kuupäeva järgi)"),
+    q: Optional[str] = Query(None, description="Vabatekstiotsing asukoha ja liiginimede järgi, tulemused asjakohasuse järjekorras"),
+    fields: Optional[str] = Query(None, description="Tagastatavad väljad komadega eraldatult, nt id,file_path"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Tagasta fotode nimekiri koos põhiandmetega.
     Võimaldab filtreerida liigi, asukoha ja kuupäeva järgi.
+    Järgmise lehe kursor tagastatakse päises X-Next-Cursor.
+    Kui If-None-Match päis vastab kehtivale ETag'ile, vastatakse 304.
     """
-    photos = photo_service.get_photos(
-        db, species_id=species_id, location=location, 
-        date=date, offset=offset, limit=limit
-    )
-    return photos
+    # Teenused kasutavad sünkroonset Session'it; run_sync käivitab need asünkroonse
+    # ühenduse peal, nii et päringu ootamine ei blokeeri sündmuste tsüklit
+    etag = await db.run_sync(version_service.collection_etag, version_service.PHOTOS, query_string_key(request))
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    try:
+        photos = await db.run_sync(
+            photo_service.get_photos, species_id=species_id, location=location, 
+            date=date, offset=offset, limit=limit,
+            cursor=cursor, order=order, q=q,
+            date_from=date_from, date_to=date_to, month=month, year=year,
+            bbox=bbox, near=near, radius=radius,
+            fields=parse_fields(fields, LIST_FIELDS)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Asjakohasuse järgi järjestatud otsingutulemusi leheküljestatakse ainult offset'iga
+    next_cursor = None if q else photo_service.get_next_cursor(photos, limit, order)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    # Teenuse sõnastikud vastavad juba PhotoListItem'ile; otse orjson'iga kodeerimine
+    # jätab vahele mudeli valideerimise, mis võttis suurel lehel enamiku CPU ajast.
+    # response_model jääb OpenAPI dokumentatsiooni jaoks alles.
+    return FastJSONResponse(photos, headers=response.headers)
 
-@router.get("/{photo_id}", response_model=Dict[str, Any])
+@router.get("/{photo_id}", response_model=PhotoDetail, response_model_exclude_unset=True)
 async def get_photo(
     photo_id: int, 
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Tagastatavad väljad komadega eraldatult, nt id,file_path,species"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Tagasta konkreetse foto detailid koos tuvastatud liikidega.
+    Kui If-None-Match päis vastab kehtivale ETag'ile, vastatakse 304.
     """
-    photo_data = photo_service.get_photo_with_species(db, photo_id)
+    try:
+        selected_fields = parse_fields(fields, DETAIL_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    etag = await db.run_sync(version_service.photo_etag, photo_id, query_string_key(request))
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    photo_data = await db.run_sync(photo_service.get_photo_with_species, photo_id, selected_fields)
     if not photo_data:
         raise HTTPException(status_code=404, detail="Fotot ei leitud")
     return photo_data
\ No newline at end of file
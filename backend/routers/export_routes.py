@@ -0,0 +1,55 @@
+"""
+Andmete ekspordi API marsruuter.
+Pakub kogu fotokataloogi voogedastatud eksporti NDJSON, CSV, Parquet või Arrow kujul.
+"""
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from services import export_service, columnar_export
+from utils.date_utils import parse_photo_date
+
+router = APIRouter(
+    prefix="/export",
+    tags=["eksport"],
+    responses={404: {"description": "Ei leitud"}},
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+@router.get("/photos")
+def export_photos(
+    format: str = Query("ndjson", description="Ekspordi vorming: 'ndjson' (üks foto rea kohta), 'csv', 'parquet' või 'arrow' (üks rida foto ja liigi paari kohta)"),
+    since: Optional[str] = Query(None, description="Ekspordi ainult pärast seda hetktõmmist muutunud fotod (eelmise ekspordi X-Snapshot-At väärtus)")
+):
+    """
+    Ekspordi kõik fotod koos liikide, seose kategooria, GPS- ja kaameraandmetega.
+    Andmed loetakse serveripoolse kursoriga ja saadetakse kohe voona,
+    seega mälukasutus ei sõltu kataloogi suurusest.
+    Hetktõmmise aeg tagastatakse päises X-Snapshot-At.
+    """
+    if format not in export_service.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Tundmatu vorming: {format}")
+    if format in columnar_export.COLUMNAR_FORMATS and not columnar_export.is_available():
+        raise HTTPException(status_code=501, detail="Parquet/Arrow eksport vajab serveris pyarrow paketti")
+    since_time = None
+    if since:
+        since_time = parse_photo_date(since)
+        if since_time is None:
+            raise HTTPException(status_code=400, detail=f"Vigane since väärtus: {since}")
+    
+    snapshot_at = export_service.snapshot_time()
+    filename = f"photos-{snapshot_at.strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(
+        export_service.stream_export(format, since=since_time, snapshot_at=snapshot_at),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Snapshot-At": snapshot_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        }
+    )
@@ -0,0 +1,47 @@
+"""
+Fotode tahkude API marsruuter.
+Pakub sirvimislehe filtrite külgriba jaoks fotode arve liikide, sugukondade,
+kaameramudelite ja aastate kaupa.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any
+
+from database import get_db
+from services import facet_service
+
+router = APIRouter(
+    prefix="/photos",
+    tags=["fotode-sirvimine"],
+    responses={404: {"description": "Ei leitud"}},
+)
+
+@router.get("/facets", response_model=Dict[str, List[Dict[str, Any]]])
+def get_photo_facets(
+    species_id: Optional[int] = Query(None, description="Taimeliigi ID filtreerimiseks"),
+    species_name: Optional[str] = Query(None, description="Liigi nimi filtreerimiseks"),
+    location: Optional[str] = Query(None, description="Asukoht filtreerimiseks"),
+    date: Optional[str] = Query(None, description="Kuupäev või periood filtreerimiseks (YYYY, YYYY-MM või YYYY-MM-DD)"),
+    date_from: Optional[str] = Query(None, description="Pildistamise aja alampiir (YYYY-MM-DD või ISO aeg)"),
+    date_to: Optional[str] = Query(None, description="Pildistamise aja ülempiir, kaasa arvatud"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="Kuu (1-12)"),
+    year: Optional[int] = Query(None, description="Aasta"),
+    bbox: Optional[str] = Query(None, description="Kaardivaate piirid kujul min_lon,min_lat,max_lon,max_lat"),
+    near: Optional[str] = Query(None, description="Keskpunkt kujul lat,lon raadiusega otsinguks"),
+    radius: float = Query(1000, description="Otsinguraadius meetrites near-punkti ümber"),
+    q: Optional[str] = Query(None, description="Vabatekstiotsing asukoha ja liiginimede järgi"),
+    limit: int = Query(facet_service.MAX_FACET_VALUES, description="Maksimaalne väärtuste arv iga tahu kohta"),
+    db: Session = Depends(get_db)
+):
+    """
+    Tagasta fotode arvud liikide, sugukondade, kaameramudelite ja aastate kaupa.
+    Filtrid on samad mis fotode nimekirjal, seega arvud vastavad hetke valikule.
+    """
+    try:
+        return facet_service.get_facets(
+            db, species_id=species_id, species_name=species_name, location=location,
+            date=date, date_from=date_from, date_to=date_to, month=month, year=year,
+            bbox=bbox, near=near, radius=radius, q=q, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,75 @@
+"""
+Piltide suuruse muutmise API marsruuter.
+Tagastab fotosid soovitud suuruses, nt responsiivse srcset atribuudi jaoks.
+"""
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+
+from database import get_read_db
+from services import image_service
+from utils.http_cache import etag_matches, make_etag
+
+router = APIRouter(
+    prefix="/images",
+    tags=["pildid"],
+    responses={404: {"description": "Ei leitud"}},
+)
+
+# Foto originaal ei muutu, seega võib sama URL-i vastust kaua puhverdada
+CACHE_CONTROL = "public, max-age=604800"
+
+def _choose_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """Vorming parameetrist või, kui see puudub, Accept päise järgi."""
+    if fmt:
+        return fmt.lower()
+    return "webp" if accept and "image/webp" in accept else "jpeg"
+
+@router.get("/{photo_id}")
+def get_image(
+    photo_id: int,
+    request: Request,
+    w: Optional[int] = Query(None, description="Maksimaalne laius pikslites"),
+    h: Optional[int] = Query(None, description="Maksimaalne kõrgus pikslites"),
+    fmt: Optional[str] = Query(None, description="Vorming: webp või jpeg (vaikimisi Accept päise järgi)"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Tagasta foto mahutatuna w x h kasti (kuvasuhe säilib, pilti ei suurendata).
+    Esimesel päringul tehakse pilt originaalist ja salvestatakse kettal olevasse
+    vahemällu; järgmised päringud saavad vahemälus oleva faili. Fail on
+    vahemälus kinnitatud, kuni vastus on saadetud, et seda vahepeal ei eemaldataks.
+    """
+    fmt_value = _choose_format(fmt, request.headers.get("accept"))
+    for attempt in range(2):
+        try:
+            path = image_service.get_resized_image(db, photo_id, width=w, height=h, fmt=fmt_value)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if path is None:
+            raise HTTPException(status_code=404, detail="Fotot ei leitud")
+        try:
+            stat_result = os.stat(path)
+            break
+        except FileNotFoundError:
+            # Teine sama kausta kasutav protsess eemaldas faili; järgmine katse loob selle uuesti
+            image_service.release_resized_image(path)
+            if attempt:
+                raise HTTPException(status_code=503, detail="Pilti ei õnnestunud vahemälust lugeda")
+
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if fmt is None:
+        headers["Vary"] = "Accept"
+    # Faili nimi on päringu võtme räsi ja sisu sõltub ainult sellest
+    etag = make_etag("image", os.path.basename(path), stat_result.st_size)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        image_service.release_resized_image(path)
+        return Response(status_code=304, headers={"ETag": etag, **headers})
+    headers["ETag"] = etag
+    return FileResponse(path, media_type=image_service.MEDIA_TYPES[fmt_value], headers=headers,
+                        stat_result=stat_result,
+                        background=BackgroundTask(image_service.release_resized_image, path))
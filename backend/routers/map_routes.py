@@ -0,0 +1,32 @@
+"""
+Kaardivaate API marsruuter.
+Pakub geomärgistatud fotode serveripoolset klasterdamist kaardi jaoks.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any
+
+from database import get_db
+from services import cluster_service
+
+router = APIRouter(
+    prefix="/photos",
+    tags=["kaart"],
+    responses={404: {"description": "Ei leitud"}},
+)
+
+@router.get("/clusters", response_model=Dict[str, Any])
+def get_photo_clusters(
+    bbox: str = Query(..., description="Kaardivaate piirid kujul min_lon,min_lat,max_lon,max_lat"),
+    zoom: int = Query(..., description="Kaardi suumitase (0-20)"),
+    species_id: Optional[int] = Query(None, description="Taimeliigi ID filtreerimiseks"),
+    db: Session = Depends(get_db)
+):
+    """
+    Tagasta kaardivaates olevad fotod klastritena.
+    Iga klaster sisaldab fotode arvu, keskpunkti ja ühe näidisfoto ID-d.
+    """
+    try:
+        return cluster_service.get_clusters(db, bbox=bbox, zoom=zoom, species_id=species_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,41 @@
+"""
+Fotode hulgipäringu API marsruuter.
+Pakub mitme foto andmete laadimist ühe päringuga, nt detailipaneelide jaoks.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from database import get_read_db
+from services import photo_service
+from services.photo_fields import DETAIL_FIELDS, parse_fields
+from models.photo_models import PhotoDetail
+
+router = APIRouter(
+    prefix="/photos",
+    tags=["fotode-sirvimine"],
+    responses={404: {"description": "Ei leitud"}},
+)
+
+def _parse_ids(ids: str) -> List[int]:
+    """Komadega eraldatud ID-d kordusteta, esialgses järjekorras."""
+    try:
+        values = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise ValueError("ids peab olema komadega eraldatud täisarvude loend, nt 1,2,3")
+    return list(dict.fromkeys(values))
+
+@router.get("/batch", response_model=List[PhotoDetail], response_model_exclude_unset=True)
+def get_photos_batch(
+    ids: str = Query(..., description="Fotode ID-d komadega eraldatult, kuni 100"),
+    fields: Optional[str] = Query(None, description="Tagastatavad väljad komadega eraldatult, nt id,file_path,species"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Tagasta mitu fotot koos liikidega ühe andmebaasipäringuga.
+    Fotod tagastatakse ids järjekorras; puuduvaid ID-sid vastuses ei ole.
+    """
+    try:
+        return photo_service.get_photos_by_ids(db, _parse_ids(ids), fields=parse_fields(fields, DETAIL_FIELDS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -2,21 +2,25 @@
 API routes for photo operations.
 Provides endpoints for CRUD operations on photos.
 """
-from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Body, UploadFile, File, Form, Request, Response
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List, Dict, Any, Optional
 import os
-import shutil
-import uuid
 from datetime import datetime
 import logging
 from tempfile import NamedTemporaryFile
 import re
 
-from database import get_db
-from services import photo_service
-from models.photo_models import Photo
-from utils.exif_reader import get_image_metadata, run_exiftool, extract_date, extract_location, extract_gps_coordinates
+from database import get_db, get_read_db
+from services import photo_service, rendition_service, storage_service, version_service
+from services.metadata_cache import metadata_memo
+from services.photo_fields import LIST_FIELDS, DETAIL_FIELDS, parse_fields
+from models.photo_models import Photo, PhotoListItem, PhotoDetail
+from utils.http_cache import check_not_modified, query_string_key
+from utils.file_storage import save_upload
+from utils.responses import FastJSONResponse
+from utils.exif_reader import PrefixTooShort, get_image_metadata, get_images_metadata, get_prefix_metadata, run_exiftool, extract_date, extract_location, extract_gps_coordinates
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -27,41 +31,93 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.get("/")
+@router.get("/", response_model=List[PhotoListItem], response_model_exclude_unset=True)
 def read_photos(
+    request: Request,
+    response: Response,
     species_id: Optional[int] = None,
     species_name: Optional[str] = None,
     location: Optional[str] = None, 
     date: Optional[str] = None, 
     offset: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    order: str = "id",
+    q: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    bbox: Optional[str] = None,
+    near: Optional[str] = None,
+    radius: float = 1000,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     """
     Retrieve a list of photos with pagination and optional filtering.
     
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    Answers 304 Not Modified when If-None-Match holds the current ETag.
+    
     Args:
         species_id: Optional filter by species ID
         species_name: Optional filter by species name (scientific or common name)
         location: Optional filter by location (substring match)
-        date: Optional filter by exact date
-        offset: Number of records to skip
+        date: Optional filter by date period ("YYYY", "YYYY-MM" or "YYYY-MM-DD")
+        offset: Number of records to skip (legacy, ignored when cursor is given)
         limit: Maximum number of records to return
+        cursor: Cursor from the X-Next-Cursor header of the previous page
+        order: Sort order, "id" or "date"
+        q: Optional free text search over location and species names, ranked by relevance
+        date_from: Optional lower bound for the capture time (YYYY-MM-DD or ISO datetime)
+        date_to: Optional upper bound for the capture time, inclusive
+        month: Optional month of year (1-12)
+        year: Optional calendar year
+        bbox: Optional map viewport "min_lon,min_lat,max_lon,max_lat"
+        near: Optional center point "lat,lon" for the radius filter
+        radius: Radius around near in meters
+        fields: Optional comma separated fields to return, e.g. "id,file_path";
+            only these columns are read from the database
         db: Database session
     """
-    photos = photo_service.get_photos(
-        db, 
-        species_id=species_id,
-        species_name=species_name,
-        location=location, 
-        date=date, 
-        offset=offset, 
-        limit=limit
-    )
+    etag = version_service.collection_etag(db, version_service.PHOTOS, query_string_key(request))
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    try:
+        photos = photo_service.get_photos(
+            db, 
+            species_id=species_id,
+            species_name=species_name,
+            location=location, 
+            date=date, 
+            offset=offset, 
+            limit=limit,
+            cursor=cursor,
+            order=order,
+            q=q,
+            date_from=date_from,
+            date_to=date_to,
+            month=month,
+            year=year,
+            bbox=bbox,
+            near=near,
+            radius=radius,
+            fields=parse_fields(fields, LIST_FIELDS)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Relevance-ranked search results are paginated with offset only
+    next_cursor = None if q else photo_service.get_next_cursor(photos, limit, order)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     # Ensure we're returning a list of dictionaries, not SQLAlchemy objects
     if photos and not isinstance(photos[0], dict):
-        return [
+        photos = [
             {
                 "id": photo.id,
                 "file_path": photo.file_path,
@@ -70,36 +126,79 @@ def read_photos(
             }
             for photo in photos
         ]
-    return photos
+    # The dictionaries already match PhotoListItem, so encode them with orjson
+    # directly; validating a large page against the model cost most of the CPU
+    # time. response_model stays for the OpenAPI schema.
+    return FastJSONResponse(photos, headers=response.headers)
 
 # Additional route without trailing slash to avoid automatic redirect (which can appear as a CORS/network error in browser)
-@router.get("")
+@router.get("", response_model=List[PhotoListItem], response_model_exclude_unset=True)
 def read_photos_no_trailing_slash(
+    request: Request,
+    response: Response,
     species_id: Optional[int] = None,
     species_name: Optional[str] = None,
     location: Optional[str] = None,
     date: Optional[str] = None,
     offset: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    order: str = "id",
+    q: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    bbox: Optional[str] = None,
+    near: Optional[str] = None,
+    radius: float = 1000,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
     return read_photos(
+        request=request,
+        response=response,
         species_id=species_id,
         species_name=species_name,
         location=location,
         date=date,
         offset=offset,
         limit=limit,
+        cursor=cursor,
+        order=order,
+        q=q,
+        date_from=date_from,
+        date_to=date_to,
+        month=month,
+        year=year,
+        bbox=bbox,
+        near=near,
+        radius=radius,
+        fields=fields,
         db=db
     )
 
-@router.get("/{photo_id}")
-def read_photo(photo_id: int, db: Session = Depends(get_db)):
+@router.get("/{photo_id}", response_model=PhotoDetail, response_model_exclude_unset=True)
+def read_photo(photo_id: int, request: Request, response: Response, fields: Optional[str] = None,
+               db: Session = Depends(get_read_db)):
     """
     Retrieve a specific photo by ID.
+    Answers 304 Not Modified when If-None-Match holds the current ETag.
+    The optional fields parameter (e.g. "id,file_path,species") limits the returned
+    and selected columns.
     """
+    try:
+        selected_fields = parse_fields(fields, DETAIL_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    etag = version_service.photo_etag(db, photo_id, query_string_key(request))
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    
     # Kasuta get_photo_with_species, mis tagastab ka fotoga seotud taimeliigid
-    db_photo = photo_service.get_photo_with_species(db, photo_id=photo_id)
+    db_photo = photo_service.get_photo_with_species(db, photo_id=photo_id, fields=selected_fields)
     if db_photo is None:
         raise HTTPException(status_code=404, detail="Photo not found")
     
@@ -137,56 +236,60 @@ def delete_photo(
     return {"message": "Foto edukalt kustutatud"}
 
 @router.post("/upload", response_model=Dict[str, Any])
-async def upload_photo(
+def upload_photo(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     date: str = None,
     location: str = None,
+    metadata_token: str = None,
     db: Session = Depends(get_db)
 ):
     """
     Upload a photo without AI identification.
     Simple photo upload for cases when AI plant identification is not needed.
+    Renditions (thumbnails and previews) are generated after the response is sent.
+    Uploading a file that is already stored returns the existing photo
+    (duplicate: true) without storing the file again.
+    A plain function, so hashing and storing the file run in the thread pool.
     
     Args:
+        background_tasks: Tasks run after the response (rendition generation)
         file: Photo file to upload
         date: Optional date for the photo (will be extracted from EXIF if available)
         location: Optional location for the photo (will be extracted from EXIF if available)
+        metadata_token: Optional token from /photos/extract-metadata, to reuse the metadata read there
         db: Database session
     """
+    stored = None
     try:
-        # Create file_storage directory if it doesn't exist
-        file_storage_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "file_storage")
-        if not os.path.exists(file_storage_path):
-            os.makedirs(file_storage_path)
-            logger.info(f"Created directory: {file_storage_path}")
+        # Save the file under its content hash; identical content is stored once
+        stored = save_upload(file.file, file.filename)
+        logger.info(f"File saved to: {stored.path}" if stored.created else f"File already stored: {stored.path}")
         
-        # Generate unique filename and save the file
-        permanent_filename = f"{uuid.uuid4()}-{file.filename}"
-        permanent_path = os.path.join(file_storage_path, permanent_filename)
+        # Reuse the metadata read for the preview, if any
+        metadata = metadata_memo.lookup(file.file, metadata_token, stored.content_hash)
         
-        # Save the uploaded file
-        with open(permanent_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        logger.info(f"File saved to: {permanent_path}")
-        
-        # If date not provided, use current date
-        if not date:
-            date = datetime.now().strftime("%Y-%m-%d")
-        
-        # Save photo info to database (this will also extract EXIF data if available)
-        db_photo = photo_service.create_photo(
+        # Save photo info to database (this will also extract EXIF data if available
+        # and fall back to the current date when neither the user nor EXIF gives one)
+        db_photo, created = storage_service.create_or_get_photo(
             db, 
-            file_path=permanent_path, 
+            stored,
             date=date,
-            location=location
+            location=location,
+            metadata=metadata,
+            fileobj=file.file
         )
         
-        logger.info(f"Photo information saved to database with ID: {db_photo.id}")
+        if created:
+            logger.info(f"Photo information saved to database with ID: {db_photo.id}")
+            background_tasks.add_task(rendition_service.create_renditions_task, db_photo.id)
+        else:
+            logger.info(f"Photo already exists with ID: {db_photo.id}")
         
         return {
-            "message": "Foto edukalt üles laaditud", 
+            "message": "Foto edukalt üles laaditud" if created else "See foto on juba andmebaasis",
             "photo_id": db_photo.id,
+            "duplicate": not created,
             "photo": {
                 "id": db_photo.id,
                 "file_path": db_photo.file_path,
@@ -197,26 +300,100 @@ async def upload_photo(
         
     except Exception as e:
         logger.error(f"Error uploading photo: {e}")
+        if stored is not None:
+            storage_service.discard_unused(db, stored)
         raise HTTPException(status_code=500, detail=f"Viga foto üleslaadimisel: {str(e)}")
 
-@router.post("/extract-metadata", response_model=Dict[str, Any])
-async def extract_file_metadata(
-    file: UploadFile = File(...),
+def _save_uploads(files: List[UploadFile]) -> List[Dict[str, Any]]:
+    """Store the uploaded files; each result has the stored file or the error."""
+    results = []
+    for file in files:
+        try:
+            results.append({"filename": file.filename, "file": file.file,
+                            "stored": save_upload(file.file, file.filename)})
+        except Exception as e:
+            logger.error(f"Error saving {file.filename}: {e}")
+            results.append({"filename": file.filename, "error": str(e)})
+    return results
+
+@router.post("/upload/batch", response_model=Dict[str, Any])
+def upload_photos_batch(
+    background_tasks: BackgroundTasks,
+    photos: List[UploadFile] = File(...),
+    date: str = None,
+    location: str = None,
     db: Session = Depends(get_db)
 ):
     """
-    Ekstrakteerib pildifaili metaandmed ilma faili salvestamata.
-    Võimaldab klientrakendusel kuvada metaandmeid kasutajale enne pildi üleslaadimist.
+    Upload several photos at once.
+    The metadata of all new files is read with batched exiftool commands
+    (get_images_metadata) instead of one command per file. Files that are
+    already stored return the existing photo (duplicate: true).
+    A plain function, so storing the files, exiftool and the database work
+    run in the thread pool instead of on the event loop.
     
     Args:
-        file: Foto fail, millest metaandmeid lugeda
-        db: Andmebaasiühendus (pole tegelikult vaja, aga FastAPI konventsioonide tõttu)
+        background_tasks: Tasks run after the response (rendition generation)
+        photos: Photo files to upload
+        date: Optional date for all photos (EXIF date is used if not given)
+        location: Optional location for all photos (EXIF location is used if not given)
+        db: Database session
+    """
+    uploads = _save_uploads(photos)
+    
+    # Read metadata only for files that are not in the catalog yet
+    new_paths = [
+        upload["stored"].path for upload in uploads
+        if "stored" in upload and storage_service.find_photo_by_hash(db, upload["stored"].content_hash) is None
+    ]
+    metadata_by_path = get_images_metadata(new_paths)
+    
+    results = []
+    failed = []
+    for upload in uploads:
+        if "error" in upload:
+            failed.append({"filename": upload["filename"], "error": upload["error"]})
+            continue
+        stored = upload["stored"]
+        try:
+            db_photo, created = storage_service.create_or_get_photo(
+                db, stored, date=date, location=location,
+                metadata=metadata_by_path.get(stored.path, {}), fileobj=upload["file"]
+            )
+        except Exception as e:
+            logger.error(f"Error saving photo {upload['filename']}: {e}")
+            db.rollback()
+            storage_service.discard_unused(db, stored)
+            failed.append({"filename": upload["filename"], "error": str(e)})
+            continue
+        if created:
+            background_tasks.add_task(rendition_service.create_renditions_task, db_photo.id)
+        results.append({
+            "id": db_photo.id,
+            "photo_id": db_photo.id,
+            "filename": upload["filename"],
+            "file_path": db_photo.file_path,
+            "date": db_photo.date,
+            "location": db_photo.location,
+            "duplicate": not created,
+            "success": True
+        })
+    
+    logger.info(f"Batch upload: {len(results)} photos saved, {len(failed)} failed")
+    return {"photos": results, "failed": failed}
+
+def _read_file_metadata(data: bytes) -> Dict[str, Any]:
+    """
+    Loe kogu faili metaandmed exiftool'iga ajutisest failist.
+    
+    Args:
+        data: Kogu faili sisu
     """
     try:
-        # Salvesta üleslaetud fail ajutiselt
+        # Muud vormingud loeb exiftool: salvesta fail ajutiselt
         with NamedTemporaryFile(delete=False) as temp_file:
             try:
-                shutil.copyfileobj(file.file, temp_file)
+                temp_file.write(data)
                 temp_path = temp_file.name
                 logger.info(f"Ajutine fail metaandmete lugemiseks salvestatud: {temp_path}")
             except Exception as e:
@@ -320,7 +497,7 @@ async def extract_file_metadata(
             
             # Tagasta metaandmed JSON-ina
             logger.info(f"Final metadata: {metadata}")
-            return metadata
+            return {**metadata, "metadata_token": metadata_memo.remember(data, metadata, exiftool=True)}
             
         except Exception as e:
             logger.error(f"Viga metaandmete lugemisel: {str(e)}")
@@ -339,4 +516,44 @@ async def extract_file_metadata(
     except Exception as e:
         logger.error(f"Ootamatu viga metaandmete lugemisel: {str(e)}")
         logger.exception(e)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/extract-metadata", response_model=Dict[str, Any])
+async def extract_file_metadata(
+    file: UploadFile = File(...),
+    file_size: Optional[int] = Form(None)
+):
+    """
+    Ekstrakteerib pildifaili metaandmed ilma faili salvestamata.
+    Võimaldab klientrakendusel kuvada metaandmeid kasutajale enne pildi üleslaadimist.
+    
+    JPEG, HEIF ja TIFF failide puhul piisab faili algusest (päisest, tavaliselt
+    alla 128 KB), mis loetakse mälus ilma kettale kirjutamata. Kui algus lõpeb
+    enne päise lõppu, vastatakse 422 ja required_bytes näitab, mitu baiti on
+    vähemalt vaja.
+    
+    Args:
+        file: Foto fail või selle algus
+        file_size: Kogu faili suurus baitides (kui puudub, on saadetud kogu fail)
+    """
+    data = await file.read()
+    complete = file_size is None or len(data) >= file_size
+    try:
+        metadata = get_prefix_metadata(data, file.filename, complete)
+    except PrefixTooShort as e:
+        raise HTTPException(status_code=422, detail={
+            "message": "Faili algus on metaandmete lugemiseks liiga lühike",
+            "required_bytes": e.required_bytes
+        })
+    if metadata is not None:
+        logger.info(f"Metaandmed loetud faili algusest ({len(data)} baiti): {metadata}")
+        # Üleslaadimine saab metadata_token abil loetud andmeid uuesti kasutada
+        return {**metadata, "metadata_token": metadata_memo.remember(data, metadata)}
+    if not complete:
+        raise HTTPException(status_code=422, detail={
+            "message": "Selle vormingu metaandmeid saab lugeda ainult kogu failist",
+            "required_bytes": file_size
+        })
+    
+    # Ajutise faili kirjutamine ja exiftool blokeeriksid sündmuste tsüklit
+    return await run_in_threadpool(_read_file_metadata, data)
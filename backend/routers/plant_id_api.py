@@ -1,25 +1,27 @@
 """
 Taimeliigi tuvastamise API moodul.
 Pakub API lõpp-punkte taimeliikide tuvastamiseks.
+
+Andmebaasi päringud käivad asünkroonse sessiooni kaudu (AsyncSession.run_sync)
+ning Plant.id päringud, failitoimingud ja EXIF lugemine lõimekogumis, nii et
+tuvastamise ootamine ei blokeeri teisi samaaegseid päringuid.
 """
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, File, UploadFile, Depends, HTTPException
 from sqlalchemy.orm import Session
-import shutil
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 import os
-import uuid
-from typing import List
-import tempfile
-from datetime import datetime
+from typing import Any, Dict, List
 import logging
 
-from database import get_db
+from database import get_async_db
 from utils.plant_identification import PlantIdClient
+from utils.exif_reader import get_image_metadata
 from models.species_models import Species
-from models.photo_models import Photo
-from models.relation_models import PhotoSpeciesRelation
-from models.settings_models import AppSettings
-from services import species_service, photo_service, relation_service, settings_service
+from services import species_service, photo_service, relation_service, rendition_service, storage_service
+from services.settings_service import SettingsService
 from utils.estonian_common_names import get_estonian_name
+from utils.file_storage import save_upload
 
 # Seadista logi
 logging.basicConfig(level=logging.DEBUG)  # Muudetud INFO -> DEBUG
@@ -31,110 +33,146 @@ router = APIRouter(
     responses={404: {"description": "Ei leitud"}},
 )
 
-# Funktsioon, mis loeb API võtme seadistustest
-def get_api_key_from_settings():
+# Minimaalne tõenäosus, millest alates tuvastatud liik salvestatakse
+MIN_PROBABILITY = 0.5
+
+API_KEY_MISSING = "Taimetuvastuse jaoks on vaja seadistada Plant.ID API võti administreerimislehel."
+
+async def get_api_key_from_settings():
     """
-    Loeb API võtme andmebaasist sünkroonselt.
+    Loeb API võtme andmebaasist.
     """
-    db = next(get_db())
     try:
-        setting = db.query(AppSettings).filter(AppSettings.key == "PLANT_ID_API_KEY").first()
-        api_key = setting.value if setting else ""
-        logger.info(f"API võti loetud seadistustest sünkroonselt. Võtme pikkus: {len(api_key) if api_key else 0}")
+        api_key = await SettingsService.get_plant_id_api_key()
+        logger.info(f"API võti loetud seadistustest. Võtme pikkus: {len(api_key) if api_key else 0}")
         return api_key
     except Exception as e:
         logger.error(f"Viga API võtme lugemisel: {str(e)}")
         return ""
-    finally:
-        db.close()
+
+def _add_estonian_names(species_data: List[Dict[str, Any]]) -> None:
+    """Lisa eestikeelne nimi tagastatavasse andmestruktuuri."""
+    for item in species_data:
+        try:
+            if not item.get("estonian_name"):
+                item["estonian_name"] = get_estonian_name(item.get("scientific_name"), item.get("common_names"))
+        except Exception:
+            pass
+
+def _save_identified_species(db: Session, photo_id: int, species_data: List[Dict[str, Any]],
+                             replace: bool = True) -> None:
+    """
+    Salvesta piisavalt suure tõenäosusega liigid ja nende seosed fotoga.
+
+    Sünkroonne funktsioon, mida kutsutakse AsyncSession.run_sync kaudu.
+    """
+    if replace:
+        # Eemalda vanad seosed, kui need eksisteerivad
+        removed_relations = relation_service.delete_relations_for_photo(db, photo_id)
+        if removed_relations:
+            logger.info(f"Eemaldatud {removed_relations} vana seost fotole ID: {photo_id}")
+
+    for i, species_info in enumerate(species_data):
+        if species_info.get("probability", 0) <= MIN_PROBABILITY:
+            continue
+        # Kontrolli, kas liik on juba andmebaasis
+        existing_species = db.query(Species).filter_by(
+            scientific_name=species_info.get("scientific_name")
+        ).first()
+
+        # Kui ei ole, loo uus liigi kirje
+        if not existing_species:
+            common_names = species_info.get("common_names") or [None]
+            db_species = species_service.create_species(
+                db,
+                scientific_name=species_info.get("scientific_name"),
+                common_name=common_names[0],
+                family=species_info.get("family"),
+                estonian_name=get_estonian_name(species_info.get("scientific_name"), species_info.get("common_names"))
+            )
+            # Töötle nii sõnastikku kui objekti
+            species_id = db_species.get("id") if isinstance(db_species, dict) else db_species.id
+            logger.info(f"Uus liik salvestatud ID-ga: {species_id}")
+        else:
+            species_id = existing_species.id
+            logger.info(f"Olemasolev liik leitud ID-ga: {species_id}")
+
+        # Loo seos foto ja liigi vahel
+        category = "primary" if i == 0 else "secondary"
+        relation_service.create_relation(db, photo_id=photo_id, species_id=species_id, category=category)
+        logger.info(f"Loodud seos foto ID {photo_id} ja liigi ID {species_id} vahel, kategooria: {category}")
+
+def _identify(api_key: str, file_path: str) -> List[Dict[str, Any]]:
+    """
+    Tuvasta taimed pildil ja tagasta struktureeritud liikide andmed.
+
+    Blokeeriv HTTP päring; kutsutakse lõimekogumis.
+    """
+    plant_id_client = PlantIdClient(api_key=api_key, use_simulation=False)
+    identification_result = plant_id_client.identify_plant(file_path)
+    logger.info(f"Tuvastamine õnnestus, vastuse võtmed: {list(identification_result.keys()) if identification_result else 'tühi vastus'}")
+    return plant_id_client.extract_species_data(identification_result)
 
 @router.post("/", response_model=List[dict])
 async def identify_plant(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = None,
     location: str = None
 ):
-    """Tuvasta taimeliigid üles laaditud pildilt ja salvesta tulemused (best-effort)."""
+    """
+    Tuvasta taimeliigid üles laaditud pildilt ja salvesta tulemused (best-effort).
+    Fail salvestatakse kohe sisu räsi järgi püsivasse hoidlasse ja tuvastus tehakse
+    sealt; juba olemasoleva pildi korral uuendatakse olemasoleva foto liike.
+    """
     if not api_key:
-        api_key = get_api_key_from_settings()
-
-    # Loo ajutine fail
-    suffix = os.path.splitext(file.filename or "")[1]
-    fd, temp_path = tempfile.mkstemp(suffix=suffix)
-    os.close(fd)
-    try:
-        with open(temp_path, "wb") as out:
-            shutil.copyfileobj(file.file, out)
-
-        try:
-            client = PlantIdClient(api_key=api_key, use_simulation=False)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Klienti ei saanud initsialiseerida: {e}")
+        api_key = await get_api_key_from_settings()
 
-        # Tuvastus
-        try:
-            identification_result = client.identify_plant(temp_path)
-        except Exception as e:
-            if "API võti puudub" in str(e):
-                raise HTTPException(status_code=400, detail="Taimetuvastuse jaoks on vaja seadistada Plant.ID API võti administreerimislehel.")
-            raise HTTPException(status_code=500, detail=f"Tuvastamise viga: {e}")
+    stored = await run_in_threadpool(save_upload, file.file, file.filename)
 
-        species_data = client.extract_species_data(identification_result)
+    # Tuvastus
+    try:
+        species_data = await run_in_threadpool(_identify, api_key, stored.path)
+    except Exception as e:
+        await db.run_sync(storage_service.discard_unused, stored)
+        if "API võti puudub" in str(e):
+            raise HTTPException(status_code=400, detail=API_KEY_MISSING)
+        raise HTTPException(status_code=500, detail=f"Tuvastamise viga: {e}")
 
-        # Persistents (best-effort; vead logitakse, kuid ei katkesta vastust)
-        try:
-            storage_root = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "file_storage")
-            os.makedirs(storage_root, exist_ok=True)
-            permanent_name = f"{uuid.uuid4()}-{file.filename}"
-            permanent_path = os.path.join(storage_root, permanent_name)
-            shutil.copy(temp_path, permanent_path)
-            photo_row = photo_service.create_photo(
-                db,
-                file_path=permanent_path,
-                date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                location=location
+    # Persistents (best-effort; vead logitakse, kuid ei katkesta vastust)
+    try:
+        photo_row = await db.run_sync(storage_service.find_photo_by_hash, stored.content_hash)
+        created = False
+        if photo_row is None:
+            metadata = await run_in_threadpool(get_image_metadata, stored.path)
+            photo_row, created = await db.run_sync(
+                storage_service.create_or_get_photo,
+                stored,
+                date=None,  # Võetakse EXIF-ist, puudumisel praegune aeg
+                location=location,
+                metadata=metadata,
+                fileobj=file.file
             )
-            for i, sp in enumerate(species_data):
-                if sp.get("probability", 0) > 0.5:
-                    existing = db.query(Species).filter_by(scientific_name=sp.get("scientific_name")).first()
-                    if not existing:
-                        common_name = sp.get("common_names", [None])[0]
-                        est_name = get_estonian_name(sp.get("scientific_name"), sp.get("common_names"))
-                        created = species_service.create_species(
-                            db,
-                            scientific_name=sp.get("scientific_name"),
-                            common_name=common_name,
-                            family=sp.get("family"),
-                            estonian_name=est_name
-                        )
-                        species_id = created.get("id") if isinstance(created, dict) else created.id
-                    else:
-                        species_id = existing.id
-                    relation_service.create_relation(
-                        db,
-                        photo_id=photo_row.id,
-                        species_id=species_id,
-                        category="primary" if i == 0 else "secondary"
-                    )
-        except Exception as e:
-            logger.error(f"Persistentsuse viga: {e}")
+        else:
+            # Sama sisuga foto on juba olemas; selle üleslaadimise kirjutatud fail pole vajalik
+            await run_in_threadpool(storage_service.settle_stored_file, stored, photo_row, file.file)
+        # Olemasoleva foto vanad tuvastustulemused asendatakse, nagu olemasoleva foto tuvastamisel
+        await db.run_sync(_save_identified_species, photo_row.id, species_data, replace=not created)
+        if created:
+            # Eelvaated luuakse pärast vastuse saatmist
+            background_tasks.add_task(rendition_service.create_renditions_task, photo_row.id)
+    except Exception as e:
+        logger.error(f"Persistentsuse viga: {e}")
+        await db.run_sync(storage_service.discard_unused, stored)
 
-        # Lisa estonian_name väljundisse
-        for sp in species_data:
-            if not sp.get("estonian_name"):
-                sp["estonian_name"] = get_estonian_name(sp.get("scientific_name"), sp.get("common_names"))
-        return species_data
-    finally:
-        try:
-            os.unlink(temp_path)
-        except Exception:
-            pass
+    _add_estonian_names(species_data)
+    return species_data
 
 @router.post("/existing/{photo_id}", response_model=List[dict])
 async def identify_existing_photo(
     photo_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = None
 ):
     """
@@ -142,120 +180,42 @@ async def identify_existing_photo(
     """
     # Kui API võtit ei ole otseselt määratud, loe see seadistustest
     if not api_key:
-        try:
-            api_key = get_api_key_from_settings()
-        except Exception as e:
-            logger.warning(f"API võtme lugemine ebaõnnestus: {str(e)}")
-            api_key = ""
-        
+        api_key = await get_api_key_from_settings()
+
     # Kontrolli, kas foto eksisteerib
-    db_photo = photo_service.get_photo(db, photo_id=photo_id)
+    db_photo = await db.run_sync(photo_service.get_photo, photo_id=photo_id)
     if not db_photo:
         raise HTTPException(status_code=404, detail="Fotot ei leitud")
-    
-    if isinstance(db_photo, dict):
-        file_path = db_photo["file_path"]
-    else:
-        file_path = db_photo.file_path
-    
+
+    file_path = db_photo["file_path"] if isinstance(db_photo, dict) else db_photo.file_path
+
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail=f"Faili ei leitud: {file_path}")
-    
+
     try:
-        # Initsialiseeri taimetuvastuse klient ilma simulatsioonita
-        plant_id_client = PlantIdClient(api_key=api_key, use_simulation=False)
-        logger.info(f"Plant ID Client initsialiseeritud foto ID-ga {photo_id}, simulatsioonirežiim: False")
-        
         # Tuvasta taimed pildil
         try:
-            identification_result = plant_id_client.identify_plant(file_path)
-            logger.info(f"Tuvastamine õnnestus, vastuse võtmed: {list(identification_result.keys()) if identification_result else 'tühi vastus'}")
+            species_data = await run_in_threadpool(_identify, api_key, file_path)
         except Exception as e:
             # Kui viga on seotud API võtmega, edasta see kasutajale
             if "API võti puudub" in str(e):
                 logger.error(f"API võtme viga: {str(e)}")
-                raise HTTPException(
-                    status_code=400,
-                    detail="Taimetuvastuse jaoks on vaja seadistada Plant.ID API võti administreerimislehel."
-                )
-            else:
-                # Muu viga, edasta see
-                logger.error(f"Tuvastamise viga: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Tuvastamise viga: {str(e)}")
-                
-        logger.info(f"Olemasoleva foto (ID: {photo_id}) tuvastamine õnnestus")
-        
-        # Ekstrakteeri struktureeritud liikide andmed
-        species_data = plant_id_client.extract_species_data(identification_result)
+                raise HTTPException(status_code=400, detail=API_KEY_MISSING)
+            logger.error(f"Tuvastamise viga: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Tuvastamise viga: {str(e)}")
+
         logger.info(f"Tuvastati {len(species_data)} liiki fotol ID: {photo_id}")
-        
+
         try:
-            # Eemalda vanad seosed, kui need eksisteerivad
-            existing_relations = db.query(PhotoSpeciesRelation).filter_by(photo_id=photo_id).all()
-            if existing_relations:
-                for relation in existing_relations:
-                    db.delete(relation)
-                db.commit()
-                logger.info(f"Eemaldatud {len(existing_relations)} vana seost fotole ID: {photo_id}")
-            
-            # Salvesta tuvastatud liigid ja seosed fotoga
-            if species_data:
-                for i, species_info in enumerate(species_data):
-                    if species_info["probability"] > 0.5:  # Salvesta kõik piisavalt suure tõenäosusega liigid
-                        try:
-                            # Kontrolli, kas liik on juba andmebaasis
-                            existing_species = db.query(Species).filter_by(
-                                scientific_name=species_info["scientific_name"]
-                            ).first()
-                            
-                            # Kui ei ole, loo uus liigi kirje
-                            if not existing_species:
-                                common_name = species_info["common_names"][0] if species_info["common_names"] else None
-                                est_name = get_estonian_name(species_info["scientific_name"], species_info.get("common_names"))
-                                db_species = species_service.create_species(
-                                    db,
-                                    scientific_name=species_info["scientific_name"],
-                                    common_name=common_name,
-                                    family=species_info["family"],
-                                    estonian_name=est_name
-                                )
-                                # Töötle nii sõnastikku kui objekti
-                                if isinstance(db_species, dict):
-                                    species_id = db_species.get("id")
-                                else:
-                                    species_id = db_species.id
-                                logger.info(f"Uus liik salvestatud ID-ga: {species_id}")
-                            else:
-                                species_id = existing_species.id
-                                logger.info(f"Olemasolev liik leitud ID-ga: {species_id}")
-                            
-                            # Loo seos foto ja liigi vahel
-                            category = "primary" if i == 0 else "secondary"
-                            relation_service.create_relation(
-                                db,
-                                photo_id=photo_id,
-                                species_id=species_id,
-                                category=category
-                            )
-                            logger.info(f"Loodud seos foto ID {photo_id} ja liigi ID {species_id} vahel, kategooria: {category}")
-                        except Exception as db_error:
-                            logger.error(f"Viga liigi või seose salvestamisel: {str(db_error)}")
-                            # Jätka andmete kogumisega isegi kui andmebaasi salvestamine ebaõnnestub
+            await db.run_sync(_save_identified_species, photo_id, species_data)
         except Exception as db_error:
             logger.error(f"Viga andmebaasi operatsioonidega: {str(db_error)}")
+            await db.rollback()
             # Me jätkame, et saata kasutajale vähemalt tuvastatud andmed
-        
-        # Et näha, millised andmed tagastatakse
-        logger.info(f"Tagastan {len(species_data)} liiki, esimene: {species_data[0] if species_data else 'tühi'}")
-        # Lisa eestikeelne nimi tagastatavasse andmestruktuuri
-        for item in species_data:
-            try:
-                if 'estonian_name' not in item or not item.get('estonian_name'):
-                    item['estonian_name'] = get_estonian_name(item.get('scientific_name'), item.get('common_names'))
-            except Exception:
-                pass
+
+        _add_estonian_names(species_data)
         return species_data
-    
+
     except HTTPException:
         # Edasta HTTP erandid muutmata kujul
         raise
@@ -265,10 +225,10 @@ async def identify_existing_photo(
         # Edasta viga kasutajale
         raise HTTPException(status_code=500, detail=f"Taimetuvastamine ebaõnnestus: {str(e)}")
 
-@router.post("/batch", response_model=List[dict])
+@router.post("/batch", response_model=Dict[str, Any])
 async def identify_batch_photos(
     photo_ids: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = None
 ):
     """
@@ -276,124 +236,59 @@ async def identify_batch_photos(
     """
     # Kui API võtit ei ole otseselt määratud, loe see seadistustest
     if not api_key:
-        api_key = get_api_key_from_settings()
-    
+        api_key = await get_api_key_from_settings()
+
     if not photo_ids or not isinstance(photo_ids, dict) or not "photo_ids" in photo_ids:
         raise HTTPException(status_code=400, detail="Fotode ID-d peavad olema esitatud nimekirjana võtme 'photo_ids' all")
-    
+
     ids = photo_ids.get("photo_ids", [])
     if not ids or not isinstance(ids, list):
         raise HTTPException(status_code=400, detail="Fotode ID-de nimekiri peab olema mittetühi massiiv")
-    
+
     results = []
     errors = []
-    
+
     logger.info(f"Alustan {len(ids)} foto massilist tuvastamist")
-    
+
     for photo_id in ids:
         try:
             # Kontrolli, kas foto eksisteerib
-            db_photo = photo_service.get_photo(db, photo_id=photo_id)
+            db_photo = await db.run_sync(photo_service.get_photo, photo_id=photo_id)
             if not db_photo:
                 errors.append({"photo_id": photo_id, "error": "Fotot ei leitud"})
                 continue
-            else:
-                file_path = db_photo.file_path
-            
+            file_path = db_photo["file_path"] if isinstance(db_photo, dict) else db_photo.file_path
+
             if not os.path.exists(file_path):
                 errors.append({"photo_id": photo_id, "error": f"Faili ei leitud: {file_path}"})
                 continue
-            
-            # Initsialiseeri taimetuvastuse klient
-            plant_id_client = PlantIdClient(api_key=api_key, use_simulation=False)
-            logger.info(f"Plant ID Client initsialiseeritud foto ID-ga {photo_id}")
-            
+
             # Tuvasta taimed pildil
             try:
-                identification_result = plant_id_client.identify_plant(file_path)
+                species_data = await run_in_threadpool(_identify, api_key, file_path)
             except Exception as e:
                 # Kui viga on seotud API võtmega, saada vastav teade
                 if "API võti puudub" in str(e):
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Taimetuvastuse jaoks on vaja seadistada Plant.ID API võti administreerimislehel."
-                    )
-                else:
-                    errors.append({"photo_id": photo_id, "error": str(e)})
-                    continue
-                    
-            logger.info(f"Olemasoleva foto (ID: {photo_id}) tuvastamine õnnestus")
-            
-            # Ekstrakteeri struktureeritud liikide andmed
-            species_data = plant_id_client.extract_species_data(identification_result)
-            # Lisa eestikeelne nimi
-            for item in species_data:
-                try:
-                    if 'estonian_name' not in item or not item.get('estonian_name'):
-                        item['estonian_name'] = get_estonian_name(item.get('scientific_name'), item.get('common_names'))
-                except Exception:
-                    pass
+                    raise HTTPException(status_code=400, detail=API_KEY_MISSING)
+                errors.append({"photo_id": photo_id, "error": str(e)})
+                continue
+
+            _add_estonian_names(species_data)
             logger.info(f"Tuvastati {len(species_data)} liiki fotol ID: {photo_id}")
-            
-            # Eemalda vanad seosed, kui need eksisteerivad
-            existing_relations = db.query(PhotoSpeciesRelation).filter_by(photo_id=photo_id).all()
-            if existing_relations:
-                for relation in existing_relations:
-                    db.delete(relation)
-                db.commit()
-                logger.info(f"Eemaldatud {len(existing_relations)} vana seost fotole ID: {photo_id}")
-            
-            # Salvesta tuvastatud liigid ja seosed fotoga
-            if species_data:
-                for i, species_info in enumerate(species_data):
-                    if species_info["probability"] > 0.5:  # Salvesta kõik piisavalt suure tõenäosusega liigid
-                        # Kontrolli, kas liik on juba andmebaasis
-                        existing_species = db.query(Species).filter_by(
-                            scientific_name=species_info["scientific_name"]
-                        ).first()
-                        
-                        # Kui ei ole, loo uus liigi kirje
-                        if not existing_species:
-                            common_name = species_info["common_names"][0] if species_info["common_names"] else None
-                            est_name = get_estonian_name(species_info["scientific_name"], species_info.get("common_names"))
-                            db_species = species_service.create_species(
-                                db,
-                                scientific_name=species_info["scientific_name"],
-                                common_name=common_name,
-                                family=species_info["family"],
-                                estonian_name=est_name
-                            )
-                            # Töötle nii sõnastikku kui objekti
-                            if isinstance(db_species, dict):
-                                species_id = db_species.get("id")
-                            else:
-                                species_id = db_species.id
-                            logger.info(f"Uus liik salvestatud ID-ga: {species_id}")
-                        else:
-                            species_id = existing_species.id
-                            logger.info(f"Olemasolev liik leitud ID-ga: {species_id}")
-                        
-                        # Loo seos foto ja liigi vahel
-                        category = "primary" if i == 0 else "secondary"
-                        relation = relation_service.create_relation(
-                            db,
-                            photo_id=photo_id,
-                            species_id=species_id,
-                            category=category
-                        )
-                        logger.info(f"Loodud seos foto ID {photo_id} ja liigi ID {species_id} vahel, kategooria: {category}")
-            
+
+            await db.run_sync(_save_identified_species, photo_id, species_data)
             results.append({"photo_id": photo_id, "species": species_data, "success": True})
-            
-        except HTTPException as http_ex:
+
+        except HTTPException:
             # HTTP erandid tuleb edastada
             raise
         except Exception as e:
             logger.error(f"Viga foto {photo_id} töötlemisel: {str(e)}")
+            await db.rollback()
             errors.append({"photo_id": photo_id, "error": str(e)})
-    
+
     # Kui kõik päringud ebaõnnestusid ja oli vähemalt üks päring
     if len(errors) == len(ids) and len(ids) > 0:
         raise HTTPException(status_code=500, detail=f"Kõik tuvastamised ebaõnnestusid: {errors}")
-    
-    return {"results": results, "errors": errors}
\ No newline at end of file
+
+    return {"results": results, "errors": errors}
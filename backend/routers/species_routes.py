@@ -2,13 +2,14 @@
 API routes for species operations.
 Provides endpoints for CRUD operations on species.
 """
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from database import get_db
-from services import species_service
-from models.species_models import Species
+from database import get_db, get_read_db
+from services import species_service, version_service
+from utils.http_cache import check_not_modified, query_string_key
+from models.species_models import Species, SpeciesResponse
 
 router = APIRouter(
     prefix="/species",
@@ -16,24 +17,46 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.get("/", response_model=List[dict])
-def read_species(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[SpeciesResponse])
+def read_species(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    sort: str = Query("id", description="Järjestus: id, name, photo_count, first_observed või last_observed"),
+    min_photos: Optional[int] = Query(None, ge=0, description="Ainult liigid, millel on vähemalt nii mitu fotot"),
+    observed_since: Optional[str] = Query(None, description="Ainult liigid, mida on pildistatud sellest kuupäevast alates"),
+    db: Session = Depends(get_read_db)
+):
     """
-    Retrieve a list of species with pagination.
+    Retrieve a list of species with photo counts and cover photos, with pagination.
+    Answers 304 Not Modified when If-None-Match holds the current ETag.
     """
-    return species_service.get_species(db, skip=skip, limit=limit)
+    etag = version_service.collection_etag(db, version_service.SPECIES, query_string_key(request))
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    try:
+        return species_service.get_species(db, skip=skip, limit=limit, sort=sort,
+                                           min_photos=min_photos, observed_since=observed_since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/{species_id}", response_model=dict)
-def read_species_by_id(species_id: int, db: Session = Depends(get_db)):
+@router.get("/{species_id}", response_model=SpeciesResponse)
+def read_species_by_id(species_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
     """
     Retrieve a specific species by ID.
+    Answers 304 Not Modified when If-None-Match holds the current ETag.
     """
+    not_modified = check_not_modified(request, response, version_service.species_etag(db, species_id))
+    if not_modified:
+        return not_modified
     db_species = species_service.get_species_by_id(db, species_id=species_id)
     if db_species is None:
         raise HTTPException(status_code=404, detail="Species not found")
     return db_species
 
-@router.post("/", response_model=dict)
+@router.post("/", response_model=SpeciesResponse)
 def create_species(
     scientific_name: str = Body(...), 
     common_name: Optional[str] = Body(None), 
@@ -50,7 +73,7 @@ def create_species(
         family=family
     )
 
-@router.put("/{species_id}", response_model=dict)
+@router.put("/{species_id}", response_model=SpeciesResponse)
 def update_species(
     species_id: int, 
     scientific_name: Optional[str] = Body(None), 
@@ -0,0 +1,161 @@
+"""
+Map cluster service module containing server-side clustering of geotagged photos.
+
+Photos are aggregated per web map tile (Web Mercator z/x/y) into a fixed grid
+of cells. Each tile's clusters are cached and invalidated when a photo with
+coordinates in that tile is created, moved or deleted.
+"""
+import math
+import logging
+from typing import List, Optional, Dict, Any, Tuple
+
+from sqlalchemy import func, and_
+from sqlalchemy.orm import Session
+
+from models.photo_models import Photo
+from models.relation_models import PhotoSpeciesRelation
+from services.photo_filters import bbox_condition
+from utils.cache import TTLCache, MISSING
+from utils.geo_utils import parse_bbox, split_antimeridian
+
+logger = logging.getLogger(__name__)
+
+MAX_ZOOM = 20
+# Cells per tile side; 8 gives 32 px cells on 256 px map tiles
+GRID_SIZE = 8
+# Largest number of tiles a single request may cover
+MAX_TILES = 64
+# Latitude limit of the Web Mercator projection
+MAX_MERCATOR_LAT = 85.05112878
+
+_tile_cache = TTLCache(max_entries=4096, ttl=600, name="map_clusters")
+
+def _tile_xy(latitude: float, longitude: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator tile containing a coordinate."""
+    n = 1 << zoom
+    latitude = max(min(latitude, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    lat_rad = math.radians(latitude)
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def _tile_bounds(zoom: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Bounding box (south, west, north, east) of a Web Mercator tile."""
+    n = 1 << zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+def _tiles_for_bbox(bbox: str, zoom: int) -> List[Tuple[int, int]]:
+    """
+    List the tiles covering a bbox parameter.
+
+    Raises:
+        ValueError: If the bbox is malformed or covers too many tiles
+    """
+    tiles = []
+    for south, west, north, east in split_antimeridian(parse_bbox(bbox)):
+        min_x, min_y = _tile_xy(north, west, zoom)
+        max_x, max_y = _tile_xy(south, east, zoom)
+        tiles.extend((x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1))
+        if len(tiles) > MAX_TILES:
+            raise ValueError(f"Kaardivaade katab liiga palju ruute ({MAX_TILES} lubatud), suurenda suumi")
+    return tiles
+
+def _compute_tile_clusters(db: Session, zoom: int, x: int, y: int,
+                           species_id: Optional[int]) -> List[Dict[str, Any]]:
+    """Aggregate the photos of one tile into grid cells with a single grouped query."""
+    south, west, north, east = _tile_bounds(zoom, x, y)
+    cell_width = (east - west) / GRID_SIZE
+    cell_height = (north - south) / GRID_SIZE
+    cell_x = func.least(func.floor((Photo.gps_longitude - west) / cell_width), GRID_SIZE - 1)
+    cell_y = func.least(func.floor((Photo.gps_latitude - south) / cell_height), GRID_SIZE - 1)
+
+    conditions = [bbox_condition((south, west, north, east))]
+    # Half-open tiles, so a photo on a shared edge is counted once
+    if x < (1 << zoom) - 1:
+        conditions.append(Photo.gps_longitude < east)
+    if y > 0:
+        conditions.append(Photo.gps_latitude < north)
+    if species_id:
+        conditions.append(Photo.species.any(PhotoSpeciesRelation.species_id == species_id))
+
+    rows = (
+        db.query(
+            func.count(Photo.id),
+            func.avg(Photo.gps_latitude),
+            func.avg(Photo.gps_longitude),
+            func.min(Photo.id)
+        )
+        .filter(and_(*conditions))
+        .group_by(cell_x, cell_y)
+        .all()
+    )
+    return [
+        {
+            "count": count,
+            "latitude": latitude,
+            "longitude": longitude,
+            "sample_photo_id": sample_photo_id
+        }
+        for count, latitude, longitude, sample_photo_id in rows
+    ]
+
+def get_clusters(db: Session, bbox: str, zoom: int, species_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Get photo clusters for a map viewport.
+
+    Args:
+        db: Database session
+        bbox: Viewport "min_lon,min_lat,max_lon,max_lat"
+        zoom: Map zoom level (0-20)
+        species_id: Optional filter by species ID
+
+    Returns:
+        Dictionary with the zoom level and a list of clusters, each with
+        count, centroid latitude/longitude and a sample photo id
+
+    Raises:
+        ValueError: If the parameters are invalid
+    """
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f"zoom peab olema vahemikus 0 kuni {MAX_ZOOM}")
+
+    clusters = []
+    for x, y in _tiles_for_bbox(bbox, zoom):
+        key = (zoom, x, y, species_id)
+        tile_clusters = _tile_cache.get(key)
+        if tile_clusters is MISSING:
+            # Read before the query, so a write committed meanwhile prevents storing stale clusters
+            generation = _tile_cache.generation
+            tile_clusters = _compute_tile_clusters(db, zoom, x, y, species_id)
+            _tile_cache.set(key, tile_clusters, if_generation=generation)
+        clusters.extend(tile_clusters)
+
+    return {"zoom": zoom, "clusters": clusters}
+
+def invalidate_point(latitude: Optional[float], longitude: Optional[float]) -> None:
+    """
+    Drop cached clusters of every tile containing a coordinate.
+
+    Args:
+        latitude: Latitude of a created, moved or deleted photo
+        longitude: Longitude of a created, moved or deleted photo
+    """
+    if latitude is None or longitude is None:
+        return
+    tiles = {(zoom, *_tile_xy(latitude, longitude, zoom)) for zoom in range(MAX_ZOOM + 1)}
+    removed = _tile_cache.invalidate(lambda key: key[:3] in tiles)
+    if removed:
+        logger.debug(f"Eemaldatud {removed} klastrite vahemälu kirjet punkti {latitude}, {longitude} jaoks")
+
+def invalidate_species(species_id: int) -> None:
+    """
+    Drop cached clusters filtered by a species whose photo relations changed.
+
+    Args:
+        species_id: ID of the species
+    """
+    _tile_cache.invalidate(lambda key: key[3] == species_id)
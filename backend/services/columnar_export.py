@@ -0,0 +1,203 @@
+"""
+Columnar export module writing the photo catalog as Parquet or Arrow.
+
+Rows from export_service.iter_row_batches are converted batch by batch into
+Arrow record batches, so each server-side cursor batch becomes one Parquet
+row group and memory use does not grow with the catalog. GPS values are
+typed floats, the capture time a UTC timestamp, and the repetitive text
+columns (species names, family, camera) are dictionary encoded.
+
+Requires the optional pyarrow package.
+"""
+import logging
+from datetime import datetime
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+# Rows per Parquet row group, also used as the cursor batch size
+ROW_GROUP_SIZE = 50000
+# Schema metadata key holding the snapshot time, for delta exports
+SNAPSHOT_KEY = b"snapshot_at"
+
+_DICTIONARY_COLUMNS = (
+    "camera_make", "camera_model", "scientific_name", "common_name",
+    "estonian_name", "family", "relation_category"
+)
+
+def is_available() -> bool:
+    """Whether pyarrow is installed."""
+    return pa is not None
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Parquet/Arrow eksport vajab pyarrow paketti (pip install pyarrow)")
+
+def export_schema(snapshot_at: datetime, since: Optional[datetime] = None) -> "pa.Schema":
+    """
+    Arrow schema of the export, one row per photo and species pair
+    (and, in delta exports, one tombstone row per deleted photo).
+
+    Args:
+        snapshot_at: Time of the snapshot, stored in the schema metadata
+        since: Snapshot time a delta export starts from, if any
+
+    Returns:
+        Arrow schema
+    """
+    _require_pyarrow()
+    text = pa.dictionary(pa.int32(), pa.string())
+    metadata = {SNAPSHOT_KEY: snapshot_at.isoformat().encode("utf-8")}
+    if since is not None:
+        metadata[b"since"] = since.isoformat().encode("utf-8")
+    return pa.schema([
+        ("photo_id", pa.int64()),
+        ("file_path", pa.string()),
+        ("date", pa.string()),
+        ("taken_at", pa.timestamp("us", tz="UTC")),
+        ("location", pa.string()),
+        ("gps_latitude", pa.float64()),
+        ("gps_longitude", pa.float64()),
+        ("gps_altitude", pa.float64()),
+        ("camera_make", text),
+        ("camera_model", text),
+        ("species_id", pa.int64()),
+        ("scientific_name", text),
+        ("common_name", text),
+        ("estonian_name", text),
+        ("family", text),
+        ("relation_category", text),
+        ("deleted", pa.bool_()),
+    ], metadata=metadata)
+
+def to_record_batch(rows: List[tuple], schema: "pa.Schema") -> "pa.RecordBatch":
+    """
+    Convert flat export rows (in schema column order) into a record batch.
+
+    Args:
+        rows: Row tuples from export_service.iter_row_batches
+        schema: Schema from export_schema
+
+    Returns:
+        Arrow record batch
+    """
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.name in _DICTIONARY_COLUMNS:
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+class _ChunkSink:
+    """Write-only file object collecting written bytes until they are taken."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _open_writer(sink: Any, export_format: str, schema: "pa.Schema"):
+    if export_format == "arrow":
+        # The stream format allows a new dictionary for every batch
+        return pa.ipc.new_stream(sink, schema)
+    return pq.ParquetWriter(sink, schema, compression="zstd", use_dictionary=list(_DICTIONARY_COLUMNS))
+
+def write_batches(sink: BinaryIO, batches: Iterable[List[tuple]], export_format: str,
+                  snapshot_at: datetime, since: Optional[datetime] = None) -> int:
+    """
+    Write row batches to a file as Parquet or Arrow IPC stream.
+
+    Args:
+        sink: Binary file object or path
+        batches: Row batches from export_service.iter_row_batches
+        export_format: "parquet" or "arrow"
+        snapshot_at: Time of the snapshot, stored in the file metadata
+        since: Snapshot time a delta export starts from, if any
+
+    Returns:
+        Number of exported rows
+    """
+    schema = export_schema(snapshot_at, since)
+    rows = 0
+    with _open_writer(sink, export_format, schema) as writer:
+        for batch in batches:
+            writer.write_batch(to_record_batch(batch, schema))
+            rows += len(batch)
+    return rows
+
+def iter_columnar(batches: Iterable[List[tuple]], export_format: str,
+                  snapshot_at: datetime, since: Optional[datetime] = None) -> Iterator[bytes]:
+    """
+    Stream row batches as Parquet or Arrow IPC stream bytes.
+
+    Each batch is encoded and sent as soon as it is fetched; a Parquet
+    file's footer follows the last row group.
+
+    Args:
+        batches: Row batches from export_service.iter_row_batches
+        export_format: "parquet" or "arrow"
+        snapshot_at: Time of the snapshot, stored in the file metadata
+        since: Snapshot time a delta export starts from, if any
+
+    Yields:
+        Encoded file chunks
+    """
+    schema = export_schema(snapshot_at, since)
+    sink = _ChunkSink()
+    writer = _open_writer(pa.PythonFile(sink, mode="w"), export_format, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(to_record_batch(batch, schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+def read_snapshot_time(path: str) -> Optional[datetime]:
+    """
+    Read the snapshot time of an earlier export, to start a delta export from it.
+
+    Args:
+        path: Path of a Parquet or Arrow export
+
+    Returns:
+        Snapshot time, or None if the file has none
+    """
+    _require_pyarrow()
+    if path.endswith(".arrow"):
+        with pa.ipc.open_stream(path) as reader:
+            metadata = reader.schema.metadata or {}
+    else:
+        metadata = pq.read_schema(path).metadata or {}
+    value = metadata.get(SNAPSHOT_KEY)
+    return datetime.fromisoformat(value.decode("utf-8")) if value else None
@@ -0,0 +1,235 @@
+"""
+Export service module containing the streaming catalog export.
+
+All photos with their species are read with one joined query through a
+server-side cursor (stream_results/yield_per), so memory use stays constant
+however large the catalog is, and are written out as NDJSON or CSV chunks
+or, through columnar_export, as Parquet or Arrow.
+
+A delta export (since a snapshot) has the current rows of every photo changed
+after the snapshot, which replace all earlier rows of that photo, followed by
+one tombstone row (deleted true, other columns empty) per photo deleted after
+it. Relation changes touch the photo, so removed species are seen as well.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models.photo_models import Photo
+from models.deletion_models import DeletedPhoto
+from models.species_models import Species
+from models.relation_models import PhotoSpeciesRelation
+from services import columnar_export
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ndjson", "csv") + columnar_export.COLUMNAR_FORMATS
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 1000
+# Changes are exported again for this long after a snapshot, so writes whose
+# transaction started before the snapshot but committed after it are not lost
+SNAPSHOT_OVERLAP = timedelta(minutes=5)
+
+PHOTO_FIELDS = (
+    "id", "file_path", "date", "taken_at", "location",
+    "gps_latitude", "gps_longitude", "gps_altitude", "camera_make", "camera_model"
+)
+SPECIES_FIELDS = ("species_id", "scientific_name", "common_name", "estonian_name", "family", "relation_category")
+CSV_FIELDS = PHOTO_FIELDS + SPECIES_FIELDS + ("deleted",)
+
+def changed_since_condition(since: datetime):
+    """
+    Condition for photos changed after a snapshot time.
+
+    Relation changes update the photo's updated_at, species changes are
+    found through the related species rows.
+    """
+    since = since - SNAPSHOT_OVERLAP
+    return or_(
+        Photo.updated_at > since,
+        Photo.species.any(PhotoSpeciesRelation.species.has(Species.updated_at > since))
+    )
+
+def _deleted_statement(since: datetime):
+    """IDs of the photos deleted after a snapshot time."""
+    return (
+        select(DeletedPhoto.photo_id)
+        .where(DeletedPhoto.deleted_at > since - SNAPSHOT_OVERLAP)
+        .order_by(DeletedPhoto.photo_id)
+    )
+
+def _export_statement(since: Optional[datetime] = None):
+    """One row per photo and species relation, photos without species included once."""
+    statement = (
+        select(
+            Photo.id, Photo.file_path, Photo.date, Photo.taken_at, Photo.location,
+            Photo.gps_latitude, Photo.gps_longitude, Photo.gps_altitude,
+            Photo.camera_make, Photo.camera_model,
+            Species.id, Species.scientific_name, Species.common_name, Species.estonian_name,
+            Species.family, PhotoSpeciesRelation.category
+        )
+        .select_from(Photo)
+        .outerjoin(PhotoSpeciesRelation, PhotoSpeciesRelation.photo_id == Photo.id)
+        .outerjoin(Species, Species.id == PhotoSpeciesRelation.species_id)
+        .order_by(Photo.id, PhotoSpeciesRelation.id)
+    )
+    if since is not None:
+        statement = statement.where(changed_since_condition(since))
+    return statement
+
+def iter_row_batches(db: Session, batch_size: int = EXPORT_BATCH_SIZE,
+                     since: Optional[datetime] = None) -> Iterator[List[tuple]]:
+    """
+    Stream the flat export rows in batches from a server-side cursor.
+
+    Args:
+        db: Database session
+        batch_size: Rows fetched per round trip
+        since: Optional snapshot time; only photos changed after it are
+               exported, followed by tombstones of the photos deleted after it
+
+    Yields:
+        Lists of row tuples in CSV_FIELDS order, ordered by photo ID (tombstones last)
+    """
+    result = db.execute(
+        _export_statement(since),
+        execution_options={"stream_results": True, "yield_per": batch_size}
+    )
+    for partition in result.partitions():
+        yield [tuple(row) + (False,) for row in partition]
+    if since is None:
+        return
+    empty = (None,) * (len(CSV_FIELDS) - 2)
+    result = db.execute(
+        _deleted_statement(since),
+        execution_options={"stream_results": True, "yield_per": batch_size}
+    )
+    for partition in result.partitions():
+        yield [(photo_id,) + empty + (True,) for (photo_id,) in partition]
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type {type(value).__name__} is not JSON serializable")
+
+def _photo_documents(batch: List[tuple], current: Optional[Dict[str, Any]]):
+    """
+    Group consecutive flat rows into one document per photo.
+
+    Returns the completed documents and the last, possibly still incomplete
+    photo, whose species may continue in the next batch. A tombstone row
+    becomes {"id": ..., "deleted": true}.
+    """
+    completed = []
+    for row in batch:
+        if current is None or current["id"] != row[0]:
+            if current is not None:
+                completed.append(current)
+            if row[-1]:
+                current = {"id": row[0], "deleted": True}
+                continue
+            current = dict(zip(PHOTO_FIELDS, row[:len(PHOTO_FIELDS)]))
+            current["species"] = []
+        species = row[len(PHOTO_FIELDS):]
+        if species[0] is not None:
+            current["species"].append({
+                "id": species[0],
+                "scientific_name": species[1],
+                "common_name": species[2],
+                "estonian_name": species[3],
+                "family": species[4],
+                "relation_category": species[5]
+            })
+    return completed, current
+
+def iter_ndjson(db: Session, since: Optional[datetime] = None) -> Iterator[bytes]:
+    """
+    Stream the catalog as NDJSON, one photo with its species per line.
+
+    Args:
+        db: Database session
+        since: Optional snapshot time for a delta export
+
+    Yields:
+        Encoded chunks of complete lines
+    """
+    current = None
+    for batch in iter_row_batches(db, since=since):
+        completed, current = _photo_documents(batch, current)
+        if completed:
+            yield "".join(json.dumps(doc, ensure_ascii=False, default=_json_default) + "\n"
+                          for doc in completed).encode("utf-8")
+    if current is not None:
+        yield (json.dumps(current, ensure_ascii=False, default=_json_default) + "\n").encode("utf-8")
+
+def iter_csv(db: Session, since: Optional[datetime] = None) -> Iterator[bytes]:
+    """
+    Stream the catalog as CSV, one row per photo and species pair.
+
+    Photos without species have one row with empty species columns.
+
+    Args:
+        db: Database session
+        since: Optional snapshot time for a delta export
+
+    Yields:
+        Encoded chunks of complete CSV rows, starting with the header
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    # Send the header before the first batch is fetched
+    yield buffer.getvalue().encode("utf-8")
+    for batch in iter_row_batches(db, since=since):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in batch
+        )
+        yield buffer.getvalue().encode("utf-8")
+
+def snapshot_time() -> datetime:
+    """Current time as the snapshot time of an export."""
+    return datetime.now(timezone.utc)
+
+def stream_export(export_format: str, since: Optional[datetime] = None,
+                  snapshot_at: Optional[datetime] = None) -> Iterator[bytes]:
+    """
+    Stream the catalog export with a session of its own.
+
+    The response body is produced after the request handler has returned,
+    so the export cannot use the request's session.
+
+    Args:
+        export_format: "ndjson", "csv", "parquet" or "arrow"
+        since: Optional snapshot time; only photos changed after it are exported
+        snapshot_at: Snapshot time stored in Parquet/Arrow metadata
+
+    Yields:
+        Encoded export chunks
+    """
+    db = SessionLocal()
+    try:
+        if export_format in columnar_export.COLUMNAR_FORMATS:
+            chunks = columnar_export.iter_columnar(
+                iter_row_batches(db, columnar_export.ROW_GROUP_SIZE, since),
+                export_format, snapshot_at or snapshot_time(), since
+            )
+        elif export_format == "csv":
+            chunks = iter_csv(db, since)
+        else:
+            chunks = iter_ndjson(db, since)
+        yield from chunks
+    except Exception as e:
+        logger.error(f"Viga kataloogi eksportimisel: {str(e)}")
+        raise
+    finally:
+        db.close()
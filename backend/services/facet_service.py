@@ -0,0 +1,153 @@
+"""
+Facet service module containing the filter sidebar counts of the browse page.
+
+Photo counts per species, family, camera model and capture year are computed
+with a single GROUPING SETS query over photos, photo_species_relation and
+species, and cached for a short time per normalized filter set.
+"""
+import logging
+from typing import List, Optional, Dict, Any, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from models.photo_models import Photo
+from models.species_models import Species
+from models.relation_models import PhotoSpeciesRelation
+from services.photo_filters import apply_photo_filters
+from services.search_service import text_search_condition
+from utils.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+FACETS = ("species", "family", "camera_model", "year")
+# Largest number of values returned per facet
+MAX_FACET_VALUES = 100
+
+# Short time to live, so new uploads show up in the counts without invalidation
+_facet_cache = TTLCache(max_entries=512, ttl=30, name="photo_facets")
+
+def _normalize_filters(filters: Dict[str, Any]) -> Tuple:
+    """
+    Build a cache key from the filter values.
+
+    Empty values are dropped and text filters are stripped and lower-cased,
+    as all text filters are case-insensitive.
+    """
+    normalized = []
+    for name, value in filters.items():
+        if isinstance(value, str):
+            value = value.strip()
+            if name in ("species_name", "location", "q"):
+                value = value.lower()
+        if value is None or value == "":
+            continue
+        normalized.append((name, value))
+    return tuple(sorted(normalized))
+
+def _compute_facets(db: Session, q: Optional[str], filters: Dict[str, Any],
+                    limit: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Count the filtered photos per facet value with one grouped query."""
+    year = func.date_part("year", func.timezone("UTC", Photo.taken_at))
+    species_columns = (Species.id, Species.scientific_name, Species.common_name, Species.estonian_name)
+
+    query = (
+        db.query(
+            *species_columns,
+            Species.family,
+            Photo.camera_model,
+            year,
+            func.grouping(Species.id).label("by_species"),
+            func.grouping(Species.family).label("by_family"),
+            func.grouping(Photo.camera_model).label("by_camera_model"),
+            func.grouping(year).label("by_year"),
+            # A photo with several species joins to several rows
+            func.count(Photo.id.distinct())
+        )
+        .select_from(Photo)
+        .outerjoin(PhotoSpeciesRelation, PhotoSpeciesRelation.photo_id == Photo.id)
+        .outerjoin(Species, Species.id == PhotoSpeciesRelation.species_id)
+    )
+    query = apply_photo_filters(query, **filters)
+    if q:
+        query = query.filter(text_search_condition(q))
+    query = query.group_by(func.grouping_sets(
+        tuple_(*species_columns),
+        tuple_(Species.family),
+        tuple_(Photo.camera_model),
+        tuple_(year)
+    ))
+
+    facets: Dict[str, List[Dict[str, Any]]] = {name: [] for name in FACETS}
+    for (species_id, scientific_name, common_name, estonian_name, family, camera_model, taken_year,
+         by_species, by_family, by_camera_model, by_year, count) in query.all():
+        # GROUPING() on 0 tähendab, et rida kuulub selle veeru grupeerimiskomplekti
+        if by_species == 0 and species_id is not None:
+            facets["species"].append({
+                "id": species_id,
+                "scientific_name": scientific_name,
+                "common_name": common_name,
+                "estonian_name": estonian_name,
+                "count": count
+            })
+        elif by_family == 0 and family:
+            facets["family"].append({"value": family, "count": count})
+        elif by_camera_model == 0 and camera_model:
+            facets["camera_model"].append({"value": camera_model, "count": count})
+        elif by_year == 0 and taken_year is not None:
+            facets["year"].append({"value": int(taken_year), "count": count})
+
+    for name in ("species", "family", "camera_model"):
+        facets[name].sort(key=lambda item: -item["count"])
+        del facets[name][limit:]
+    facets["year"].sort(key=lambda item: item["value"], reverse=True)
+    return facets
+
+def get_facets(
+    db: Session,
+    species_id: Optional[int] = None,
+    species_name: Optional[str] = None,
+    location: Optional[str] = None,
+    date: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    bbox: Optional[str] = None,
+    near: Optional[str] = None,
+    radius: Optional[float] = None,
+    q: Optional[str] = None,
+    limit: int = MAX_FACET_VALUES
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get photo counts per species, family, camera model and capture year.
+
+    Takes the same filters as photo_service.get_photos, so the counts
+    describe the photos of the current listing.
+
+    Args:
+        db: Database session
+        species_id ... radius: Listing filters, see apply_photo_filters
+        q: Optional free text search query
+        limit: Maximum number of values per facet, most frequent first
+
+    Returns:
+        Dictionary with the lists "species", "family", "camera_model" and
+        "year"; every entry has a count of matching photos
+
+    Raises:
+        ValueError: If a filter value is invalid
+    """
+    if not 1 <= limit <= MAX_FACET_VALUES:
+        raise ValueError(f"limit peab olema vahemikus 1 kuni {MAX_FACET_VALUES}")
+    filters = {
+        "species_id": species_id, "species_name": species_name, "location": location,
+        "date": date, "date_from": date_from, "date_to": date_to, "month": month, "year": year,
+        "bbox": bbox, "near": near, "radius": radius if near else None
+    }
+    key = _normalize_filters({**filters, "q": q, "limit": limit})
+    facets = _facet_cache.get(key)
+    if facets is MISSING:
+        facets = _compute_facets(db, q.strip() if q else None, filters, limit)
+        _facet_cache.set(key, facets)
+    return facets
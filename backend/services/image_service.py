@@ -0,0 +1,80 @@
+"""
+Image service module resizing photos on demand.
+
+Resized images are made from the original in the file storage on the first
+request and kept in a size-bounded disk cache, so responsive srcset widths
+do not need to be generated in advance. Concurrent requests for the same
+size are coalesced into one decode.
+"""
+import os
+from typing import Optional
+
+from PIL import Image
+from sqlalchemy.orm import Session
+
+from models.photo_models import Photo
+from utils.disk_cache import DiskLRUCache
+from utils.file_storage import FILE_STORAGE_PATH
+from utils.renditions import RENDITION_FORMATS, open_scaled, save_image
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(FILE_STORAGE_PATH, "resized"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Largest width or height that may be requested
+MAX_DIMENSION = 4096
+
+# Response media types by format
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+_image_cache = DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, name="resized_images")
+
+def _resize(file_path: str, width: Optional[int], height: Optional[int], fmt: str, output_path: str) -> None:
+    """Write the image fitted into width x height (never upscaled) to output_path."""
+    image = open_scaled(file_path, width, height)
+    image.thumbnail((width or image.width, height or image.height), Image.Resampling.LANCZOS)
+    save_image(image, output_path, fmt)
+
+def get_resized_image(db: Session, photo_id: int, width: Optional[int] = None,
+                      height: Optional[int] = None, fmt: str = "jpeg") -> Optional[str]:
+    """
+    Path of a photo resized to fit into width x height, creating it if needed.
+
+    The file is pinned in the cache, so it is not evicted before the
+    response has sent it; pass the path to release_resized_image afterwards.
+
+    Args:
+        db: Database session
+        photo_id: ID of the photo
+        width: Maximum width in pixels (optional if height is given)
+        height: Maximum height in pixels (optional if width is given)
+        fmt: Output format, one of RENDITION_FORMATS
+
+    Returns:
+        Path of the resized image file, or None if the photo or its file does not exist
+
+    Raises:
+        ValueError: If the size or format is invalid, or the file is not a readable image
+    """
+    if not width and not height:
+        raise ValueError("Anna vähemalt üks parameetritest w või h")
+    for value in (width, height):
+        if value is not None and not 1 <= value <= MAX_DIMENSION:
+            raise ValueError(f"Laius ja kõrgus peavad olema vahemikus 1-{MAX_DIMENSION}")
+    if fmt not in RENDITION_FORMATS:
+        raise ValueError(f"Tundmatu vorming: {fmt}. Lubatud: {', '.join(RENDITION_FORMATS)}")
+
+    file_path = db.query(Photo.file_path).filter(Photo.id == photo_id).scalar()
+    if not file_path or not os.path.exists(file_path):
+        return None
+    try:
+        return _image_cache.get_or_create(
+            (file_path, width, height, fmt),
+            lambda output_path: _resize(file_path, width, height, fmt, output_path),
+            suffix=f".{fmt}",
+            pin=True
+        )
+    except OSError as e:
+        raise ValueError(f"Pilti ei õnnestunud töödelda: {e}")
+
+def release_resized_image(path: str) -> None:
+    """Allow a file returned by get_resized_image to be evicted again."""
+    _image_cache.release(path)
@@ -0,0 +1,110 @@
+"""
+Metadata memo shared by the metadata preview and the upload.
+
+The uploader first sends the leading bytes of a file to
+POST /photos/extract-metadata and then uploads the whole file. The preview
+keeps the extracted metadata under a token naming the bytes it was read
+from, "<length>-<sha256 of those bytes>", and returns the token; the upload
+hashes the same leading bytes of the uploaded file, so a token only matches
+the file it was made for, and reuses the metadata instead of extracting it
+again. Without a token the upload looks for the whole file's content hash
+(computed anyway, see utils.file_storage), which is the token of a preview
+that was sent the whole file.
+
+The memo is per process; with several worker processes a preview and its
+upload may be served by different processes and then simply miss.
+"""
+import hashlib
+import os
+import threading
+from typing import Any, BinaryIO, Dict, Optional
+
+from utils.cache import MISSING, TTLCache, register_cache
+
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "3600"))
+METADATA_CACHE_MAX_ENTRIES = int(os.getenv("METADATA_CACHE_MAX_ENTRIES", "2048"))
+
+class MetadataMemo:
+    """TTL and LRU bounded memo of extracted metadata, counting the exiftool runs it saves."""
+
+    def __init__(self, max_entries: int = METADATA_CACHE_MAX_ENTRIES, ttl: float = METADATA_CACHE_TTL):
+        # token -> (metadata, whether exiftool extracted it)
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+        self._exiftool_runs_saved = 0
+
+    def remember(self, data: bytes, metadata: Dict[str, Any], exiftool: bool = False) -> str:
+        """
+        Keep metadata extracted from data.
+
+        Args:
+            data: The bytes the metadata was read from (a file or its leading bytes)
+            metadata: Metadata as returned by exif_reader
+            exiftool: Whether exiftool extracted it (rather than the header parser)
+
+        Returns:
+            Token for lookup
+        """
+        token = make_token(data)
+        self._cache.set(token, (metadata, exiftool))
+        return token
+
+    def lookup(self, fileobj: BinaryIO, token: Optional[str], content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadata extracted earlier from an uploaded file.
+
+        Args:
+            fileobj: Seekable uploaded file; its position is kept
+            token: Token returned by the preview (optional)
+            content_hash: SHA-256 of the whole file
+
+        Returns:
+            The metadata, or None if it has to be extracted
+        """
+        if token and _token_matches(fileobj, token):
+            key = token
+        else:
+            key = f"{_size(fileobj)}-{content_hash}"
+        value = self._cache.get(key)
+        if value is MISSING:
+            return None
+        metadata, exiftool = value
+        if exiftool:
+            with self._lock:
+                self._exiftool_runs_saved += 1
+        return metadata
+
+    def stats(self) -> Dict[str, Any]:
+        """Usage counters of the memo; every hit is one metadata extraction saved."""
+        with self._lock:
+            return {**self._cache.stats(), "exiftool_runs_saved": self._exiftool_runs_saved}
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+def make_token(data: bytes) -> str:
+    """Token of the metadata read from data."""
+    return f"{len(data)}-{hashlib.sha256(data).hexdigest()}"
+
+def _size(fileobj: BinaryIO) -> int:
+    start = fileobj.tell()
+    try:
+        return fileobj.seek(0, os.SEEK_END)
+    finally:
+        fileobj.seek(start)
+
+def _token_matches(fileobj: BinaryIO, token: str) -> bool:
+    """Whether the token was made from the leading bytes of fileobj."""
+    length, _, _ = token.partition("-")
+    if not length.isdigit():
+        return False
+    start = fileobj.tell()
+    try:
+        fileobj.seek(0)
+        prefix = fileobj.read(int(length))
+    finally:
+        fileobj.seek(start)
+    return len(prefix) == int(length) and make_token(prefix) == token
+
+metadata_memo = MetadataMemo()
+register_cache("metadata", metadata_memo)
@@ -0,0 +1,104 @@
+"""
+Sparse fieldsets for photo queries.
+
+A fields selection ("id,file_path,species") narrows both the response and the
+SELECT: only the requested photo columns are loaded with load_only, and the
+species relations are not loaded at all unless "species" is requested.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from models.photo_models import Photo
+from models.species_models import Species
+from models.relation_models import PhotoSpeciesRelation
+
+# Fields of a photo in listings and in the detail view, in response order
+LIST_FIELDS = ("id", "file_path", "date", "taken_at", "location", "renditions", "species")
+DETAIL_FIELDS = (
+    "id", "file_path", "date", "taken_at", "location",
+    "gps_latitude", "gps_longitude", "gps_altitude", "camera_make", "camera_model", "renditions", "species"
+)
+
+def parse_fields(fields: Optional[str], allowed: Tuple[str, ...],
+                 required: Tuple[str, ...] = ("id",)) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma separated fields parameter.
+
+    Args:
+        fields: Requested fields, e.g. "id,file_path"; empty or None for all fields
+        allowed: Fields that may be requested
+        required: Fields always included (e.g. "id", needed for caching and cursors)
+
+    Returns:
+        Requested fields in response order, or None for all fields
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not fields or not fields.strip():
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Tundmatud väljad: {', '.join(sorted(unknown))}. Lubatud: {', '.join(allowed)}")
+    requested.update(required)
+    # Fixed order, so equal selections share cache entries and ETags
+    return tuple(name for name in allowed if name in requested)
+
+def photo_load_options(fields: Tuple[str, ...], detail: bool = False, joined: bool = False) -> List[Any]:
+    """
+    Loader options loading only the columns needed for the given fields.
+
+    Args:
+        fields: Selected fields (LIST_FIELDS or DETAIL_FIELDS or a subset)
+        detail: Whether species carry the relation category (detail view)
+        joined: Load species in the same statement (JOIN) instead of
+                two extra SELECT ... IN statements
+
+    Returns:
+        Options for Query.options
+    """
+    options = [load_only(*[getattr(Photo, name) for name in fields if name != "species"])]
+    if "species" in fields:
+        loader = joinedload if joined else selectinload
+        relation_columns = [PhotoSpeciesRelation.photo_id, PhotoSpeciesRelation.species_id]
+        if detail:
+            relation_columns.append(PhotoSpeciesRelation.category)
+        options.append(
+            loader(Photo.species).load_only(*relation_columns)
+            .options(loader(PhotoSpeciesRelation.species).load_only(
+                Species.scientific_name, Species.common_name, Species.family
+            ))
+        )
+    return options
+
+def photo_to_dict(photo: Photo, fields: Tuple[str, ...], detail: bool = False) -> Dict[str, Any]:
+    """
+    Response dictionary of a photo loaded with photo_load_options.
+
+    Args:
+        photo: Photo row
+        fields: Selected fields
+        detail: Whether species carry the relation category and ID
+
+    Returns:
+        Dictionary with the selected fields
+    """
+    data = {name: getattr(photo, name) for name in fields if name != "species"}
+    if "species" in fields:
+        data["species"] = []
+        for relation in photo.species:
+            if relation.species is None:
+                continue
+            species = {
+                "id": relation.species.id,
+                "scientific_name": relation.species.scientific_name,
+                "common_name": relation.species.common_name,
+                "family": relation.species.family
+            }
+            if detail:
+                species["relation_category"] = relation.category
+                species["relation_id"] = relation.id
+            data["species"].append(species)
+    return data
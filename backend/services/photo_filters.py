@@ -0,0 +1,193 @@
+"""
+Photo filter module shared by the photo listing and aggregate queries.
+Builds SQLAlchemy conditions for species, location, capture date and
+geospatial filters and for keyset pagination.
+"""
+import math
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Query
+from typing import Optional, Dict, Any
+
+from models.photo_models import Photo
+from models.relation_models import PhotoSpeciesRelation
+from services.search_service import species_name_condition
+from utils.date_utils import parse_photo_date, parse_date_bound, period_range, month_range, year_range
+from utils.geo_utils import (
+    EARTH_RADIUS_M, BoundingBox, geohash_cover, split_antimeridian, radius_bbox, parse_bbox, parse_point
+)
+
+# Upper limit for the near= radius in meters
+MAX_RADIUS_M = 500000
+
+def taken_month_expression():
+    """Month of the capture time, matching the ix_photos_taken_month index expression."""
+    return func.date_part("month", func.timezone("UTC", Photo.taken_at))
+
+def bbox_condition(bbox: BoundingBox):
+    """
+    Condition for photos inside a bounding box that does not cross the 180th meridian.
+
+    The geohash prefix ranges select candidate rows through the b-tree index,
+    the coordinate comparisons trim the cells to the exact box.
+    """
+    south, west, north, east = bbox
+    conditions = [
+        Photo.gps_latitude.between(south, north),
+        Photo.gps_longitude.between(west, east)
+    ]
+    prefixes = geohash_cover(bbox)
+    if prefixes:
+        conditions.append(or_(*[
+            and_(Photo.geohash >= prefix, Photo.geohash < prefix + "~")
+            for prefix in prefixes
+        ]))
+    return and_(*conditions)
+
+def distance_expression(latitude: float, longitude: float):
+    """Great-circle distance in meters from the given point to the photo (haversine)."""
+    half_dlat = func.radians(Photo.gps_latitude - latitude) / 2
+    half_dlon = func.radians(Photo.gps_longitude - longitude) / 2
+    a = (
+        func.power(func.sin(half_dlat), 2)
+        + func.cos(math.radians(latitude)) * func.cos(func.radians(Photo.gps_latitude))
+        * func.power(func.sin(half_dlon), 2)
+    )
+    return 2 * EARTH_RADIUS_M * func.asin(func.sqrt(func.least(a, 1.0)))
+
+def geo_condition(bbox: Optional[str] = None, near: Optional[str] = None, radius: Optional[float] = None):
+    """
+    Build the condition for the bbox and near/radius filters.
+
+    Args:
+        bbox: Bounding box "min_lon,min_lat,max_lon,max_lat"
+        near: Center point "lat,lon"
+        radius: Radius around near in meters
+
+    Returns:
+        SQLAlchemy boolean expression, or None when no geo filter is given
+
+    Raises:
+        ValueError: If a parameter is malformed
+    """
+    conditions = []
+    if bbox:
+        conditions.append(or_(*[bbox_condition(box) for box in split_antimeridian(parse_bbox(bbox))]))
+    if near:
+        if radius is None or not 0 < radius <= MAX_RADIUS_M:
+            raise ValueError(f"radius peab olema vahemikus 0 kuni {MAX_RADIUS_M} meetrit")
+        latitude, longitude = parse_point(near)
+        conditions.append(or_(*[bbox_condition(box) for box in radius_bbox(latitude, longitude, radius)]))
+        conditions.append(distance_expression(latitude, longitude) <= radius)
+    if not conditions:
+        return None
+    return and_(*conditions)
+
+def apply_photo_filters(
+    query: Query,
+    species_id: Optional[int] = None,
+    species_name: Optional[str] = None,
+    location: Optional[str] = None,
+    date: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    bbox: Optional[str] = None,
+    near: Optional[str] = None,
+    radius: Optional[float] = None
+) -> Query:
+    """
+    Apply the photo listing filters to a query over Photo.
+
+    Args:
+        query: Query over Photo
+        species_id: Optional filter by species ID
+        species_name: Optional filter by species name (scientific, common or Estonian name)
+        location: Optional filter by location (substring match)
+        date: Optional filter by "YYYY", "YYYY-MM" or "YYYY-MM-DD" period;
+              other values fall back to a substring match on the date string
+        date_from: Optional lower bound for the capture time (inclusive)
+        date_to: Optional upper bound for the capture time (inclusive, whole day for plain dates)
+        month: Optional month of year (1-12), combined with year if given
+        year: Optional calendar year
+        bbox: Optional bounding box "min_lon,min_lat,max_lon,max_lat"
+        near: Optional center point "lat,lon" for the radius filter
+        radius: Radius around near in meters
+
+    Returns:
+        Filtered query
+
+    Raises:
+        ValueError: If a date or geo filter value is invalid
+    """
+    # Species filters use EXISTS, so a photo with several matching species
+    # is returned only once and no DISTINCT is needed
+    if species_id:
+        query = query.filter(Photo.species.any(PhotoSpeciesRelation.species_id == species_id))
+
+    if species_name:
+        query = query.filter(
+            Photo.species.any(PhotoSpeciesRelation.species.has(species_name_condition(species_name)))
+        )
+
+    if location:
+        query = query.filter(Photo.location.ilike(f"%{location}%"))
+
+    if date:
+        # Kuupäeva perioodid kasutavad taken_at indeksit, muu tekst otsib osalist vastet
+        period = period_range(date)
+        if period:
+            query = query.filter(Photo.taken_at >= period[0], Photo.taken_at < period[1])
+        else:
+            query = query.filter(Photo.date.ilike(f"%{date}%"))
+
+    if date_from:
+        query = query.filter(Photo.taken_at >= parse_date_bound(date_from))
+
+    if date_to:
+        query = query.filter(Photo.taken_at < parse_date_bound(date_to, end=True))
+
+    if year and month:
+        start, end = month_range(year, month)
+        query = query.filter(Photo.taken_at >= start, Photo.taken_at < end)
+    elif year:
+        start, end = year_range(year)
+        query = query.filter(Photo.taken_at >= start, Photo.taken_at < end)
+    elif month:
+        if not 1 <= month <= 12:
+            raise ValueError(f"Vigane kuu: {month}")
+        query = query.filter(taken_month_expression() == month)
+
+    location_condition = geo_condition(bbox, near, radius)
+    if location_condition is not None:
+        query = query.filter(location_condition)
+
+    return query
+
+def keyset_condition(order: str, last: Dict[str, Any]):
+    """
+    Build the WHERE condition selecting rows after the given sort key.
+
+    Args:
+        order: Sort order ("id" or "date")
+        last: Sort key values of the last row of the previous page
+
+    Returns:
+        SQLAlchemy boolean expression
+
+    Raises:
+        ValueError: If the cursor holds an invalid timestamp
+    """
+    if order == "date":
+        if last.get("taken_at") is None:
+            # Already in the trailing block of photos without a capture time
+            return and_(Photo.taken_at.is_(None), Photo.id < last["id"])
+        last_taken_at = parse_photo_date(last["taken_at"])
+        if last_taken_at is None:
+            raise ValueError("Vigane kursor")
+        return or_(
+            Photo.taken_at < last_taken_at,
+            and_(Photo.taken_at == last_taken_at, Photo.id < last["id"]),
+            Photo.taken_at.is_(None)
+        )
+    return Photo.id < last["id"]
@@ -2,15 +2,24 @@
 Photo service module containing business logic for photo operations.
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+from datetime import datetime, timezone
 import os
 import logging
 
 from models.photo_models import Photo
 from models.species_models import Species
 from models.relation_models import PhotoSpeciesRelation
+from models.deletion_models import DeletedPhoto
 from utils.exif_reader import get_image_metadata
+from utils.renditions import delete_renditions
+from utils.pagination import PHOTO_ORDERS, encode_cursor, decode_cursor
+from utils.date_utils import parse_photo_date
+from utils.geo_utils import optional_geohash
+from services.search_service import apply_text_search
+from services.photo_filters import apply_photo_filters, keyset_condition
+from services.photo_fields import LIST_FIELDS, DETAIL_FIELDS, photo_load_options, photo_to_dict
+from services import cluster_service, query_cache, species_stats_service, version_service
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -34,14 +43,40 @@ def get_photo(db: Session, photo_id: int) -> Optional[Dict[str, Any]]:
         "id": photo.id,
         "file_path": photo.file_path,
         "date": photo.date,
+        "taken_at": photo.taken_at,
         "location": photo.location,
         "gps_latitude": photo.gps_latitude,
         "gps_longitude": photo.gps_longitude,
         "gps_altitude": photo.gps_altitude,
         "camera_make": photo.camera_make,
-        "camera_model": photo.camera_model
+        "camera_model": photo.camera_model,
+        "renditions": photo.renditions
     }
 
+# Maximum number of photos loaded by get_photos_by_ids
+MAX_BATCH_IDS = 100
+
+def get_next_cursor(photos: List[Dict[str, Any]], limit: int, order: str = "id") -> Optional[str]:
+    """
+    Build the cursor for the page following the given photos.
+    
+    Args:
+        photos: Photos returned by get_photos
+        limit: Page size used for the request
+        order: Sort order used for the request
+        
+    Returns:
+        Cursor string, or None if this was the last page
+    """
+    if not photos or len(photos) < limit:
+        return None
+    last = photos[-1]
+    if order == "date":
+        taken_at = last["taken_at"].isoformat() if last["taken_at"] else None
+        return encode_cursor(order, {"id": last["id"], "taken_at": taken_at})
+    return encode_cursor(order, {"id": last["id"]})
+
+@query_cache.cached_query("get_photos", query_cache.photo_list_tags)
 def get_photos(
     db: Session, 
     species_id: Optional[int] = None,
@@ -49,7 +84,18 @@ def get_photos(
     location: Optional[str] = None, 
     date: Optional[str] = None, 
     offset: int = 0, 
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    bbox: Optional[str] = None,
+    near: Optional[str] = None,
+    radius: Optional[float] = None,
+    order: str = "id",
+    q: Optional[str] = None,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> List[Dict[str, Any]]:
     """
     Get a list of photos with optional filtering.
@@ -57,128 +103,132 @@ def get_photos(
     Args:
         db: Database session
         species_id: Optional filter by species ID
-        species_name: Optional filter by species name (scientific or common name)
+        species_name: Optional filter by species name (scientific, common or Estonian name)
         location: Optional filter by location (substring match)
-        date: Optional filter by date (substring match)
-        offset: Number of records to skip
+        date: Optional filter by "YYYY", "YYYY-MM" or "YYYY-MM-DD" period (substring match otherwise)
+        offset: Number of records to skip (legacy, ignored when cursor is given)
         limit: Maximum number of records to return
+        cursor: Opaque cursor from get_next_cursor for keyset pagination
+        date_from: Optional lower bound for the capture time
+        date_to: Optional upper bound for the capture time (inclusive)
+        month: Optional month of year (1-12)
+        year: Optional calendar year
+        bbox: Optional bounding box "min_lon,min_lat,max_lon,max_lat"
+        near: Optional center point "lat,lon" for the radius filter
+        radius: Radius around near in meters
+        order: Sort order, "id" (newest first) or "date" (latest capture time first)
+        q: Optional free text search over location and species names;
+           results are ordered by relevance and paginated with offset
+        fields: Optional subset of LIST_FIELDS from photo_fields.parse_fields;
+                only these columns are selected
         
     Returns:
         List of Photo objects as dictionaries
-    """
-    query = db.query(Photo)
-    
-    # Apply filters if provided
-    if species_id or species_name:
-        query = query.join(PhotoSpeciesRelation).join(Species)
         
-        if species_id:
-            query = query.filter(PhotoSpeciesRelation.species_id == species_id)
-        
-        if species_name:
-            query = query.filter(
-                or_(
-                    Species.scientific_name.ilike(f"%{species_name}%"),
-                    Species.common_name.ilike(f"%{species_name}%")
-                )
-            )
-    
-    if location:
-        query = query.filter(Photo.location.ilike(f"%{location}%"))
-    
-    if date:
-        # Täiustatud kuupäeva filter, mis otsib ka osalisi kuupäevi
-        query = query.filter(Photo.date.ilike(f"%{date}%"))
+    Raises:
+        ValueError: If order is unknown or the cursor or a filter value is invalid
+    """
+    if order not in PHOTO_ORDERS:
+        raise ValueError(f"Tundmatu järjestus: {order}")
+    if q and cursor:
+        raise ValueError("Kursorit ei saa kasutada koos otsingusõnaga q")
     
-    # Order by newest photos first
-    query = query.order_by(Photo.id.desc())
+    fields = fields or LIST_FIELDS
+    if order == "date" and "taken_at" not in fields:
+        # The cursor of the next page is built from taken_at
+        fields = tuple(name for name in LIST_FIELDS if name in fields or name == "taken_at")
+    # Species are loaded with two extra SELECT ... IN statements, not one query per relation
+    query = db.query(Photo).options(*photo_load_options(fields))
     
-    # Eemalda duplikaadid (võib tekkida species join'i puhul)
-    query = query.distinct(Photo.id)
+    query = apply_photo_filters(
+        query,
+        species_id=species_id,
+        species_name=species_name,
+        location=location,
+        date=date,
+        date_from=date_from,
+        date_to=date_to,
+        month=month,
+        year=year,
+        bbox=bbox,
+        near=near,
+        radius=radius
+    )
     
-    # Get photos with basic info
-    photos = query.offset(offset).limit(limit).all()
+    if q:
+        # Relevance ordering from the trigram search
+        query = apply_text_search(query, q)
+    elif order == "date":
+        # Latest captures first, photos without a capture time at the end
+        query = query.order_by(Photo.taken_at.desc().nullslast(), Photo.id.desc())
+    else:
+        # Order by newest photos first
+        query = query.order_by(Photo.id.desc())
     
-    # Create result list
-    result = []
-    for photo in photos:
-        # Get species for this photo
-        species_relations = db.query(PhotoSpeciesRelation).filter(
-            PhotoSpeciesRelation.photo_id == photo.id
-        ).all()
-        
-        species_list = []
-        for relation in species_relations:
-            species = db.query(Species).filter(Species.id == relation.species_id).first()
-            if species:
-                species_info = {
-                    "id": species.id,
-                    "scientific_name": species.scientific_name,
-                    "common_name": species.common_name,
-                    "family": species.family
-                }
-                species_list.append(species_info)
-        
-        # Add photo with species to result
-        photo_dict = {
-            "id": photo.id,
-            "file_path": photo.file_path,
-            "date": photo.date,
-            "location": photo.location,
-            "species": species_list
-        }
-        result.append(photo_dict)
+    if cursor:
+        # Keyset pagination: continue after the last row of the previous page,
+        # so deep pages cost the same as the first one
+        query = query.filter(keyset_condition(order, decode_cursor(cursor, order)))
+    elif offset:
+        query = query.offset(offset)
     
-    return result
+    photos = query.limit(limit).all()
+    return [photo_to_dict(photo, fields) for photo in photos]
 
-def get_photo_with_species(db: Session, photo_id: int) -> Optional[Dict[str, Any]]:
+@query_cache.cached_query("get_photo_with_species", query_cache.photo_detail_tags)
+def get_photo_with_species(db: Session, photo_id: int,
+                           fields: Optional[Tuple[str, ...]] = None) -> Optional[Dict[str, Any]]:
     """
     Get a photo with all associated species information.
     
     Args:
         db: Database session
         photo_id: ID of the photo to retrieve
+        fields: Optional subset of DETAIL_FIELDS; only these columns are selected
         
     Returns:
         Dictionary with photo and species information
     """
-    photo = db.query(Photo).filter(Photo.id == photo_id).first()
+    fields = fields or DETAIL_FIELDS
+    photo = db.query(Photo).options(*photo_load_options(fields, detail=True)).filter(Photo.id == photo_id).first()
     if not photo:
         return None
+    return photo_to_dict(photo, fields, detail=True)
+
+def get_photos_by_ids(db: Session, photo_ids: Sequence[int],
+                      fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+    """
+    Get several photos with their species in one query.
     
-    # Get all species associated with this photo
-    species_relations = db.query(PhotoSpeciesRelation).filter(
-        PhotoSpeciesRelation.photo_id == photo_id
-    ).all()
-    
-    species_list = []
-    for relation in species_relations:
-        species = db.query(Species).filter(Species.id == relation.species_id).first()
-        if species:
-            species_info = {
-                "id": species.id,
-                "scientific_name": species.scientific_name,
-                "common_name": species.common_name,
-                "family": species.family,
-                "relation_category": relation.category,
-                "relation_id": relation.id
-            }
-            species_list.append(species_info)
-    
-    return {
-        "id": photo.id,
-        "file_path": photo.file_path,
-        "date": photo.date,
-        "location": photo.location,
-        "gps_latitude": photo.gps_latitude,
-        "gps_longitude": photo.gps_longitude,
-        "gps_altitude": photo.gps_altitude,
-        "camera_make": photo.camera_make,
-        "camera_model": photo.camera_model,
-        "species": species_list
-    }
+    Args:
+        db: Database session
+        photo_ids: IDs of the photos, at most MAX_BATCH_IDS
+        fields: Optional subset of DETAIL_FIELDS; only these columns are selected
+        
+    Returns:
+        Photos as in get_photo_with_species, in the order of photo_ids;
+        IDs without a photo are left out
+        
+    Raises:
+        ValueError: If more than MAX_BATCH_IDS IDs are given
+    """
+    if len(photo_ids) > MAX_BATCH_IDS:
+        raise ValueError(f"Korraga saab küsida kuni {MAX_BATCH_IDS} fotot")
+    if not photo_ids:
+        return []
+    fields = fields or DETAIL_FIELDS
+    # Photos, relations and species with one JOIN, the batch size is bounded
+    photos = (
+        db.query(Photo)
+        .options(*photo_load_options(fields, detail=True, joined=True))
+        .filter(Photo.id.in_(photo_ids))
+        .all()
+    )
+    by_id = {photo.id: photo for photo in photos}
+    return [photo_to_dict(by_id[photo_id], fields, detail=True) for photo_id in photo_ids if photo_id in by_id]
 
-def create_photo(db: Session, file_path: str, date: str = None, location: str = None) -> Photo:
+def create_photo(db: Session, file_path: str, date: str = None, location: str = None,
+                 metadata: Optional[Dict[str, Any]] = None, content_hash: Optional[str] = None) -> Photo:
     """
     Create a new photo record.
     
@@ -187,17 +237,24 @@ def create_photo(db: Session, file_path: str, date: str = None, location: str =
         file_path: Path to the photo file
         date: Date when the photo was taken (optional, will be read from EXIF if available)
         location: Location where the photo was taken (optional, will be read from EXIF if available)
+        metadata: Metadata already read with get_image_metadata (optional, read from the file if not given)
+        content_hash: SHA-256 of the file content (must be unique)
         
     Returns:
         Created Photo object
+        
+    Raises:
+        IntegrityError: If a photo with the same content_hash exists
     """
     # Create basic photo record
-    db_photo = Photo(file_path=file_path, date=date, location=location)
+    db_photo = Photo(file_path=file_path, date=date, taken_at=parse_photo_date(date), location=location,
+                     content_hash=content_hash)
     
     # Try to extract metadata from the image
     try:
-        logger.info(f"Extracting metadata from image: {file_path}")
-        metadata = get_image_metadata(file_path)
+        if metadata is None:
+            logger.info(f"Extracting metadata from image: {file_path}")
+            metadata = get_image_metadata(file_path)
         
         # Debug - print full metadata
         logger.info(f"Raw metadata result: {metadata}")
@@ -209,7 +266,8 @@ def create_photo(db: Session, file_path: str, date: str = None, location: str =
             # Only set date from EXIF if not provided by user
             if not date and "date" in metadata:
                 db_photo.date = metadata["date"]
-                logger.info(f"Set date from metadata: {metadata['date']}")
+                db_photo.taken_at = parse_photo_date(metadata.get("taken_at") or metadata["date"])
+                logger.info(f"Set date from metadata: {metadata['date']}, taken_at: {db_photo.taken_at}")
             
             # Only set location from EXIF if not provided by user
             if not location and "location" in metadata:
@@ -249,10 +307,21 @@ def create_photo(db: Session, file_path: str, date: str = None, location: str =
         logger.error(f"Error reading EXIF metadata from {file_path}: {str(e)}")
         logger.exception(e)  # Log full exception traceback
     
+    db_photo.geohash = optional_geohash(db_photo.gps_latitude, db_photo.gps_longitude)
+    
+    # Fall back to the upload time when neither the user nor EXIF gave a date
+    if not db_photo.date:
+        now = datetime.now(timezone.utc)
+        db_photo.date = now.strftime("%Y-%m-%d")
+        db_photo.taken_at = now
+    
     # Save to database
     db.add(db_photo)
+    version_service.bump_collections(db, version_service.PHOTOS)
     db.commit()
     db.refresh(db_photo)
+    query_cache.invalidate_photo(db_photo.id)
+    cluster_service.invalidate_point(db_photo.gps_latitude, db_photo.gps_longitude)
     logger.info(f"Created new photo with ID: {db_photo.id}, location: {db_photo.location}, "
                 f"gps_latitude: {db_photo.gps_latitude}, gps_longitude: {db_photo.gps_longitude}")
     return db_photo
@@ -278,10 +347,16 @@ def update_photo(db: Session, photo_id: int, date: Optional[str] = None, locatio
     db_photo = db.query(Photo).filter(Photo.id == photo_id).first()
     if not db_photo:
         return None
+    old_coordinates = (db_photo.gps_latitude, db_photo.gps_longitude)
     
     # Update fields if provided
+    species_ids = []
     if date is not None:
         db_photo.date = date
+        db_photo.taken_at = parse_photo_date(date)
+        # Observation times of the photo's species may change
+        species_ids = species_stats_service.species_ids_of_photo(db, photo_id)
+        species_stats_service.refresh_species_stats(db, species_ids)
     if location is not None:
         db_photo.location = location
     if gps_latitude is not None:
@@ -290,11 +365,81 @@ def update_photo(db: Session, photo_id: int, date: Optional[str] = None, locatio
         db_photo.gps_longitude = gps_longitude
     if gps_altitude is not None:
         db_photo.gps_altitude = gps_altitude
+    db_photo.geohash = optional_geohash(db_photo.gps_latitude, db_photo.gps_longitude)
     
+    version_service.bump_collections(db, version_service.PHOTOS)
     db.commit()
     db.refresh(db_photo)
+    query_cache.invalidate_photo(photo_id)
+    if species_ids:
+        query_cache.invalidate_species_list()
+    
+    # Moved photos change the map clusters of both the old and the new tile
+    if old_coordinates != (db_photo.gps_latitude, db_photo.gps_longitude):
+        cluster_service.invalidate_point(*old_coordinates)
+        cluster_service.invalidate_point(db_photo.gps_latitude, db_photo.gps_longitude)
     return db_photo
 
+def fill_photo_metadata(db: Session, metadata_by_photo: Dict[int, Dict[str, Any]],
+                        replace_dates: bool = False) -> int:
+    """
+    Fill photo fields from metadata read with get_images_metadata.
+    
+    GPS coordinates and camera information are set from the metadata, the
+    location only where it is missing. Dates are kept (they may have been
+    entered by the user) unless replace_dates is set.
+    
+    Args:
+        db: Database session
+        metadata_by_photo: Normalized metadata by photo ID
+        replace_dates: Also set date and taken_at from the metadata
+        
+    Returns:
+        Number of photos that were changed
+    """
+    photos = db.query(Photo).filter(Photo.id.in_(list(metadata_by_photo))).all() if metadata_by_photo else []
+    changed = []
+    dated = []
+    moved = []
+    for photo in photos:
+        metadata = metadata_by_photo[photo.id]
+        before = (photo.date, photo.location, photo.gps_latitude, photo.gps_longitude, photo.gps_altitude,
+                  photo.camera_make, photo.camera_model)
+        if replace_dates and "date" in metadata:
+            photo.date = metadata["date"]
+            photo.taken_at = parse_photo_date(metadata.get("taken_at") or metadata["date"])
+        for field in ("gps_latitude", "gps_longitude", "gps_altitude", "camera_make", "camera_model"):
+            if field in metadata:
+                setattr(photo, field, metadata[field])
+        if not photo.location and "location" in metadata:
+            photo.location = metadata["location"]
+        photo.geohash = optional_geohash(photo.gps_latitude, photo.gps_longitude)
+        after = (photo.date, photo.location, photo.gps_latitude, photo.gps_longitude, photo.gps_altitude,
+                 photo.camera_make, photo.camera_model)
+        if after != before:
+            changed.append(photo)
+            if after[0] != before[0]:
+                dated.append(photo.id)
+            if after[2:4] != before[2:4]:
+                moved.extend([before[2:4], after[2:4]])
+    if not changed:
+        return 0
+    
+    species_ids = set()
+    for photo_id in dated:
+        species_ids.update(species_stats_service.species_ids_of_photo(db, photo_id))
+    if species_ids:
+        species_stats_service.refresh_species_stats(db, list(species_ids))
+    version_service.bump_collections(db, version_service.PHOTOS)
+    db.commit()
+    for photo in changed:
+        query_cache.invalidate_photo(photo.id)
+    if species_ids:
+        query_cache.invalidate_species_list()
+    for coordinates in moved:
+        cluster_service.invalidate_point(*coordinates)
+    return len(changed)
+
 def delete_photo(db: Session, photo_id: int, delete_file: bool = False) -> bool:
     """
     Delete a photo record and optionally the associated file.
@@ -312,17 +457,27 @@ def delete_photo(db: Session, photo_id: int, delete_file: bool = False) -> bool:
         return False
     
     # Delete associated relations with species
+    species_ids = species_stats_service.species_ids_of_photo(db, photo_id)
     db.query(PhotoSpeciesRelation).filter(PhotoSpeciesRelation.photo_id == photo_id).delete()
     
     # Optionally delete the physical file
     if delete_file and db_photo.file_path and os.path.exists(db_photo.file_path):
         try:
             os.remove(db_photo.file_path)
+            delete_renditions(db_photo.file_path)
         except Exception as e:
             # Log the error but continue with database deletion
             print(f"Error deleting file {db_photo.file_path}: {str(e)}")
     
-    # Delete the photo record
+    # Delete the photo record, leaving a tombstone for delta exports
+    coordinates = (db_photo.gps_latitude, db_photo.gps_longitude)
     db.delete(db_photo)
+    db.add(DeletedPhoto(photo_id=photo_id))
+    species_stats_service.refresh_species_stats(db, species_ids)
+    version_service.bump_collections(db, version_service.PHOTOS)
     db.commit()
+    query_cache.invalidate_photo(photo_id)
+    if species_ids:
+        query_cache.invalidate_species_list()
+    cluster_service.invalidate_point(*coordinates)
     return True
\ No newline at end of file
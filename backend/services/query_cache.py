@@ -0,0 +1,129 @@
+"""
+Query result cache for the read-heavy browse endpoints.
+
+Results of photo_service.get_photos, photo_service.get_photo_with_species and
+species_service.get_species are kept in a bounded in-process cache. Every
+entry is tagged with the rows it was built from, and the write functions drop
+exactly the entries their change can affect:
+
+    "photos"          every photo listing (a created or edited photo may
+                      enter or leave any filtered listing)
+    "photo:<id>"      listings and the detail view showing that photo
+    "species"         species listings (including their photo statistics)
+    "species:<id>"    entries showing that species, or filtered by it
+    "species_names"   listings filtered by species_name or q
+
+Results read from a replica shortly after an invalidation are not stored,
+as the replica may not have replayed the write yet.
+
+Cached values are shared between requests and must not be modified.
+The cache is per process; with several worker processes each keeps its own.
+"""
+import os
+import functools
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List
+
+import database
+from utils.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "4096"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+
+_query_cache = TTLCache(
+    max_entries=QUERY_CACHE_MAX_ENTRIES,
+    ttl=QUERY_CACHE_TTL,
+    max_bytes=QUERY_CACHE_MAX_BYTES,
+    name="query_results"
+)
+
+def _may_be_stale(db) -> bool:
+    """Whether a result read with this session may miss a recent write."""
+    if not db.info.get("replica"):
+        return False
+    return time.monotonic() - _query_cache.invalidated_at < database.DB_READ_YOUR_WRITES_SECONDS
+
+def cached_query(namespace: str, tags: Callable[[Any, Dict[str, Any]], Iterable[str]]):
+    """
+    Decorator caching a service function that takes a Session as first argument.
+
+    The cache key is built from all other arguments after applying defaults,
+    so equivalent calls with positional and keyword arguments share an entry.
+
+    Args:
+        namespace: Name separating the keys of different functions
+        tags: Function returning the tags of a result, given the result
+              and the bound arguments (without db)
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(db, *args, **kwargs):
+            if not QUERY_CACHE_ENABLED:
+                return func(db, *args, **kwargs)
+            bound = signature.bind(db, *args, **kwargs)
+            bound.apply_defaults()
+            params = {name: value for name, value in bound.arguments.items() if name != "db"}
+            key = (namespace, tuple(params.items()))
+            result = _query_cache.get(key)
+            if result is MISSING:
+                # Read before the query, so a write committed meanwhile prevents storing a stale result
+                generation = _query_cache.generation
+                result = func(db, *args, **kwargs)
+                if _may_be_stale(db):
+                    return result
+                _query_cache.set(key, result, tags=tags(result, params), if_generation=generation)
+            return result
+        return wrapper
+    return decorator
+
+def _species_tags(species_list: List[Dict[str, Any]]) -> List[str]:
+    return [f"species:{species['id']}" for species in species_list]
+
+def photo_list_tags(photos: List[Dict[str, Any]], params: Dict[str, Any]) -> List[str]:
+    """Tags of a get_photos result."""
+    tags = ["photos"]
+    if params.get("species_id"):
+        tags.append(f"species:{params['species_id']}")
+    if params.get("species_name") or params.get("q"):
+        tags.append("species_names")
+    for photo in photos:
+        tags.append(f"photo:{photo['id']}")
+        tags.extend(_species_tags(photo.get("species", ())))
+    return tags
+
+def photo_detail_tags(photo: Dict[str, Any], params: Dict[str, Any]) -> List[str]:
+    """Tags of a get_photo_with_species result (None for a missing photo)."""
+    tags = [f"photo:{params['photo_id']}"]
+    if photo:
+        tags.extend(_species_tags(photo.get("species", ())))
+    return tags
+
+def species_list_tags(species_list: List[Dict[str, Any]], params: Dict[str, Any]) -> List[str]:
+    """Tags of a get_species result."""
+    return ["species"]
+
+def invalidate_photo(photo_id: int) -> None:
+    """Drop cached entries affected by a created, updated or deleted photo."""
+    removed = _query_cache.invalidate_tags("photos", f"photo:{photo_id}")
+    logger.debug(f"Foto {photo_id} muutus, eemaldatud {removed} vahemälu kirjet")
+
+def invalidate_species(species_id: int) -> None:
+    """Drop cached entries affected by an updated or deleted species."""
+    _query_cache.invalidate_tags("species", f"species:{species_id}", "species_names")
+
+def invalidate_species_list() -> None:
+    """Drop cached species listings after a species was created or its statistics changed."""
+    _query_cache.invalidate_tags("species")
+
+def invalidate_relation(photo_id: int, species_id: int) -> None:
+    """Drop cached entries affected by a created or deleted photo-species relation."""
+    # Species listings change too, as they show photo counts and cover photos
+    _query_cache.invalidate_tags("species", f"photo:{photo_id}", f"species:{species_id}", "species_names")
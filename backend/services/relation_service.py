@@ -4,7 +4,9 @@ Relation service module containing business logic for photo-species relations.
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from models.photo_models import Photo
 from models.relation_models import PhotoSpeciesRelation
+from services import cluster_service, query_cache, species_stats_service, version_service
 
 def get_relation(db: Session, relation_id: int) -> Optional[PhotoSpeciesRelation]:
     """
@@ -74,6 +76,37 @@ def create_relation(db: Session, photo_id: int, species_id: int, category: str =
     """
     db_relation = PhotoSpeciesRelation(photo_id=photo_id, species_id=species_id, category=category)
     db.add(db_relation)
+    species_stats_service.refresh_species_stats(db, [species_id])
+    version_service.touch_photos(db, Photo.id == photo_id)
+    version_service.bump_collections(db, version_service.PHOTOS)
     db.commit()
     db.refresh(db_relation)
-    return db_relation
\ No newline at end of file
+    query_cache.invalidate_relation(photo_id, species_id)
+    cluster_service.invalidate_species(species_id)
+    return db_relation
+
+def delete_relations_for_photo(db: Session, photo_id: int) -> int:
+    """
+    Delete all species relations of a photo.
+    
+    Args:
+        db: Database session
+        photo_id: ID of the photo
+        
+    Returns:
+        Number of deleted relations
+    """
+    relations = get_relations_by_photo(db, photo_id)
+    if not relations:
+        return 0
+    species_ids = {relation.species_id for relation in relations}
+    for relation in relations:
+        db.delete(relation)
+    species_stats_service.refresh_species_stats(db, species_ids)
+    version_service.touch_photos(db, Photo.id == photo_id)
+    version_service.bump_collections(db, version_service.PHOTOS)
+    db.commit()
+    for species_id in species_ids:
+        query_cache.invalidate_relation(photo_id, species_id)
+        cluster_service.invalidate_species(species_id)
+    return len(relations)
\ No newline at end of file
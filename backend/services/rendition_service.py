@@ -0,0 +1,78 @@
+"""
+Rendition service module storing the downscaled copies of photos.
+
+Renditions are generated after the upload response has been sent (FastAPI
+BackgroundTasks), so uploads do not wait for image encoding. Until they
+exist, a photo's renditions field is null and clients fall back to the
+original file.
+"""
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+import database
+from models.photo_models import Photo
+from services import query_cache, version_service
+from utils.renditions import generate_renditions
+
+logger = logging.getLogger(__name__)
+
+def create_renditions(db: Session, photo_id: int) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Generate the renditions of a photo and store their paths.
+
+    Args:
+        db: Database session
+        photo_id: ID of the photo
+
+    Returns:
+        Rendition paths by size and format, or None if the photo does not exist
+
+    Raises:
+        OSError: If the image cannot be read or a rendition cannot be written
+    """
+    file_path = db.query(Photo.file_path).filter(Photo.id == photo_id).scalar()
+    if not file_path:
+        return None
+    # End the read transaction, so it is not held open while encoding
+    db.rollback()
+    renditions = generate_renditions(file_path)
+    store_renditions(db, {photo_id: renditions})
+    return renditions
+
+def store_renditions(db: Session, renditions_by_photo: Dict[int, Dict[str, Dict[str, str]]]) -> None:
+    """
+    Store generated rendition paths of one or more photos.
+
+    Args:
+        db: Database session
+        renditions_by_photo: Rendition paths by photo ID
+    """
+    if not renditions_by_photo:
+        return
+    for photo_id, renditions in renditions_by_photo.items():
+        db.query(Photo).filter(Photo.id == photo_id).update(
+            {Photo.renditions: renditions}, synchronize_session=False
+        )
+    version_service.bump_collections(db, version_service.PHOTOS)
+    db.commit()
+    for photo_id in renditions_by_photo:
+        query_cache.invalidate_photo(photo_id)
+
+def create_renditions_task(photo_id: int) -> None:
+    """
+    Background task generating the renditions of a new photo.
+
+    Uses its own session, as the request's session is closed by the time
+    background tasks run. Errors are logged; the backfill command retries
+    photos without renditions.
+    """
+    db = database.SessionLocal()
+    try:
+        create_renditions(db, photo_id)
+        logger.info(f"Foto {photo_id} renditsioonid loodud")
+    except Exception as e:
+        logger.error(f"Foto {photo_id} renditsioonide loomine ebaõnnestus: {e}")
+    finally:
+        db.close()
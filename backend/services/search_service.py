@@ -0,0 +1,96 @@
+"""
+Search service module containing text search logic for photos.
+Uses PostgreSQL pg_trgm trigram indexes on photo location and species names.
+"""
+from sqlalchemy import or_, func, literal, select
+from sqlalchemy.orm import Query
+
+from models.photo_models import Photo
+from models.species_models import Species
+from models.relation_models import PhotoSpeciesRelation
+
+def species_name_condition(term: str):
+    """
+    Build a condition matching species whose any name contains the term.
+
+    ILIKE '%term%' is served by the gin_trgm_ops indexes on the name columns.
+
+    Args:
+        term: Search term
+
+    Returns:
+        SQLAlchemy boolean expression on Species
+    """
+    pattern = f"%{term}%"
+    return or_(
+        Species.scientific_name.ilike(pattern),
+        Species.common_name.ilike(pattern),
+        Species.estonian_name.ilike(pattern)
+    )
+
+def _species_match_condition(q: str):
+    """Match species names by substring or trigram word similarity."""
+    term = literal(q)
+    return or_(
+        species_name_condition(q),
+        term.op("<%")(Species.scientific_name),
+        term.op("<%")(Species.common_name),
+        term.op("<%")(Species.estonian_name)
+    )
+
+def _species_rank(q: str):
+    """Best word similarity between the query and the names of a photo's species."""
+    best_name = func.greatest(
+        func.word_similarity(q, Species.scientific_name),
+        func.word_similarity(q, Species.common_name),
+        func.word_similarity(q, Species.estonian_name)
+    )
+    return (
+        select(func.max(best_name))
+        .select_from(PhotoSpeciesRelation)
+        .join(Species, Species.id == PhotoSpeciesRelation.species_id)
+        .where(PhotoSpeciesRelation.photo_id == Photo.id)
+        .scalar_subquery()
+    )
+
+def text_search_condition(q: str):
+    """
+    Build the condition for photos matching a free text query.
+
+    A photo matches when its location or the name of any related species
+    contains the query or is similar to it as a word.
+
+    Args:
+        q: Free text search query
+
+    Returns:
+        SQLAlchemy boolean expression on Photo
+    """
+    q = q.strip()
+    term = literal(q)
+    return or_(
+        Photo.location.ilike(f"%{q}%"),
+        term.op("<%")(Photo.location),
+        Photo.species.any(PhotoSpeciesRelation.species.has(_species_match_condition(q)))
+    )
+
+def apply_text_search(query: Query, q: str) -> Query:
+    """
+    Filter a photo query by free text and order it by relevance.
+
+    Results are ranked by the best word similarity over location and
+    species names.
+
+    Args:
+        query: Query over Photo
+        q: Free text search query
+
+    Returns:
+        Filtered and ranked query
+    """
+    q = q.strip()
+    rank = func.greatest(
+        func.coalesce(func.word_similarity(q, Photo.location), 0),
+        func.coalesce(_species_rank(q), 0)
+    )
+    return query.filter(text_search_condition(q)).order_by(rank.desc(), Photo.id.desc())
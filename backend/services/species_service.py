@@ -4,8 +4,20 @@ Species service module containing business logic for species operations.
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 
-from models.species_models import Species
+from models.photo_models import Photo
+from models.species_models import Species, SpeciesStats
 from models.relation_models import PhotoSpeciesRelation
+from services import cluster_service, query_cache, species_stats_service, version_service
+from utils.date_utils import parse_date_bound
+
+# Orders of species listings, by the sort parameter; ties are ordered by ID
+SPECIES_ORDERS = {
+    "id": (),
+    "name": (Species.scientific_name.asc(),),
+    "photo_count": (SpeciesStats.photo_count.desc().nulls_last(),),
+    "first_observed": (SpeciesStats.first_observed_at.asc().nulls_last(),),
+    "last_observed": (SpeciesStats.last_observed_at.desc().nulls_last(),),
+}
 
 def model_to_dict(model) -> Dict[str, Any]:
     """
@@ -19,6 +31,27 @@ def model_to_dict(model) -> Dict[str, Any]:
     """
     return {column.name: getattr(model, column.name) for column in model.__table__.columns}
 
+def _species_with_stats_query(db: Session):
+    """Query of species rows with their statistics and cover photo path."""
+    return (
+        db.query(Species, SpeciesStats, Photo.file_path)
+        .outerjoin(SpeciesStats, SpeciesStats.species_id == Species.id)
+        .outerjoin(Photo, Photo.id == SpeciesStats.cover_photo_id)
+    )
+
+def _species_with_stats_to_dict(species: Species, stats: Optional[SpeciesStats],
+                                cover_file_path: Optional[str]) -> Dict[str, Any]:
+    """Dictionary of a species row extended with its statistics."""
+    data = model_to_dict(species)
+    data.update({
+        "photo_count": stats.photo_count if stats else 0,
+        "first_observed_at": stats.first_observed_at if stats else None,
+        "last_observed_at": stats.last_observed_at if stats else None,
+        "cover_photo_id": stats.cover_photo_id if stats else None,
+        "cover_file_path": cover_file_path,
+    })
+    return data
+
 def get_species_by_id(db: Session, species_id: int) -> Optional[Dict[str, Any]]:
     """
     Get a single species by ID.
@@ -28,27 +61,45 @@ def get_species_by_id(db: Session, species_id: int) -> Optional[Dict[str, Any]]:
         species_id: ID of the species to retrieve
         
     Returns:
-        Dictionary representation of the species if found, None otherwise
+        Dictionary representation of the species with its photo statistics if found, None otherwise
     """
-    species = db.query(Species).filter(Species.id == species_id).first()
-    if species:
-        return model_to_dict(species)
+    row = _species_with_stats_query(db).filter(Species.id == species_id).first()
+    if row:
+        return _species_with_stats_to_dict(*row)
     return None
 
-def get_species(db: Session, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+@query_cache.cached_query("get_species", query_cache.species_list_tags)
+def get_species(db: Session, skip: int = 0, limit: int = 100, sort: str = "id",
+                min_photos: Optional[int] = None, observed_since: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Get a list of species with pagination.
+    Get a list of species with their photo statistics, with pagination.
+    
+    Sorting and filtering use the species_stats aggregate, so the photo
+    relations are not read.
     
     Args:
         db: Database session
         skip: Number of records to skip
         limit: Maximum number of records to return
+        sort: Order of the list, one of SPECIES_ORDERS
+        min_photos: Only species with at least this many photos
+        observed_since: Only species with a photo taken at or after this date (YYYY-MM-DD or ISO datetime)
         
     Returns:
-        List of dictionaries representing Species objects
+        List of dictionaries representing Species objects with statistics
+        
+    Raises:
+        ValueError: If the sort order or the date is invalid
     """
-    species_list = db.query(Species).offset(skip).limit(limit).all()
-    return [model_to_dict(species) for species in species_list]
+    if sort not in SPECIES_ORDERS:
+        raise ValueError(f"Tundmatu järjestus: {sort}. Lubatud: {', '.join(SPECIES_ORDERS)}")
+    query = _species_with_stats_query(db)
+    if min_photos:
+        query = query.filter(SpeciesStats.photo_count >= min_photos)
+    if observed_since:
+        query = query.filter(SpeciesStats.last_observed_at >= parse_date_bound(observed_since))
+    rows = query.order_by(*SPECIES_ORDERS[sort], Species.id).offset(skip).limit(limit).all()
+    return [_species_with_stats_to_dict(*row) for row in rows]
 
 def create_species(db: Session, scientific_name: str, common_name: str = None, family: str = None, estonian_name: str = None) -> Dict[str, Any]:
     """
@@ -65,9 +116,13 @@ def create_species(db: Session, scientific_name: str, common_name: str = None, f
     """
     db_species = Species(scientific_name=scientific_name, common_name=common_name, family=family, estonian_name=estonian_name)
     db.add(db_species)
+    db.flush()
+    species_stats_service.refresh_species_stats(db, [db_species.id])
+    version_service.bump_collections(db, version_service.SPECIES)
     db.commit()
     db.refresh(db_species)
-    return model_to_dict(db_species)
+    query_cache.invalidate_species_list()
+    return get_species_by_id(db, db_species.id)
 
 def update_species(db: Session, species_id: int, scientific_name: Optional[str] = None, 
                   common_name: Optional[str] = None, family: Optional[str] = None, estonian_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -98,9 +153,11 @@ def update_species(db: Session, species_id: int, scientific_name: Optional[str]
     if estonian_name is not None:
         db_species.estonian_name = estonian_name
     
+    # Photo listings show species names, so they change as well
+    version_service.bump_collections(db, version_service.SPECIES, version_service.PHOTOS)
     db.commit()
-    db.refresh(db_species)
-    return model_to_dict(db_species)
+    query_cache.invalidate_species(species_id)
+    return get_species_by_id(db, species_id)
 
 def delete_species(db: Session, species_id: int) -> bool:
     """
@@ -118,9 +175,16 @@ def delete_species(db: Session, species_id: int) -> bool:
         return False
     
     # Delete associated relations with photos
+    version_service.touch_photos(
+        db, Photo.species.any(PhotoSpeciesRelation.species_id == species_id)
+    )
     db.query(PhotoSpeciesRelation).filter(PhotoSpeciesRelation.species_id == species_id).delete()
     
-    # Delete the species record
+    # Delete the species record and its statistics
     db.delete(db_species)
+    species_stats_service.refresh_species_stats(db, [species_id])
+    version_service.bump_collections(db, version_service.SPECIES, version_service.PHOTOS)
     db.commit()
+    query_cache.invalidate_species(species_id)
+    cluster_service.invalidate_species(species_id)
     return True
\ No newline at end of file
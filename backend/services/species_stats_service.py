@@ -0,0 +1,99 @@
+"""
+Species statistics service maintaining the species_stats aggregate.
+
+species_stats holds the photo count, first and last observation time and a
+cover photo of every species, so species listings can show, sort and filter
+by them without reading photo_species_relation. The write functions keep the
+rows current: every write that adds or removes a relation, deletes a photo or
+changes the date of a photo calls refresh_species_stats for the affected
+species in the same transaction, which recomputes only those species using
+the species_id index of the relations.
+"""
+from typing import Iterable, List, Optional
+
+from sqlalchemy import case, distinct, func, insert, select
+from sqlalchemy.orm import Session
+
+from models.photo_models import Photo
+from models.species_models import Species, SpeciesStats
+from models.relation_models import PhotoSpeciesRelation
+from services import version_service
+
+# Cover photo preference: a primary identification, then the latest capture
+_cover_order = (
+    case((PhotoSpeciesRelation.category == "primary", 0), else_=1),
+    Photo.taken_at.desc().nulls_last(),
+    Photo.id.desc(),
+)
+
+def _stats_select(species_ids: Optional[List[int]]):
+    """SELECT computing species_stats rows from the relations."""
+    cover_photo = (
+        select(PhotoSpeciesRelation.photo_id)
+        .join(Photo, Photo.id == PhotoSpeciesRelation.photo_id)
+        .where(PhotoSpeciesRelation.species_id == Species.id)
+        .order_by(*_cover_order)
+        .limit(1)
+        .correlate(Species)
+        .scalar_subquery()
+    )
+    statement = (
+        select(
+            Species.id,
+            func.count(distinct(Photo.id)),
+            func.min(Photo.taken_at),
+            func.max(Photo.taken_at),
+            cover_photo,
+        )
+        .select_from(Species)
+        .outerjoin(PhotoSpeciesRelation, PhotoSpeciesRelation.species_id == Species.id)
+        .outerjoin(Photo, Photo.id == PhotoSpeciesRelation.photo_id)
+        .group_by(Species.id)
+    )
+    if species_ids is not None:
+        statement = statement.where(Species.id.in_(species_ids))
+    return statement
+
+def refresh_species_stats(db: Session, species_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Recompute the statistics of the given species.
+
+    Flushes pending changes first, so relations and photos deleted or changed
+    in the session are taken into account. Species that no longer exist lose
+    their row. Does not commit; call before the commit of the write it
+    belongs to.
+
+    Args:
+        db: Database session
+        species_ids: IDs of the species to recompute, or None for all species
+    """
+    ids = None if species_ids is None else sorted(set(species_ids))
+    if ids is not None and not ids:
+        return
+    db.flush()
+    stale = db.query(SpeciesStats)
+    if ids is not None:
+        stale = stale.filter(SpeciesStats.species_id.in_(ids))
+    stale.delete(synchronize_session=False)
+    db.execute(insert(SpeciesStats).from_select(
+        [SpeciesStats.species_id, SpeciesStats.photo_count, SpeciesStats.first_observed_at,
+         SpeciesStats.last_observed_at, SpeciesStats.cover_photo_id],
+        _stats_select(ids)
+    ))
+    # Species listings show the statistics
+    version_service.bump_collections(db, version_service.SPECIES)
+
+def species_ids_of_photo(db: Session, photo_id: int) -> List[int]:
+    """
+    IDs of the species related to a photo.
+
+    Args:
+        db: Database session
+        photo_id: ID of the photo
+
+    Returns:
+        List of species IDs
+    """
+    return list(db.execute(
+        select(PhotoSpeciesRelation.species_id).where(PhotoSpeciesRelation.photo_id == photo_id).distinct()
+    ).scalars())
@@ -0,0 +1,131 @@
+"""
+Storage service module linking stored files to photo records.
+
+Files are content addressed (see utils.file_storage) and photos.content_hash
+is unique, so uploading an image that is already in the catalog returns the
+existing photo instead of creating a second one.
+
+A failed upload removes the file it wrote unless a photo refers to it. A
+concurrent upload of the same content may have found that file and be about
+to create its photo, so the file is first moved aside, the photo is looked up
+again and the file moved back if one exists; the other upload in turn calls
+create_or_get_photo with its file object, which writes the file again if it
+went missing before its photo was committed.
+"""
+import logging
+import os
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.photo_models import Photo
+from services import photo_service
+from utils.file_storage import StoredFile, restore_blob
+
+logger = logging.getLogger(__name__)
+
+def find_photo_by_hash(db: Session, content_hash: str) -> Optional[Photo]:
+    """
+    Get the photo whose file has the given content hash.
+
+    Args:
+        db: Database session
+        content_hash: SHA-256 hex digest of the file content
+
+    Returns:
+        Photo object if found, None otherwise
+    """
+    return db.query(Photo).filter(Photo.content_hash == content_hash).first()
+
+def create_or_get_photo(db: Session, stored: StoredFile, date: Optional[str] = None,
+                        location: Optional[str] = None,
+                        metadata: Optional[Dict[str, Any]] = None,
+                        fileobj: Optional[BinaryIO] = None) -> Tuple[Photo, bool]:
+    """
+    Create the photo record of a stored file, or return the existing one.
+
+    Args:
+        db: Database session
+        stored: File stored with utils.file_storage.save_upload
+        date: Date when the photo was taken (optional, see photo_service.create_photo)
+        location: Location of the photo (optional)
+        metadata: Metadata already read from the file (optional)
+        fileobj: The uploaded file, to restore the stored file if a failed
+                 concurrent upload removed it (optional)
+
+    Returns:
+        Tuple of the photo and whether it was created
+    """
+    existing = find_photo_by_hash(db, stored.content_hash)
+    if existing is None:
+        try:
+            photo = photo_service.create_photo(
+                db, file_path=stored.path, date=date, location=location,
+                metadata=metadata, content_hash=stored.content_hash
+            )
+            settle_stored_file(stored, photo, fileobj)
+            return photo, True
+        except IntegrityError:
+            # A concurrent upload of the same file created the photo first
+            db.rollback()
+            existing = find_photo_by_hash(db, stored.content_hash)
+            if existing is None:
+                raise
+    settle_stored_file(stored, existing, fileobj)
+    return existing, False
+
+def settle_stored_file(stored: StoredFile, photo: Photo, fileobj: Optional[BinaryIO] = None) -> None:
+    """
+    Make the stored file consistent with the photo of its content.
+
+    A file this upload wrote is removed when the photo keeps its file under
+    another path (e.g. a photo stored before content addressing); the file of
+    the photo is written again if it went missing.
+
+    Args:
+        stored: File stored with utils.file_storage.save_upload
+        photo: The photo with the same content hash
+        fileobj: The uploaded file (optional)
+    """
+    if photo.file_path != stored.path:
+        if stored.created:
+            _remove(stored.path)
+    elif fileobj is not None and restore_blob(fileobj, stored):
+        logger.warning(f"Fail {stored.path} kirjutati uuesti, samaaegne üleslaadimine oli selle eemaldanud")
+
+def discard_unused(db: Session, stored: StoredFile) -> None:
+    """
+    Remove a file written by this upload if no photo refers to it.
+
+    Used when an upload fails before its photo record is created. Rolls
+    back the session, so photos committed by concurrent uploads are seen.
+
+    Args:
+        db: Database session
+        stored: File stored with utils.file_storage.save_upload
+    """
+    if not stored.created:
+        return
+    db.rollback()
+    # Move the file aside before looking for its photo: an upload that finds the
+    # photo missing afterwards restores the file (see create_or_get_photo)
+    aside = f"{stored.path}.{os.getpid()}.{id(stored)}.discard"
+    try:
+        os.replace(stored.path, aside)
+    except FileNotFoundError:
+        return
+    except OSError as e:
+        logger.warning(f"Kasutamata faili {stored.path} kustutamine ebaõnnestus: {e}")
+        return
+    photo = find_photo_by_hash(db, stored.content_hash)
+    if photo is not None and photo.file_path == stored.path:
+        os.replace(aside, stored.path)
+    else:
+        _remove(aside)
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError as e:
+        logger.warning(f"Kasutamata faili {path} kustutamine ebaõnnestus: {e}")
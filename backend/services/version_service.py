@@ -0,0 +1,121 @@
+"""
+Version service module containing the change tracking used for ETags.
+
+Single rows are versioned by their updated_at column. Collections have a
+counter in collection_versions that write functions increase in the same
+transaction as the change, so a list ETag changes with every write that can
+alter a listing, including deletes.
+"""
+from typing import Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.photo_models import Photo
+from models.species_models import Species, SpeciesStats
+from models.relation_models import PhotoSpeciesRelation
+from models.version_models import CollectionVersion
+from utils.http_cache import make_etag
+
+# Collection names
+PHOTOS = "photos"
+SPECIES = "species"
+
+def bump_collections(db: Session, *names: str) -> None:
+    """
+    Increase the version of the given collections.
+
+    Does not commit; call before the commit of the write it belongs to.
+
+    Args:
+        db: Database session
+        names: Collection names
+    """
+    for name in names:
+        statement = insert(CollectionVersion).values(name=name, version=1)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[CollectionVersion.name],
+            set_={"version": CollectionVersion.version + 1}
+        ))
+
+def touch_photos(db: Session, condition) -> None:
+    """
+    Set updated_at of the matching photos to the current time.
+
+    Used when a photo's species relations change, so delta exports see
+    the photo as changed. Does not commit.
+
+    Args:
+        db: Database session
+        condition: SQLAlchemy condition on Photo
+    """
+    db.query(Photo).filter(condition).update({Photo.updated_at: func.now()}, synchronize_session=False)
+
+def collection_etag(db: Session, name: str, query_string: str = "") -> str:
+    """
+    ETag of a listing of a collection.
+
+    Args:
+        db: Database session
+        name: Collection name
+        query_string: Normalized request parameters of the listing
+
+    Returns:
+        Strong ETag value
+    """
+    version = db.execute(
+        select(CollectionVersion.version).where(CollectionVersion.name == name)
+    ).scalar()
+    return make_etag(name, version or 0, query_string)
+
+def photo_etag(db: Session, photo_id: int, query_string: str = "") -> Optional[str]:
+    """
+    ETag of a photo's detail view.
+
+    Covers the photo row and its species relations and species rows, so
+    renaming a related species or adding or removing a relation changes it.
+
+    Args:
+        db: Database session
+        photo_id: ID of the photo
+        query_string: Normalized request parameters (e.g. fields) of the view
+
+    Returns:
+        Strong ETag value, or None if the photo does not exist
+    """
+    rows = db.execute(
+        select(Photo.updated_at, PhotoSpeciesRelation.id, PhotoSpeciesRelation.updated_at,
+               Species.id, Species.updated_at)
+        .select_from(Photo)
+        .outerjoin(PhotoSpeciesRelation, PhotoSpeciesRelation.photo_id == Photo.id)
+        .outerjoin(Species, Species.id == PhotoSpeciesRelation.species_id)
+        .where(Photo.id == photo_id)
+        .order_by(PhotoSpeciesRelation.id)
+    ).all()
+    if not rows:
+        return None
+    return make_etag(PHOTOS, photo_id, query_string, *[value for row in rows for value in row])
+
+def species_etag(db: Session, species_id: int) -> Optional[str]:
+    """
+    ETag of a single species.
+
+    Covers the species row and its photo statistics.
+
+    Args:
+        db: Database session
+        species_id: ID of the species
+
+    Returns:
+        Strong ETag value, or None if the species does not exist
+    """
+    row = db.execute(
+        select(Species.updated_at, SpeciesStats.photo_count, SpeciesStats.first_observed_at,
+               SpeciesStats.last_observed_at, SpeciesStats.cover_photo_id)
+        .outerjoin(SpeciesStats, SpeciesStats.species_id == Species.id)
+        .where(Species.id == species_id)
+    ).first()
+    if row is None:
+        return None
+    return make_etag(SPECIES, species_id, *row)
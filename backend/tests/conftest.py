@@ -0,0 +1,75 @@
+"""
+Shared test fixtures.
+
+Tests run against an in-memory SQLite database with the application's tables;
+indexes that only PostgreSQL can build (expression and trigram indexes) are
+left out. Run from the backend directory:
+
+    python -m pytest tests
+"""
+import math
+import os
+import sys
+
+import pytest
+from sqlalchemy import Column, create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Base
+from services import query_cache
+
+def _plain_index(index) -> bool:
+    return (all(isinstance(expression, Column) for expression in index.expressions)
+            and not index.dialect_options["postgresql"].get("using"))
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _connect(connection, _record):
+        # Byte order collation of the geohash column
+        connection.create_collation("C", lambda a, b: (a > b) - (a < b))
+        # PostgreSQL functions used by the services
+        connection.create_function("least", -1, min)
+        connection.create_function("greatest", -1, max)
+        connection.create_function("floor", 1, math.floor)
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            # The table without its indexes, then the indexes SQLite supports
+            indexes, table.indexes = table.indexes, set()
+            try:
+                table.create(connection)
+            finally:
+                table.indexes = indexes
+            for index in indexes:
+                if _plain_index(index):
+                    index.create(connection)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements executed on the engine, in order."""
+    executed = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(_connection, _cursor, statement, _parameters, _context, _executemany):
+        executed.append(statement)
+
+    return executed
+
+@pytest.fixture(autouse=True)
+def no_query_cache(monkeypatch):
+    """Service functions query the database on every call."""
+    monkeypatch.setattr(query_cache, "QUERY_CACHE_ENABLED", False)
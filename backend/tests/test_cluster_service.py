@@ -0,0 +1,57 @@
+"""
+Tests of the map cluster tile cache.
+"""
+import pytest
+
+from models import Photo
+from services import cluster_service
+from utils.geo_utils import optional_geohash
+
+# Inside a single tile at zoom 8
+BBOX = "24.5,59.7,25.0,59.9"
+
+def photo(name: str, latitude: float, longitude: float) -> Photo:
+    return Photo(file_path=f"/photos/{name}.jpg", gps_latitude=latitude, gps_longitude=longitude,
+                 geohash=optional_geohash(latitude, longitude))
+
+@pytest.fixture(autouse=True)
+def empty_tile_cache():
+    cluster_service._tile_cache.clear()
+    yield
+    cluster_service._tile_cache.clear()
+
+def cluster_count(db):
+    return sum(cluster["count"] for cluster in cluster_service.get_clusters(db, BBOX, zoom=8)["clusters"])
+
+def test_tiles_are_cached_until_a_point_is_invalidated(db):
+    db.add(photo("1", 59.80, 24.75))
+    db.commit()
+    assert cluster_count(db) == 1
+
+    db.add(photo("2", 59.81, 24.76))
+    db.commit()
+    assert cluster_count(db) == 1
+    cluster_service.invalidate_point(59.81, 24.76)
+    assert cluster_count(db) == 2
+
+def test_clusters_computed_during_an_invalidation_are_not_cached(db, monkeypatch):
+    db.add(photo("1", 59.80, 24.75))
+    db.commit()
+    compute = cluster_service._compute_tile_clusters
+    written = []
+
+    def write_during_query(*args):
+        clusters = compute(*args)
+        if not written:
+            # A photo is added and its tile invalidated after the query read the tile
+            db.add(photo("2", 59.81, 24.76))
+            db.commit()
+            cluster_service.invalidate_point(59.81, 24.76)
+            written.append(True)
+        return clusters
+
+    monkeypatch.setattr(cluster_service, "_compute_tile_clusters", write_during_query)
+    assert cluster_count(db) == 1
+    monkeypatch.setattr(cluster_service, "_compute_tile_clusters", compute)
+
+    assert cluster_count(db) == 2
@@ -0,0 +1,57 @@
+"""
+Tests of the size-bounded disk cache.
+"""
+import os
+import time
+
+from utils import disk_cache
+from utils.disk_cache import TEMP_FILE_MAX_AGE, DiskLRUCache
+
+def writer(content: bytes):
+    def create(path):
+        with open(path, "wb") as f:
+            f.write(content)
+    return create
+
+def test_startup_keeps_temporary_files_of_other_processes(tmp_path):
+    (tmp_path / "ab").mkdir()
+    writing = tmp_path / "ab" / "abcd.webp.4242.1.tmp"
+    writing.write_bytes(b"partial")
+    left_over = tmp_path / "ab" / "abce.webp.4243.1.tmp"
+    left_over.write_bytes(b"partial")
+    stale = time.time() - TEMP_FILE_MAX_AGE - 60
+    os.utime(left_over, (stale, stale))
+
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1000)
+
+    assert writing.exists()
+    assert not left_over.exists()
+    assert len(cache) == 0
+
+def test_pinned_file_is_not_evicted_until_released(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10)
+    path = cache.get_or_create("first", writer(b"12345678"), pin=True)
+    cache.get_or_create("second", writer(b"abcdefgh"))
+    assert os.path.exists(path)
+
+    cache.release(path)
+
+    assert not os.path.exists(path)
+    assert cache.stats()["bytes"] <= 10
+
+def test_cache_hit_can_be_pinned(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10)
+    cache.get_or_create("first", writer(b"12345678"))
+    path = cache.get_or_create("first", writer(b"12345678"), pin=True)
+    cache.get_or_create("second", writer(b"abcdefgh"))
+
+    assert os.path.exists(path)
+
+def test_unreleased_pin_expires(tmp_path, monkeypatch):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=10)
+    path = cache.get_or_create("first", writer(b"12345678"), pin=True)
+    monkeypatch.setattr(disk_cache, "PIN_MAX_AGE", -1)
+
+    cache.get_or_create("second", writer(b"abcdefgh"))
+
+    assert not os.path.exists(path)
@@ -0,0 +1,69 @@
+"""
+Tests of the in-process EXIF header parser.
+"""
+import io
+from fractions import Fraction
+
+import pytest
+from PIL import Image
+
+from utils import exif_reader
+from utils.exif_parser import PrefixTooShort, parse_bytes, parse_header
+from utils.exif_reader import get_prefix_metadata
+
+@pytest.fixture(autouse=True)
+def native_parser(monkeypatch):
+    monkeypatch.setattr(exif_reader, "EXIF_NATIVE_PARSER", True)
+
+def exif_block() -> bytes:
+    exif = Image.Exif()
+    exif[0x010F] = "Apple"
+    exif[0x0110] = "iPhone 13"
+    exif.get_ifd(0x8769)[0x9003] = "2025:04:30 10:15:00"
+    exif.get_ifd(0x8769)[0x9011] = "+03:00"
+    gps = exif.get_ifd(0x8825)
+    gps[1], gps[3] = "N", "E"
+    gps[2] = (Fraction(59), Fraction(26), Fraction(1320, 100))
+    gps[4] = (Fraction(24), Fraction(45), Fraction(1296, 100))
+    return exif.tobytes()
+
+def image_bytes(fmt: str) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (320, 240), (40, 120, 40)).save(out, fmt, exif=exif_block())
+    return out.getvalue()
+
+@pytest.mark.parametrize("fmt", ["JPEG", "TIFF"])
+def test_metadata_of_complete_file(fmt):
+    metadata = get_prefix_metadata(image_bytes(fmt), f"photo.{fmt.lower()}")
+
+    assert metadata["date"] == "2025-04-30"
+    assert metadata["taken_at"] == "2025-04-30T10:15:00+03:00"
+    assert metadata["gps_latitude"] == pytest.approx(59.437)
+    assert metadata["gps_longitude"] == pytest.approx(24.7536)
+    assert (metadata["camera_make"], metadata["camera_model"]) == ("Apple", "iPhone 13")
+
+def test_short_prefix_reports_required_bytes():
+    data = image_bytes("JPEG")
+    length = 100
+    # required_bytes is a lower bound; sending that much reveals the next segment
+    while True:
+        try:
+            metadata = parse_bytes(data[:length], "photo.jpg", complete=False)
+            break
+        except PrefixTooShort as error:
+            assert length < error.required_bytes <= len(data)
+            length = error.required_bytes
+
+    assert metadata == parse_bytes(data, "photo.jpg")
+
+def test_header_of_file_matches_bytes(tmp_path):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(image_bytes("JPEG"))
+
+    assert parse_header(str(path)) == parse_bytes(path.read_bytes(), "photo.jpg")
+
+def test_other_formats_are_left_to_exiftool():
+    out = io.BytesIO()
+    Image.new("RGB", (10, 10)).save(out, "PNG")
+
+    assert parse_bytes(out.getvalue(), "photo.png") is None
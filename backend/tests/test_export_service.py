@@ -0,0 +1,74 @@
+"""
+Tests of the catalog export.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import Photo, PhotoSpeciesRelation, Species
+from services import columnar_export, export_service, photo_service
+
+def add_catalog(db):
+    species = Species(scientific_name="Betula pendula", common_name="Silver Birch", family="Betulaceae")
+    kept, deleted = Photo(file_path="/photos/kept.jpg"), Photo(file_path="/photos/deleted.jpg")
+    db.add_all([species, kept, deleted])
+    db.flush()
+    db.add(PhotoSpeciesRelation(photo_id=kept.id, species_id=species.id, category="primary"))
+    db.commit()
+    return kept.id, deleted.id
+
+def ndjson(db, since=None):
+    return [json.loads(line) for chunk in export_service.iter_ndjson(db, since)
+            for line in chunk.decode("utf-8").splitlines()]
+
+def test_delta_export_has_tombstones_of_deleted_photos(db):
+    kept_id, deleted_id = add_catalog(db)
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    assert photo_service.delete_photo(db, deleted_id)
+
+    documents = ndjson(db, since)
+    assert documents[0]["id"] == kept_id and len(documents[0]["species"]) == 1
+    assert documents[1] == {"id": deleted_id, "deleted": True}
+
+def test_full_export_has_no_tombstones(db):
+    kept_id, deleted_id = add_catalog(db)
+    photo_service.delete_photo(db, deleted_id)
+
+    assert [document["id"] for document in ndjson(db)] == [kept_id]
+
+def test_csv_tombstone_row(db):
+    _, deleted_id = add_catalog(db)
+    photo_service.delete_photo(db, deleted_id)
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    text = b"".join(export_service.iter_csv(db, since)).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(text)))
+
+    assert rows[-1]["id"] == str(deleted_id) and rows[-1]["deleted"] == "True"
+    assert rows[-1]["file_path"] == ""
+    assert all(row["deleted"] == "False" for row in rows[:-1])
+
+def test_old_deletions_are_not_in_later_deltas(db):
+    _, deleted_id = add_catalog(db)
+    photo_service.delete_photo(db, deleted_id)
+    since = datetime.now(timezone.utc) + export_service.SNAPSHOT_OVERLAP + timedelta(hours=1)
+
+    assert ndjson(db, since) == []
+
+def test_parquet_delta_has_deleted_column(db, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    kept_id, deleted_id = add_catalog(db)
+    photo_service.delete_photo(db, deleted_id)
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+    path = str(tmp_path / "changes.parquet")
+
+    columnar_export.write_batches(path, export_service.iter_row_batches(db, since=since), "parquet",
+                                  export_service.snapshot_time(), since)
+
+    table = pq.read_table(path).to_pydict()
+    assert table["photo_id"] == [kept_id, deleted_id]
+    assert table["deleted"] == [False, True]
@@ -0,0 +1,40 @@
+"""
+Tests of the metadata memo shared by the preview and the upload.
+"""
+import io
+
+from services.metadata_cache import MetadataMemo
+from utils.file_storage import hash_stream
+
+CONTENT = bytes(range(256)) * 64
+METADATA = {"date": "2025-04-30", "camera_make": "Apple"}
+
+def test_preview_token_matches_the_uploaded_file():
+    memo = MetadataMemo()
+    token = memo.remember(CONTENT[:1024], METADATA)
+    upload = io.BytesIO(CONTENT)
+
+    assert memo.lookup(upload, token, hash_stream(upload)) == METADATA
+    assert upload.tell() == 0
+
+def test_token_of_another_file_misses():
+    memo = MetadataMemo()
+    token = memo.remember(CONTENT[:1024], METADATA)
+    other = io.BytesIO(b"x" + CONTENT[1:])
+
+    assert memo.lookup(other, token, hash_stream(other)) is None
+
+def test_whole_file_preview_is_found_by_content_hash():
+    memo = MetadataMemo()
+    memo.remember(CONTENT, METADATA, exiftool=True)
+    upload = io.BytesIO(CONTENT)
+
+    assert memo.lookup(upload, None, hash_stream(upload)) == METADATA
+    assert memo.stats()["exiftool_runs_saved"] == 1
+
+def test_malformed_token_falls_back_to_content_hash():
+    memo = MetadataMemo()
+    upload = io.BytesIO(CONTENT)
+
+    assert memo.lookup(upload, "not-a-token", hash_stream(upload)) is None
+    assert memo.stats()["misses"] == 1
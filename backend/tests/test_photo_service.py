@@ -0,0 +1,58 @@
+"""
+Tests of photo_service reads.
+"""
+from models import Photo, PhotoSpeciesRelation, Species
+from services import photo_service
+
+# A page of photos with their species: photos, relations and species
+MAX_STATEMENTS = 3
+
+def add_photos(db, count: int, species_per_photo: int = 2):
+    """Photos with species relations; returns their IDs."""
+    species = [Species(scientific_name=f"Species {i}", common_name=f"Liik {i}", family=f"Family {i % 3}")
+               for i in range(10)]
+    db.add_all(species)
+    db.flush()
+    photo_ids = []
+    for i in range(count):
+        photo = Photo(file_path=f"/photos/{i}.jpg", date="2024-05-01", location=f"Koht {i}")
+        db.add(photo)
+        db.flush()
+        for offset in range(species_per_photo):
+            db.add(PhotoSpeciesRelation(photo_id=photo.id, species_id=species[(i + offset) % len(species)].id,
+                                        category="primary" if offset == 0 else "secondary"))
+        photo_ids.append(photo.id)
+    db.commit()
+    # Later reads load everything from the database
+    db.expunge_all()
+    return photo_ids
+
+def test_get_photos_page_uses_fixed_number_of_statements(db, statements):
+    add_photos(db, 100)
+    statements.clear()
+
+    photos = photo_service.get_photos(db, limit=100)
+
+    assert len(photos) == 100
+    assert all(len(photo["species"]) == 2 for photo in photos)
+    assert len(statements) <= MAX_STATEMENTS, statements
+
+def test_get_photos_statements_do_not_grow_with_page_size(db, statements):
+    add_photos(db, 100)
+    statements.clear()
+    photo_service.get_photos(db, limit=10)
+    small_page = len(statements)
+    statements.clear()
+    photo_service.get_photos(db, limit=100)
+
+    assert len(statements) == small_page
+
+def test_get_photo_with_species_uses_fixed_number_of_statements(db, statements):
+    photo_id = add_photos(db, 5, species_per_photo=3)[2]
+    statements.clear()
+
+    result = photo_service.get_photo_with_species(db, photo_id)
+
+    assert {species["relation_category"] for species in result["species"]} == {"primary", "secondary"}
+    assert len(result["species"]) == 3
+    assert len(statements) <= MAX_STATEMENTS, statements
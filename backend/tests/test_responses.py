@@ -0,0 +1,36 @@
+"""
+Tests of response encoding and compression.
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils import compression, responses
+from utils.compression import CompressionMiddleware, choose_encoding
+from utils.responses import FastJSONResponse
+
+def make_client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/items")
+    def items():
+        return [{"id": i, "name": f"Liik {i}"} for i in range(200)]
+
+    return TestClient(app)
+
+def test_dependencies_are_installed():
+    assert responses.orjson is not None
+    assert compression.brotli is not None
+
+def test_brotli_is_preferred_when_accepted():
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+    assert choose_encoding("identity") is None
+
+def test_json_response_is_brotli_compressed():
+    response = make_client().get("/items", headers={"Accept-Encoding": "br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in response.headers["vary"]
+    # httpx decodes brotli bodies when the brotli package is installed
+    assert response.json()[199] == {"id": 199, "name": "Liik 199"}
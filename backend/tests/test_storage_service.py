@@ -0,0 +1,78 @@
+"""
+Tests of the content-addressed file storage and its photo records.
+"""
+import io
+import os
+
+from models import Photo
+from services import storage_service
+from utils.file_storage import find_blob, save_upload
+
+CONTENT = b"\xff\xd8\xff\xe0 not really a jpeg " * 100
+
+def blob_files(storage_path):
+    return sorted(name for _, _, names in os.walk(storage_path) for name in names)
+
+def test_same_content_under_another_extension_is_not_written_again(tmp_path):
+    first = save_upload(io.BytesIO(CONTENT), "x.jpg", str(tmp_path))
+    second = save_upload(io.BytesIO(CONTENT), "x.jpeg", str(tmp_path))
+    third = save_upload(io.BytesIO(CONTENT), "x", str(tmp_path))
+
+    assert first.created and not second.created and not third.created
+    assert second.path == third.path == first.path
+    assert blob_files(tmp_path) == [os.path.basename(first.path)]
+    assert find_blob(first.content_hash, str(tmp_path)) == first.path
+
+def test_blob_of_photo_stored_elsewhere_is_removed(db, tmp_path):
+    stored = save_upload(io.BytesIO(CONTENT), "x.jpg", str(tmp_path))
+    # Photo stored before content addressing, with the same content
+    db.add(Photo(file_path="/file_storage/2023/x.jpg", content_hash=stored.content_hash))
+    db.commit()
+
+    photo, created = storage_service.create_or_get_photo(db, stored, fileobj=io.BytesIO(CONTENT))
+
+    assert not created and photo.file_path == "/file_storage/2023/x.jpg"
+    assert blob_files(tmp_path) == []
+
+def test_discard_removes_unused_file(db, tmp_path):
+    stored = save_upload(io.BytesIO(CONTENT), "x.jpg", str(tmp_path))
+
+    storage_service.discard_unused(db, stored)
+
+    assert blob_files(tmp_path) == []
+
+def test_discard_keeps_file_of_concurrent_upload(db, tmp_path):
+    failed = save_upload(io.BytesIO(CONTENT), "x.jpg", str(tmp_path))
+    concurrent = save_upload(io.BytesIO(CONTENT), "x.jpg", str(tmp_path))
+    # The concurrent upload commits its photo before the first one gives up
+    db.add(Photo(file_path=concurrent.path, content_hash=concurrent.content_hash))
+    db.commit()
+
+    storage_service.discard_unused(db, failed)
+
+    assert blob_files(tmp_path) == [os.path.basename(failed.path)]
+
+def test_file_discarded_before_photo_commit_is_restored(db, tmp_path):
+    failed = save_upload(io.BytesIO(CONTENT), "x.jpg", str(tmp_path))
+    concurrent = save_upload(io.BytesIO(CONTENT), "x.jpg", str(tmp_path))
+    # The first upload gives up before the concurrent one commits its photo
+    storage_service.discard_unused(db, failed)
+    db.add(Photo(file_path=concurrent.path, content_hash=concurrent.content_hash))
+    db.commit()
+
+    photo, created = storage_service.create_or_get_photo(db, concurrent, fileobj=io.BytesIO(CONTENT))
+
+    assert not created
+    with open(photo.file_path, "rb") as f:
+        assert f.read() == CONTENT
+
+def test_repeated_upload_returns_existing_photo(db, tmp_path):
+    stored = save_upload(io.BytesIO(CONTENT), "x.jpg", str(tmp_path))
+    photo, created = storage_service.create_or_get_photo(db, stored, date="2024-05-01", metadata={})
+
+    again = save_upload(io.BytesIO(CONTENT), "copy.JPEG", str(tmp_path))
+    duplicate, created_again = storage_service.create_or_get_photo(db, again, metadata={})
+
+    assert created and not created_again
+    assert duplicate.id == photo.id
+    assert blob_files(tmp_path) == [os.path.basename(stored.path)]
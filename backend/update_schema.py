@@ -3,15 +3,59 @@ Script to update the database schema for photo metadata fields.
 Run this to add GPS and camera info columns to the photos table.
 """
 from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
 import logging
 
 # Import database connection URL from your config
 from database import DATABASE_URL
+from utils.date_utils import parse_photo_date
+from utils.geo_utils import encode_geohash
+from services import species_stats_service
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def backfill_taken_at(connection):
+    """Fill taken_at from the existing date strings where it is still missing."""
+    rows = connection.execute(text("""
+        SELECT id, date FROM photos
+        WHERE taken_at IS NULL AND date IS NOT NULL
+    """)).fetchall()
+    
+    updated = 0
+    for photo_id, date_value in rows:
+        taken_at = parse_photo_date(date_value)
+        if taken_at:
+            connection.execute(
+                text("UPDATE photos SET taken_at = :taken_at WHERE id = :id"),
+                {"taken_at": taken_at, "id": photo_id}
+            )
+            updated += 1
+    logger.info(f"taken_at täidetud {updated} fotol ({len(rows) - updated} kuupäeva ei õnnestunud lugeda)")
+
+def backfill_geohash(connection):
+    """Compute geohash for photos that have coordinates but no geohash yet."""
+    rows = connection.execute(text("""
+        SELECT id, gps_latitude, gps_longitude FROM photos
+        WHERE geohash IS NULL AND gps_latitude IS NOT NULL AND gps_longitude IS NOT NULL
+    """)).fetchall()
+    
+    for photo_id, latitude, longitude in rows:
+        connection.execute(
+            text("UPDATE photos SET geohash = :geohash WHERE id = :id"),
+            {"geohash": encode_geohash(latitude, longitude), "id": photo_id}
+        )
+    logger.info(f"geohash arvutatud {len(rows)} fotole")
+
+def backfill_species_stats(connection):
+    """Compute the species_stats rows of all species."""
+    session = Session(bind=connection)
+    species_stats_service.refresh_species_stats(session)
+    session.flush()
+    count = connection.execute(text("SELECT count(*) FROM species_stats")).scalar()
+    logger.info(f"species_stats arvutatud {count} liigile")
+
 def update_schema():
     """Update the database schema to include new metadata columns."""
     # Connect to database
@@ -43,6 +87,119 @@ def update_schema():
             ADD COLUMN IF NOT EXISTS estonian_name VARCHAR
         """))
         
+        # Add typed capture timestamp column and its indexes
+        logger.info("Adding taken_at column to photos table...")
+        connection.execute(text("""
+            ALTER TABLE photos
+            ADD COLUMN IF NOT EXISTS taken_at TIMESTAMP WITH TIME ZONE
+        """))
+        backfill_taken_at(connection)
+        
+        # Date ordering now uses taken_at instead of the date string
+        connection.execute(text("DROP INDEX IF EXISTS ix_photos_date_id"))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_photos_taken_at_id
+            ON photos (taken_at DESC NULLS LAST, id DESC)
+        """))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_photos_taken_month
+            ON photos (date_part('month', timezone('UTC', taken_at)))
+        """))
+        
+        # Add trigram search indexes for location and species names
+        logger.info("Adding pg_trgm search indexes...")
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_photos_location_trgm
+            ON photos USING gin (location gin_trgm_ops)
+        """))
+        for column in ("scientific_name", "common_name", "estonian_name"):
+            connection.execute(text(f"""
+                CREATE INDEX IF NOT EXISTS ix_species_{column}_trgm
+                ON species USING gin ({column} gin_trgm_ops)
+            """))
+        
+        # Add geohash column for bounding box and radius queries
+        logger.info("Adding geohash column to photos table...")
+        connection.execute(text("""
+            ALTER TABLE photos
+            ADD COLUMN IF NOT EXISTS geohash VARCHAR(12) COLLATE "C"
+        """))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_photos_geohash ON photos (geohash)
+        """))
+        backfill_geohash(connection)
+
+        # Add content hashes of the stored files (filled with: python backfill.py hashes)
+        logger.info("Adding content_hash column to photos table...")
+        connection.execute(text("""
+            ALTER TABLE photos
+            ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)
+        """))
+        connection.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS ix_photos_content_hash ON photos (content_hash)
+        """))
+
+        # Add rendition paths (generated with: python backfill.py renditions)
+        logger.info("Adding renditions column to photos table...")
+        connection.execute(text("""
+            ALTER TABLE photos
+            ADD COLUMN IF NOT EXISTS renditions JSON
+        """))
+
+        # Add change tracking for ETags
+        logger.info("Adding updated_at columns and collection versions...")
+        for table in ("photos", "species", "photo_species_relation"):
+            connection.execute(text(f"""
+                ALTER TABLE {table}
+                ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            """))
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS collection_versions (
+                name VARCHAR(50) PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+        """))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_photo_species_relation_photo_id
+            ON photo_species_relation (photo_id)
+        """))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_photo_species_relation_species_id
+            ON photo_species_relation (species_id)
+        """))
+
+        # Add the species statistics aggregate (photo counts and cover photos)
+        logger.info("Adding species_stats table...")
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS species_stats (
+                species_id INTEGER PRIMARY KEY REFERENCES species (id) ON DELETE CASCADE,
+                photo_count INTEGER NOT NULL DEFAULT 0,
+                first_observed_at TIMESTAMPTZ,
+                last_observed_at TIMESTAMPTZ,
+                cover_photo_id INTEGER REFERENCES photos (id) ON DELETE SET NULL
+            )
+        """))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_species_stats_photo_count ON species_stats (photo_count)
+        """))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_species_stats_last_observed_at ON species_stats (last_observed_at)
+        """))
+        backfill_species_stats(connection)
+
+        # Add tombstones of deleted photos for delta exports
+        logger.info("Adding deleted_photos table...")
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS deleted_photos (
+                photo_id INTEGER PRIMARY KEY,
+                deleted_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_deleted_photos_deleted_at ON deleted_photos (deleted_at)
+        """))
+
         # Check if app_settings table exists
         logger.info("Kontrollime app_settings tabeli olemasolu...")
         result = connection.execute(text("""
@@ -0,0 +1,214 @@
+"""
+Utility module with a small in-process result cache.
+Entries expire after a fixed time and the least recently used entries are
+dropped when the cache is full, either by entry count or by estimated size.
+Entries can carry tags, so writes can drop exactly the entries they affect.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+# Marker for a cache miss, so that None can be cached as a value
+MISSING = object()
+
+# Named caches, for the statistics endpoint; any object with stats() and clear()
+_registry: Dict[str, Any] = {}
+
+def register_cache(name: str, cache: Any) -> None:
+    """Report a cache in cache_stats and clear it in clear_caches."""
+    _registry[name] = cache
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value as the length of its JSON form."""
+    return len(json.dumps(value, default=str))
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0,
+                 max_bytes: Optional[int] = None, name: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept
+            ttl: Time to live of an entry in seconds
+            max_bytes: Optional limit for the estimated total size of the values
+            name: Optional name under which cache_stats reports the cache
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.name = name
+        # key -> (expires_at, value, size, tags)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, set] = {}
+        self._size = 0
+        self._generation = 0
+        self._invalidated_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        if name:
+            register_cache(name, self)
+
+    @property
+    def generation(self) -> int:
+        """Counter increased by every invalidation, see set(if_generation=...)."""
+        return self._generation
+
+    @property
+    def invalidated_at(self) -> float:
+        """time.monotonic() of the last invalidation, 0.0 if there was none."""
+        return self._invalidated_at
+
+    def _invalidated(self) -> None:
+        """Record an invalidation; the lock must be held."""
+        self._generation += 1
+        self._invalidated_at = time.monotonic()
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry and its tag references; the lock must be held."""
+        _, _, size, tags = self._entries.pop(key)
+        self._size -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Return the cached value for a key.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or MISSING if the key is absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISSING
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self._misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = (),
+            if_generation: Optional[int] = None) -> None:
+        """
+        Store a value, evicting the least recently used entries if needed.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            tags: Tags for invalidate_tags
+            if_generation: Value of generation read before the value was
+                computed; the value is not stored if an invalidation happened
+                in between, as it may already be stale
+        """
+        size = estimate_size(value) if self.max_bytes else 0
+        tags = frozenset(tags)
+        with self._lock:
+            if if_generation is not None and if_generation != self._generation:
+                return
+            if self.max_bytes and size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size, tags)
+            self._size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Remove all entries whose key matches a predicate.
+
+        Args:
+            predicate: Function returning True for keys to remove
+
+        Returns:
+            Number of removed entries
+        """
+        with self._lock:
+            self._invalidated()
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def invalidate_tags(self, *tags: Hashable) -> int:
+        """
+        Remove all entries carrying any of the given tags.
+
+        Args:
+            tags: Tags to invalidate
+
+        Returns:
+            Number of removed entries
+        """
+        with self._lock:
+            self._invalidated()
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._invalidated()
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return usage counters of the cache.
+
+        Returns:
+            Dictionary with entry count, estimated size, limits, hits,
+            misses, hit ratio and evictions
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._size if self.max_bytes else None,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else None,
+                "evictions": self._evictions
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Usage counters of all named caches."""
+    return {name: cache.stats() for name, cache in sorted(_registry.items())}
+
+def clear_caches() -> None:
+    """Remove all entries from all named caches."""
+    for cache in _registry.values():
+        cache.clear()
@@ -0,0 +1,118 @@
+"""
+Utility module for photo capture dates.
+Parses the date strings stored in Photo.date and EXIF timestamps into
+timezone-aware datetimes for the indexed Photo.taken_at column.
+
+Timestamps without an explicit UTC offset keep their wall-clock time and are
+stored as UTC, so date, month and year filters match the date the camera shows.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+# "2024-05-01", "2024-05-01 10:11", "2024:05:01 10:11:12", "2024-05-01T10:11:12.5+03:00"
+_DATETIME_RE = re.compile(
+    r"^\s*(\d{4})[-:](\d{2})[-:](\d{2})"
+    r"(?:[ T](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?)?"
+    r"\s*(Z|[+-]\d{2}:?\d{2})?\s*$"
+)
+_PERIOD_RE = re.compile(r"^\s*(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?\s*$")
+
+def _parse_offset(offset: Optional[str]) -> timezone:
+    """Convert "Z", "+03:00" or "-0500" into a timezone, UTC when missing."""
+    if not offset or offset == "Z":
+        return timezone.utc
+    sign = -1 if offset[0] == "-" else 1
+    digits = offset[1:].replace(":", "")
+    return timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:4])))
+
+def parse_photo_date(value: Optional[str], offset: Optional[str] = None) -> Optional[datetime]:
+    """
+    Parse a photo date string into a timezone-aware datetime.
+
+    Args:
+        value: Date or datetime string (ISO 8601 or EXIF "YYYY:MM:DD HH:MM:SS")
+        offset: Optional UTC offset such as EXIF OffsetTimeOriginal ("+03:00"),
+                used when the value itself has no offset
+
+    Returns:
+        Timezone-aware datetime, or None if the value cannot be parsed
+    """
+    if not value or not isinstance(value, str):
+        return None
+    match = _DATETIME_RE.match(value)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction, value_offset = match.groups()
+    try:
+        return datetime(
+            int(year), int(month), int(day),
+            int(hour or 0), int(minute or 0), int(second or 0),
+            int((fraction or "0").ljust(6, "0")),
+            tzinfo=_parse_offset(value_offset or offset)
+        )
+    except ValueError:
+        # Invalid calendar values like "0000:00:00 00:00:00" from some cameras
+        return None
+
+def parse_date_bound(value: str, end: bool = False) -> datetime:
+    """
+    Parse a date_from/date_to filter value.
+
+    Args:
+        value: Date ("YYYY-MM-DD") or datetime string
+        end: Whether this is an upper bound; a plain date then covers the whole day
+
+    Returns:
+        Timezone-aware datetime; upper bounds are exclusive (taken_at < bound)
+
+    Raises:
+        ValueError: If the value cannot be parsed
+    """
+    parsed = parse_photo_date(value)
+    if parsed is None:
+        raise ValueError(f"Vigane kuupäev: {value}")
+    if end and _PERIOD_RE.match(value) and len(value.strip()) == 10:
+        # date_to=2024-05-31 includes photos taken during that day
+        return parsed + timedelta(days=1)
+    if end:
+        return parsed + timedelta(microseconds=1)
+    return parsed
+
+def period_range(value: str) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Convert "YYYY", "YYYY-MM" or "YYYY-MM-DD" into a half-open datetime range.
+
+    Args:
+        value: Period string
+
+    Returns:
+        Tuple (start, end) with end exclusive, or None if the value is not a period
+    """
+    match = _PERIOD_RE.match(value or "")
+    if not match:
+        return None
+    year, month, day = match.groups()
+    try:
+        if day:
+            start = datetime(int(year), int(month), int(day), tzinfo=timezone.utc)
+            return start, start + timedelta(days=1)
+        if month:
+            return month_range(int(year), int(month))
+        return year_range(int(year))
+    except ValueError:
+        return None
+
+def year_range(year: int) -> Tuple[datetime, datetime]:
+    """Half-open datetime range covering a calendar year."""
+    return (datetime(year, 1, 1, tzinfo=timezone.utc),
+            datetime(year + 1, 1, 1, tzinfo=timezone.utc))
+
+def month_range(year: int, month: int) -> Tuple[datetime, datetime]:
+    """Half-open datetime range covering a calendar month."""
+    if not 1 <= month <= 12:
+        raise ValueError(f"Vigane kuu: {month}")
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    if month == 12:
+        return start, datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    return start, datetime(year, month + 1, 1, tzinfo=timezone.utc)
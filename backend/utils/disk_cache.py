@@ -0,0 +1,289 @@
+"""
+Utility module with a size-bounded file cache on disk.
+Files are evicted least recently used first when their total size exceeds
+the limit. Concurrent requests for a missing key are coalesced: one thread
+creates the file while the others wait for it and then share the result.
+
+The index is kept in memory and rebuilt from the directory at startup, with
+file modification times as the last access times. Several processes may
+share a directory; files created by another process are adopted when found,
+but each process enforces the size limit only for the files it knows.
+Temporary files carry the process ID and are removed at startup only once
+they are older than TEMP_FILE_MAX_AGE, so a starting process does not remove
+the files another process is still writing.
+
+A path returned by get_or_create may be evicted before the caller opens it.
+Callers that send the file later (e.g. a FileResponse after the handler has
+returned) pass pin=True and call release when done; eviction skips pinned
+files. A pin that is never released, e.g. because the client disconnected
+before the release ran, expires after PIN_MAX_AGE seconds.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from utils.cache import register_cache
+
+# Seconds after which a temporary file is taken to be left over from an interrupted write
+TEMP_FILE_MAX_AGE = 3600
+# Seconds after which an unreleased pin no longer protects a file from eviction
+PIN_MAX_AGE = 300
+
+class DiskLRUCache:
+    """Thread-safe LRU cache of files, limited by total size in bytes."""
+
+    def __init__(self, directory: str, max_bytes: int, name: Optional[str] = None):
+        """
+        Initialize the cache and index the files already in the directory.
+
+        Args:
+            directory: Cache directory (created if missing)
+            max_bytes: Maximum total size of the cached files
+            name: Optional name under which cache_stats reports the cache
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.name = name
+        # file name -> size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # file name -> [lock, number of waiting or creating threads]
+        self._creating: Dict[str, list] = {}
+        # file name -> [number of pins, time.monotonic() of the last pin]
+        self._pins: Dict[str, list] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        if name:
+            register_cache(name, self)
+
+    def _load_index(self) -> None:
+        files = []
+        now = time.time()
+        for root, _, names in os.walk(self.directory):
+            for file_name in names:
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                    if file_name.endswith(".tmp"):
+                        # Possibly being written by another process; removed only when left over
+                        if now - stat.st_mtime > TEMP_FILE_MAX_AGE:
+                            os.remove(path)
+                        continue
+                except OSError:
+                    # Renamed or removed by another process meanwhile
+                    continue
+                files.append((stat.st_mtime, os.path.relpath(path, self.directory), stat.st_size))
+        for _, relative_path, size in sorted(files):
+            self._entries[relative_path] = size
+            self._size += size
+        with self._lock:
+            self._evict()
+
+    def file_name(self, key: Hashable, suffix: str = "") -> str:
+        """Relative file name of a key, sharded by the first two hex digits of its hash."""
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(digest[:2], digest + suffix)
+
+    def _lookup(self, file_name: str) -> Optional[str]:
+        """Path of a cached file, marking it as recently used; the lock must be held."""
+        size = self._entries.get(file_name)
+        path = os.path.join(self.directory, file_name)
+        if size is None:
+            # Possibly created by another process sharing the directory
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return None
+            self._add(file_name, size)
+            return path
+        self._entries.move_to_end(file_name)
+        try:
+            # Keep the access order for the index rebuilt at the next startup
+            os.utime(path)
+        except OSError:
+            # Removed outside the cache
+            self._entries.pop(file_name)
+            self._size -= size
+            return None
+        return path
+
+    def _add(self, file_name: str, size: int) -> None:
+        """Add a file to the index and evict if needed; the lock must be held."""
+        self._entries[file_name] = size
+        self._size += size
+        self._evict()
+
+    def _pinned(self, file_name: str, now: float) -> bool:
+        """Whether a file is pinned; the lock must be held."""
+        pin = self._pins.get(file_name)
+        if pin is not None and now - pin[1] > PIN_MAX_AGE:
+            # Never released
+            del self._pins[file_name]
+            return False
+        return pin is not None
+
+    def _pin(self, file_name: str) -> None:
+        """Protect a file from eviction until release; the lock must be held."""
+        pin = self._pins.setdefault(file_name, [0, 0.0])
+        pin[0] += 1
+        pin[1] = time.monotonic()
+
+    def _evict(self) -> None:
+        """Remove least recently used unpinned files until within the limit; the lock must be held."""
+        now = time.monotonic()
+        # The most recent file is kept even if it alone exceeds the limit
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            file_name = next((name for name in self._entries if not self._pinned(name, now)), None)
+            if file_name is None or file_name == next(reversed(self._entries)):
+                # Everything else is being sent; the limit is enforced once pins are released
+                break
+            size = self._entries.pop(file_name)
+            self._size -= size
+            self._evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except OSError:
+                pass
+
+    def get(self, key: Hashable, suffix: str = "") -> Optional[str]:
+        """
+        Return the path of a cached file.
+
+        Args:
+            key: Cache key
+            suffix: File name suffix used when the file was created
+
+        Returns:
+            Absolute path, or None if the file is not cached
+        """
+        with self._lock:
+            path = self._lookup(self.file_name(key, suffix))
+            if path is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return path
+
+    def get_or_create(self, key: Hashable, create: Callable[[str], None], suffix: str = "",
+                      pin: bool = False) -> str:
+        """
+        Return the path of a cached file, creating it on a miss.
+
+        Only one thread creates a missing file; other threads asking for the
+        same key meanwhile wait and get the same file.
+
+        Args:
+            key: Cache key
+            create: Function writing the file to the path it is given
+            suffix: File name suffix, e.g. ".webp"
+            pin: Keep the file from being evicted until release(path) is called
+
+        Returns:
+            Absolute path of the cached file
+
+        Raises:
+            Exception: Whatever create raises; waiting threads then try themselves
+        """
+        file_name = self.file_name(key, suffix)
+        with self._lock:
+            path = self._lookup(file_name)
+            if path is not None:
+                self._hits += 1
+                if pin:
+                    self._pin(file_name)
+                return path
+            waiter = self._creating.setdefault(file_name, [threading.Lock(), 0])
+            waiter[1] += 1
+        try:
+            with waiter[0]:
+                with self._lock:
+                    path = self._lookup(file_name)
+                    if path is not None:
+                        # Created by another thread while this one waited
+                        self._coalesced += 1
+                        if pin:
+                            self._pin(file_name)
+                        return path
+                    self._misses += 1
+                path = os.path.join(self.directory, file_name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    create(temp_path)
+                    os.replace(temp_path, path)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+                with self._lock:
+                    if pin:
+                        self._pin(file_name)
+                    self._add(file_name, os.path.getsize(path))
+                return path
+        finally:
+            with self._lock:
+                waiter[1] -= 1
+                if waiter[1] == 0:
+                    del self._creating[file_name]
+
+    def release(self, path: str) -> None:
+        """
+        Release a pin taken with get_or_create(pin=True).
+
+        Args:
+            path: Path returned by get_or_create
+        """
+        file_name = os.path.relpath(path, self.directory)
+        with self._lock:
+            pin = self._pins.get(file_name)
+            if pin is None:
+                return
+            pin[0] -= 1
+            if pin[0] <= 0:
+                del self._pins[file_name]
+                # Enforce the limit postponed while the file was pinned
+                self._evict()
+
+    def clear(self) -> None:
+        """Remove all cached files."""
+        with self._lock:
+            for file_name in self._entries:
+                try:
+                    os.remove(os.path.join(self.directory, file_name))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return usage counters of the cache.
+
+        Returns:
+            Dictionary with file count, total size, limit, hits, misses,
+            coalesced requests, hit ratio and evictions
+        """
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "hit_ratio": (self._hits + self._coalesced) / lookups if lookups else None,
+                "evictions": self._evictions
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
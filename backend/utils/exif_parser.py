@@ -0,0 +1,418 @@
+"""
+Utility module reading the stored EXIF fields directly from image file headers.
+
+JPEG (APP1 Exif segment), HEIF/HEIC/AVIF (Exif item) and TIFF files are
+parsed in-process: the file is memory-mapped, so only the pages holding the
+header are read, and the IFD0, Exif and GPS IFDs are decoded with
+precompiled structs. Only the tags exif_reader uses are decoded, into the
+same shape as exiftool's -json -g1 output, including exiftool's print
+formatting of GPS coordinates, so both paths normalize to the same metadata.
+
+parse_header returns None for files it cannot read the same way exiftool
+would (other formats, corrupt headers, GPS only in XMP); these are read
+with exiftool. parse_bytes reads the same from memory, also from just the
+leading bytes of a file, and raises PrefixTooShort when they do not hold
+the whole header.
+"""
+import mmap
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+# Tags read from each IFD, by exiftool tag name
+IFD0_TAGS = {0x010F: "Make", 0x0110: "Model", 0x0132: "ModifyDate"}
+EXIF_IFD_TAGS = {
+    0x9003: "DateTimeOriginal", 0x9004: "CreateDate",
+    0x9010: "OffsetTime", 0x9011: "OffsetTimeOriginal", 0x9012: "OffsetTimeDigitized",
+}
+GPS_TAGS = {
+    0x0001: "GPSLatitudeRef", 0x0002: "GPSLatitude", 0x0003: "GPSLongitudeRef",
+    0x0004: "GPSLongitude", 0x0006: "GPSAltitude",
+}
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+
+TIFF_EXTENSIONS = {".tif", ".tiff"}
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1", b"avif", b"avis"}
+
+# exiftool's print values of the GPS reference tags
+_REFERENCES = {"GPSLatitudeRef": {"N": "North", "S": "South"}, "GPSLongitudeRef": {"E": "East", "W": "West"}}
+
+# Value sizes of the TIFF field types (13 is IFD, used for sub-IFD pointers)
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4}
+_ASCII, _SHORT, _LONG, _RATIONAL, _IFD = 2, 3, 4, 5, 13
+
+_JPEG_SEGMENT = struct.Struct(">BBH")
+_BOX_HEADER = struct.Struct(">I4s")
+_U16_BE = struct.Struct(">H")
+_U32_BE = struct.Struct(">I")
+_U64_BE = struct.Struct(">Q")
+
+# Structs by TIFF byte order: u16, u32, IFD entry (tag, type, count, value/offset)
+_TIFF_STRUCTS = {
+    b"II": (struct.Struct("<H"), struct.Struct("<I"), struct.Struct("<HHII")),
+    b"MM": (struct.Struct(">H"), struct.Struct(">I"), struct.Struct(">HHII")),
+}
+
+_EXIF_HEADER = b"Exif\0"
+_XMP_HEADER = b"http://ns.adobe.com/xap/1.0/\0"
+
+class _Unsupported(Exception):
+    """The header cannot be read like exiftool would; use exiftool instead."""
+
+class _Truncated(_Unsupported):
+    """The header continues after the end of the data."""
+
+    def __init__(self, required_bytes: int):
+        super().__init__(f"header needs at least {required_bytes} bytes")
+        self.required_bytes = required_bytes
+
+class PrefixTooShort(Exception):
+    """The leading bytes of a file end before its metadata header does."""
+
+    def __init__(self, required_bytes: int):
+        super().__init__(f"At least {required_bytes} bytes of the file are needed")
+        self.required_bytes = required_bytes
+
+def _require(buf, needed: int, end: int) -> None:
+    """Check that buf[:needed] lies within a structure ending at end."""
+    if needed > end:
+        # Past the end of the data more bytes may help; inside the data the header is corrupt
+        if end >= len(buf):
+            raise _Truncated(needed)
+        raise _Unsupported("value outside of its segment")
+
+def _tiff_tags(buf, start: int, end: int) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """IFD0, Exif IFD and GPS IFD tags of the TIFF structure in buf[start:end]."""
+    _require(buf, start + 8, end)
+    byte_order = bytes(buf[start:start + 2])
+    if byte_order not in _TIFF_STRUCTS:
+        raise _Unsupported("not a TIFF header")
+    u16, u32, entry = _TIFF_STRUCTS[byte_order]
+    if u16.unpack_from(buf, start + 2)[0] != 42:
+        raise _Unsupported("not a TIFF header")
+
+    def read_ifd(offset: int, names: Dict[int, str]) -> Tuple[Dict[str, Any], Dict[int, int]]:
+        position = start + offset
+        if offset < 8:
+            raise _Unsupported("IFD inside the TIFF header")
+        _require(buf, position + 2, end)
+        entries = u16.unpack_from(buf, position)[0]
+        _require(buf, position + 2 + entries * 12, end)
+        values, pointers = {}, {}
+        for index in range(entries):
+            tag, field_type, count, value = entry.unpack_from(buf, position + 2 + index * 12)
+            if tag in (EXIF_IFD_POINTER, GPS_IFD_POINTER) and field_type in (_LONG, _IFD):
+                pointers[tag] = value
+                continue
+            name = names.get(tag)
+            size = _TYPE_SIZES.get(field_type, 0) * count
+            if name is None or not size:
+                continue
+            data_start = position + 2 + index * 12 + 8 if size <= 4 else start + value
+            _require(buf, data_start + size, end)
+            values[name] = (field_type, count, data_start)
+        return values, pointers
+
+    def decode(field) -> Any:
+        field_type, count, data_start = field
+        if field_type == _ASCII:
+            raw = bytes(buf[data_start:data_start + count]).split(b"\0", 1)[0]
+            try:
+                return raw.decode("utf-8")
+            except UnicodeDecodeError:
+                return raw.decode("latin-1")
+        if field_type == _RATIONAL:
+            return [(u32.unpack_from(buf, data_start + i * 8)[0], u32.unpack_from(buf, data_start + i * 8 + 4)[0])
+                    for i in range(count)]
+        if field_type == _SHORT:
+            return [u16.unpack_from(buf, data_start + i * 2)[0] for i in range(count)]
+        return None
+
+    ifd0, pointers = read_ifd(u32.unpack_from(buf, start + 4)[0], IFD0_TAGS)
+    exif_ifd = read_ifd(pointers[EXIF_IFD_POINTER], EXIF_IFD_TAGS)[0] if EXIF_IFD_POINTER in pointers else {}
+    gps_ifd = read_ifd(pointers[GPS_IFD_POINTER], GPS_TAGS)[0] if GPS_IFD_POINTER in pointers else {}
+    return tuple({name: decode(field) for name, field in ifd.items()} for ifd in (ifd0, exif_ifd, gps_ifd))
+
+def _round_float(value: float) -> float:
+    """exiftool's rational value: 10 significant digits."""
+    return float(f"{value:.10g}")
+
+def _to_degrees(rationals: List[Tuple[int, int]]) -> float:
+    """Decimal degrees of a GPS degrees/minutes/seconds value, like exiftool's ToDegrees."""
+    if not rationals or len(rationals) > 3 or any(denominator == 0 for _, denominator in rationals):
+        raise _Unsupported("unusual GPS coordinate")
+    degrees, minutes, seconds = ([_round_float(n / d) for n, d in rationals] + [0.0, 0.0])[:3]
+    return degrees + (minutes + seconds / 60) / 60
+
+def _to_dms(value: float, reference: str = "") -> str:
+    """exiftool's default coordinate print format, e.g. 59 deg 26' 13.20\" N."""
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = f"{(value - degrees - minutes / 60) * 3600:.2f}"
+    if seconds == "60.00":
+        seconds, minutes = "0.00", minutes + 1
+        if minutes == 60:
+            minutes, degrees = 0, degrees + 1
+    return f"{degrees} deg {minutes}' {seconds}\"" + (f" {reference}" if reference else "")
+
+def _exiftool_groups(ifd0: Dict[str, Any], exif_ifd: Dict[str, Any], gps_ifd: Dict[str, Any],
+                     has_xmp_gps: bool) -> Dict[str, Any]:
+    """The decoded tags in the shape of exiftool -json -g1 output."""
+    metadata: Dict[str, Any] = {}
+    ifd0_values = {name: value for name, value in ifd0.items() if isinstance(value, str)}
+    for name in ("Make", "Model"):
+        # exiftool removes trailing blanks from the camera make and model
+        if name in ifd0_values:
+            ifd0_values[name] = ifd0_values[name].rstrip()
+    if ifd0_values:
+        metadata["IFD0"] = ifd0_values
+    exif_values = {name: value for name, value in exif_ifd.items() if isinstance(value, str)}
+    if exif_values:
+        metadata["ExifIFD"] = exif_values
+
+    if has_xmp_gps and not gps_ifd:
+        # exiftool would take the position from XMP
+        raise _Unsupported("GPS position only in XMP")
+    gps: Dict[str, Any] = {}
+    coordinates = {}
+    for axis, positive in (("GPSLatitude", "N"), ("GPSLongitude", "E")):
+        value, reference = gps_ifd.get(axis), gps_ifd.get(axis + "Ref")
+        if value is None and reference is None:
+            continue
+        if not isinstance(value, list) or not isinstance(reference, str) \
+                or reference not in _REFERENCES[axis + "Ref"]:
+            raise _Unsupported(f"unusual {axis}")
+        degrees = _to_degrees(value)
+        gps[axis] = _to_dms(degrees)
+        gps[axis + "Ref"] = _REFERENCES[axis + "Ref"][reference]
+        coordinates[axis] = -degrees if reference in ("S", "W") else degrees
+    altitude = gps_ifd.get("GPSAltitude")
+    if isinstance(altitude, list) and len(altitude) == 1:
+        numerator, denominator = altitude[0]
+        if denominator:
+            gps["GPSAltitude"] = f"{numerator / denominator:.10g} m"
+        else:
+            gps["GPSAltitude"] = "inf" if numerator else "undef"
+    if gps:
+        metadata["GPS"] = gps
+    if len(coordinates) == 2:
+        metadata["Composite"] = {"GPSPosition": "{}, {}".format(
+            _to_dms(coordinates["GPSLatitude"], "S" if coordinates["GPSLatitude"] < 0 else "N"),
+            _to_dms(coordinates["GPSLongitude"], "W" if coordinates["GPSLongitude"] < 0 else "E"),
+        )}
+    return metadata
+
+def _parse_jpeg(buf) -> Dict[str, Any]:
+    """Tags of the first Exif APP1 segment, reading segments up to the image data."""
+    position, end = 2, len(buf)
+    exif: Optional[Tuple[int, int]] = None
+    has_xmp_gps = False
+    while True:
+        _require(buf, position + 4, end)
+        prefix, marker, length = _JPEG_SEGMENT.unpack_from(buf, position)
+        if prefix != 0xFF:
+            raise _Unsupported("corrupt JPEG segment")
+        if marker == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if marker == 0xDA or marker == 0xD9:
+            # Start of scan: the headers are done
+            break
+        segment_start, segment_end = position + 4, position + 2 + length
+        if length < 2:
+            raise _Unsupported("corrupt JPEG segment")
+        _require(buf, segment_end, end)
+        if marker == 0xE1:
+            if exif is None and buf[segment_start:segment_start + 5] == _EXIF_HEADER:
+                exif = (segment_start + 6, segment_end)
+            elif buf[segment_start:segment_start + len(_XMP_HEADER)] == _XMP_HEADER:
+                has_xmp_gps = has_xmp_gps or buf.find(b"GPSLatitude", segment_start, segment_end) != -1
+        position = segment_end
+    tags = _tiff_tags(buf, *exif) if exif else ({}, {}, {})
+    return _exiftool_groups(*tags, has_xmp_gps)
+
+def _boxes(buf, start: int, end: int):
+    """
+    (type, content start, box end) of the ISO base media boxes in buf[start:end].
+
+    Boxes may end after the data; callers check the boxes whose content they read.
+    """
+    position = start
+    while position + 8 <= min(end, len(buf)):
+        size, box_type = _BOX_HEADER.unpack_from(buf, position)
+        header = 8
+        if size == 1:
+            _require(buf, position + 16, end)
+            size = _U64_BE.unpack_from(buf, position + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            raise _Unsupported("corrupt box")
+        yield box_type, position + header, position + size
+        position += size
+
+def _uint(buf, position: int, size: int) -> int:
+    """Big-endian unsigned integer of 0, 4 or 8 bytes."""
+    if size == 0:
+        return 0
+    if size == 4:
+        return _U32_BE.unpack_from(buf, position)[0]
+    if size == 8:
+        return _U64_BE.unpack_from(buf, position)[0]
+    raise _Unsupported("unusual iloc field size")
+
+def _heif_exif_item(buf, meta_start: int, meta_end: int) -> Optional[Tuple[int, int]]:
+    """File range of the Exif item of a HEIF meta box, if any."""
+    _require(buf, meta_end, len(buf))
+    children = {box_type: (start, end) for box_type, start, end in _boxes(buf, meta_start + 4, meta_end)}
+    if b"iinf" not in children or b"iloc" not in children:
+        return None
+
+    # Item ID of the Exif item
+    start, end = children[b"iinf"]
+    version = buf[start]
+    entries_start = start + 4 + (2 if version == 0 else 4)
+    exif_id = None
+    for box_type, infe_start, _ in _boxes(buf, entries_start, end):
+        if box_type != b"infe" or buf[infe_start] < 2:
+            continue
+        if buf[infe_start] == 2:
+            item_id, item_type = _U16_BE.unpack_from(buf, infe_start + 4)[0], buf[infe_start + 8:infe_start + 12]
+        else:
+            item_id, item_type = _U32_BE.unpack_from(buf, infe_start + 4)[0], buf[infe_start + 10:infe_start + 14]
+        if item_type == b"Exif":
+            exif_id = item_id
+            break
+    if exif_id is None:
+        return None
+
+    # Location of that item
+    start, end = children[b"iloc"]
+    version = buf[start]
+    offset_size, length_size = buf[start + 4] >> 4, buf[start + 4] & 0x0F
+    base_offset_size, index_size = buf[start + 5] >> 4, buf[start + 5] & 0x0F
+    if version not in (1, 2):
+        index_size = 0
+    position = start + 6
+    item_count = _U16_BE.unpack_from(buf, position)[0] if version < 2 else _U32_BE.unpack_from(buf, position)[0]
+    position += 2 if version < 2 else 4
+    for _ in range(item_count):
+        if version < 2:
+            item_id = _U16_BE.unpack_from(buf, position)[0]
+            position += 2
+        else:
+            item_id = _U32_BE.unpack_from(buf, position)[0]
+            position += 4
+        construction_method = 0
+        if version in (1, 2):
+            construction_method = _U16_BE.unpack_from(buf, position)[0] & 0x0F
+            position += 2
+        position += 2  # data_reference_index
+        base_offset = _uint(buf, position, base_offset_size)
+        position += base_offset_size
+        extent_count = _U16_BE.unpack_from(buf, position)[0]
+        position += 2
+        extents = []
+        for _ in range(extent_count):
+            position += index_size
+            extents.append((_uint(buf, position, offset_size), _uint(buf, position + offset_size, length_size)))
+            position += offset_size + length_size
+        if item_id == exif_id:
+            if construction_method != 0 or len(extents) != 1:
+                raise _Unsupported("Exif item not stored as one file extent")
+            offset, length = extents[0]
+            return base_offset + offset, base_offset + offset + length
+    return None
+
+def _parse_heif(buf, complete: bool) -> Dict[str, Any]:
+    """Tags of the Exif item of a HEIF file."""
+    exif = None
+    for box_type, start, end in _boxes(buf, 0, len(buf) if complete else 1 << 62):
+        if box_type == b"meta":
+            exif = _heif_exif_item(buf, start, end)
+            break
+    else:
+        if not complete:
+            # The meta box may come after the data
+            raise _Truncated(len(buf) + 8)
+    if exif is None:
+        return _exiftool_groups({}, {}, {}, False)
+    start, end = exif
+    _require(buf, end, len(buf))
+    if start + 4 > end:
+        raise _Unsupported("Exif item too short")
+    # The item starts with the offset of the TIFF header (after an optional Exif\0\0)
+    tiff_start = start + 4 + _U32_BE.unpack_from(buf, start)[0]
+    return _exiftool_groups(*_tiff_tags(buf, tiff_start, end), False)
+
+def _is_heif(buf) -> bool:
+    """Whether the file starts with a ftyp box naming a HEIF brand."""
+    if len(buf) < 16 or buf[4:8] != b"ftyp":
+        return False
+    size = min(_U32_BE.unpack_from(buf, 0)[0], len(buf))
+    brands = [buf[8:12]] + [buf[i:i + 4] for i in range(16, size - 3, 4)]
+    return any(brand in HEIF_BRANDS for brand in brands)
+
+def _parse(buf, file_name: str, complete: bool) -> Optional[Dict[str, Any]]:
+    """Tags of an image in buf, or None for formats read with exiftool."""
+    if len(buf) < 16:
+        if complete:
+            return None
+        raise _Truncated(16)
+    if buf[:2] == b"\xff\xd8":
+        return _parse_jpeg(buf)
+    if _is_heif(buf):
+        return _parse_heif(buf, complete)
+    if buf[:4] in (b"II*\0", b"MM\0*") and os.path.splitext(file_name)[1].lower() in TIFF_EXTENSIONS:
+        return _exiftool_groups(*_tiff_tags(buf, 0, len(buf)), False)
+    return None
+
+def parse_header(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the stored EXIF tags of an image without exiftool.
+
+    Args:
+        file_path: Path to the image file
+
+    Returns:
+        The tags in exiftool's -json -g1 shape (only the groups and tags
+        exif_reader uses), or None if the file has to be read with exiftool
+    """
+    try:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < 16:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return _parse(buf, file_path, complete=True)
+    except (_Unsupported, OSError, ValueError, IndexError, struct.error):
+        return None
+
+def parse_bytes(data: bytes, file_name: str = "", complete: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Read the stored EXIF tags of an image held in memory.
+
+    Args:
+        data: The file content, or its leading bytes if complete is False
+        file_name: Original file name (TIFF files are recognized by the extension)
+        complete: Whether data is the whole file
+
+    Returns:
+        The tags in exiftool's -json -g1 shape, or None if the file has to
+        be read with exiftool
+
+    Raises:
+        PrefixTooShort: If complete is False and the header continues after
+            the data; required_bytes is a lower bound of the bytes needed
+    """
+    try:
+        return _parse(data, file_name, complete)
+    except _Truncated as e:
+        if complete:
+            return None
+        raise PrefixTooShort(e.required_bytes)
+    except (_Unsupported, ValueError, IndexError, struct.error):
+        return None
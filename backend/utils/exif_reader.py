@@ -1,6 +1,8 @@
 """
 Utility module for reading EXIF metadata from images.
-Uses the exiftool command-line utility to extract image metadata.
+JPEG, HEIF and TIFF headers are parsed in-process (see utils.exif_parser);
+other files are read with the exiftool command-line utility, through a
+pool of long-lived exiftool processes (see utils.exiftool_pool).
 """
 import subprocess
 import json
@@ -8,8 +10,13 @@ import re
 import logging
 import shutil
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.date_utils import parse_photo_date
+from utils.exif_parser import PrefixTooShort, parse_bytes, parse_header
+from utils.exiftool_pool import EXIFTOOL_TIMEOUT, ExifToolError, get_pool
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +50,14 @@ def check_exiftool_installed() -> bool:
 # Check at module load time if exiftool is available
 EXIFTOOL_AVAILABLE = check_exiftool_installed()
 
+# Parse JPEG, HEIF and TIFF headers in-process instead of running exiftool.
+# Off by default until benchmarks.exif_benchmark has matched exiftool on a
+# corpus of real camera files.
+EXIF_NATIVE_PARSER = os.getenv("EXIF_NATIVE_PARSER", "false").lower() == "true"
+
+# Files read by one exiftool command in get_images_metadata
+EXIFTOOL_BATCH_SIZE = int(os.getenv("EXIFTOOL_BATCH_SIZE", "50"))
+
 def run_exiftool(file_path: str) -> Dict[str, Any]:
     """
     Run exiftool on an image file and return the metadata as a dictionary.
@@ -62,14 +77,14 @@ def run_exiftool(file_path: str) -> Dict[str, Any]:
         return {}
     
     try:
-        # Run exiftool to get JSON output
+        # Run exiftool in a pooled process to get JSON output
         logger.info(f"Running exiftool on file: {file_path}")
-        cmd = ["exiftool", "-json", "-a", "-u", "-g1", file_path]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        args = ["-json", "-a", "-u", "-g1", "-charset", "filename=utf8", file_path]
+        stdout, stderr = get_pool().execute(args)
         
-        if result.stdout:
+        if stdout:
             try:
-                metadata = json.loads(result.stdout)[0]  # exiftool returns a list with one item
+                metadata = json.loads(stdout)[0]  # exiftool returns a list with one item
                 logger.info(f"Metadata successfully extracted from {file_path}")
                 
                 # Debug log to see what GPS data was found
@@ -82,15 +97,15 @@ def run_exiftool(file_path: str) -> Dict[str, Any]:
                 return metadata
             except (json.JSONDecodeError, IndexError) as e:
                 logger.error(f"Error parsing exiftool output: {e}")
-                logger.error(f"Raw output: {result.stdout[:200]}...")
+                logger.error(f"Raw output: {stdout[:200]}...")
                 return {}
         else:
             logger.warning(f"No output from exiftool for file: {file_path}")
+            if stderr:
+                logger.error(f"Error details: {stderr.strip()}")
             return {}
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error running exiftool (return code {e.returncode}): {e}")
-        if e.stderr:
-            logger.error(f"Error details: {e.stderr}")
+    except (ExifToolError, OSError) as e:
+        logger.error(f"Error running exiftool: {e}")
         return {}
     except Exception as e:
         logger.error(f"Unexpected error processing file {file_path}: {e}")
@@ -203,41 +218,102 @@ def extract_gps_coordinates(metadata: Dict[str, Any]) -> Tuple[Optional[float],
     
     return latitude, longitude, altitude
 
-def get_image_metadata(file_path: str) -> Dict[str, Any]:
+def read_header(file_path: str) -> Optional[Dict[str, Any]]:
     """
-    Get important metadata from an image file.
+    Read metadata with the in-process header parser.
     
     Args:
         file_path: Path to the image file
         
     Returns:
-        Dictionary containing extracted metadata
+        Metadata in the shape of run_exiftool output (only the tags used by
+        get_image_metadata), or None if the file must be read with exiftool
     """
-    metadata = run_exiftool(file_path)
-    if not metadata:
+    if not EXIF_NATIVE_PARSER:
+        return None
+    return parse_header(file_path)
+
+def get_prefix_metadata(data: bytes, file_name: str = "", complete: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Get important metadata from an image held in memory, e.g. the leading
+    bytes of a file that is not uploaded yet.
+    
+    Args:
+        data: The file content, or its leading bytes if complete is False
+        file_name: Original file name
+        complete: Whether data is the whole file
+        
+    Returns:
+        Dictionary containing extracted metadata (same keys as get_image_metadata),
+        or None if the format can only be read with exiftool from a file
+        
+    Raises:
+        PrefixTooShort: If complete is False and the data ends inside the header
+    """
+    if not EXIF_NATIVE_PARSER:
+        return None
+    metadata = parse_bytes(data, file_name, complete)
+    return None if metadata is None else _normalize_metadata(metadata)
+
+def run_exiftool_batch(file_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Run exiftool once on several image files.
+    
+    Args:
+        file_paths: Paths to the image files
+        
+    Returns:
+        Dictionary of metadata by file path; files that could not be read are missing
+    """
+    if not EXIFTOOL_AVAILABLE or not file_paths:
         return {}
     
+    # exiftool reports each file as SourceFile, with forward slashes on Windows
+    by_source = {}
+    for path in file_paths:
+        by_source[path] = path
+        by_source[path.replace("\\", "/")] = path
+    
+    try:
+        args = ["-json", "-a", "-u", "-g1", "-charset", "filename=utf8", *file_paths]
+        stdout, stderr = get_pool().execute(args, timeout=EXIFTOOL_TIMEOUT * len(file_paths))
+    except (ExifToolError, OSError) as e:
+        logger.error(f"Error running exiftool on {len(file_paths)} files: {e}")
+        return {}
+    if stderr.strip():
+        logger.warning(f"exiftool reported errors: {stderr.strip()}")
+    if not stdout:
+        return {}
+    try:
+        items = json.loads(stdout)
+    except json.JSONDecodeError as e:
+        logger.error(f"Error parsing exiftool output: {e}")
+        return {}
+    return {by_source[item["SourceFile"]]: item for item in items if item.get("SourceFile") in by_source}
+
+def _normalize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Important fields of exiftool output (-g1 groups) under the keys used by the photo records."""
     result = {}
     
-    # Extract date from various possible fields
-    if 'ExifIFD' in metadata and 'DateTimeOriginal' in metadata['ExifIFD']:
-        date_str = metadata['ExifIFD']['DateTimeOriginal']
-        date_match = re.match(r'(\d{4}):(\d{2}):(\d{2})', date_str)
-        if date_match:
-            year, month, day = date_match.groups()
-            result['date'] = f"{year}-{month}-{day}"
-    elif 'ExifIFD' in metadata and 'CreateDate' in metadata['ExifIFD']:
-        date_str = metadata['ExifIFD']['CreateDate']
-        date_match = re.match(r'(\d{4}):(\d{2}):(\d{2})', date_str)
-        if date_match:
-            year, month, day = date_match.groups()
-            result['date'] = f"{year}-{month}-{day}"
-    elif 'IFD0' in metadata and 'ModifyDate' in metadata['IFD0']:
-        date_str = metadata['IFD0']['ModifyDate']
+    # Extract date from various possible fields, together with the matching
+    # UTC offset tag for the full capture timestamp
+    exif_ifd = metadata.get('ExifIFD', {})
+    date_sources = [
+        (exif_ifd.get('DateTimeOriginal'), exif_ifd.get('OffsetTimeOriginal')),
+        (exif_ifd.get('CreateDate'), exif_ifd.get('OffsetTimeDigitized')),
+        (metadata.get('IFD0', {}).get('ModifyDate'), exif_ifd.get('OffsetTime'))
+    ]
+    for date_str, offset_str in date_sources:
+        if not date_str:
+            continue
         date_match = re.match(r'(\d{4}):(\d{2}):(\d{2})', date_str)
         if date_match:
             year, month, day = date_match.groups()
             result['date'] = f"{year}-{month}-{day}"
+            taken_at = parse_photo_date(date_str, offset_str)
+            if taken_at:
+                result['taken_at'] = taken_at.isoformat()
+        break
     
     # Extract GPS coordinates from GPS section
     if 'GPS' in metadata:
@@ -293,6 +369,62 @@ def get_image_metadata(file_path: str) -> Dict[str, Any]:
         if 'Model' in metadata['IFD0']:
             result['camera_model'] = metadata['IFD0']['Model']
     
+    return result
+
+def get_image_metadata(file_path: str) -> Dict[str, Any]:
+    """
+    Get important metadata from an image file.
+    
+    Args:
+        file_path: Path to the image file
+        
+    Returns:
+        Dictionary containing extracted metadata
+    """
+    metadata = read_header(file_path)
+    if metadata is None:
+        metadata = run_exiftool(file_path)
+    if not metadata:
+        return {}
+    
+    result = _normalize_metadata(metadata)
     logger.info(f"Extracted metadata from {file_path}: {result}")
     
-    return result
\ No newline at end of file
+    return result
+
+def get_images_metadata(file_paths: List[str], chunk_size: int = EXIFTOOL_BATCH_SIZE) -> Dict[str, Dict[str, Any]]:
+    """
+    Get important metadata from many image files.
+    
+    Headers of supported formats are parsed in-process; the other files are
+    read in chunks of chunk_size files per exiftool command, and the chunks
+    run in parallel on the processes of the exiftool pool.
+    
+    Args:
+        file_paths: Paths to the image files
+        chunk_size: Files per exiftool command
+        
+    Returns:
+        Dictionary of metadata by file path, with the same keys as
+        get_image_metadata; files without readable metadata map to {}
+    """
+    paths = list(dict.fromkeys(file_paths))
+    results = {}
+    exiftool_paths = []
+    for path in paths:
+        metadata = read_header(path)
+        if metadata is None:
+            exiftool_paths.append(path)
+        else:
+            results[path] = _normalize_metadata(metadata)
+    
+    chunks = [exiftool_paths[i:i + chunk_size] for i in range(0, len(exiftool_paths), chunk_size)]
+    if chunks:
+        with ThreadPoolExecutor(max_workers=min(len(chunks), get_pool().size)) as executor:
+            for chunk, raw_by_path in zip(chunks, executor.map(run_exiftool_batch, chunks)):
+                for path in chunk:
+                    results[path] = _normalize_metadata(raw_by_path[path]) if path in raw_by_path else {}
+    if paths:
+        logger.info(f"Extracted metadata from {len(paths)} files ({len(exiftool_paths)} with exiftool, "
+                    f"{sum(1 for metadata in results.values() if metadata)} with metadata)")
+    return {path: results[path] for path in paths}
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+Utility module keeping a pool of long-lived exiftool processes.
+
+Starting exiftool (a Perl program) takes most of the time of reading one
+image's metadata, so instead of a process per file the pool keeps up to
+EXIFTOOL_POOL_SIZE processes running in -stay_open mode. Each request is
+written to the process's argument file (stdin), terminated with
+-execute<N>, and its output is read up to the {ready<N>} marker that
+exiftool prints when the request is done; -echo4 frames stderr the same way.
+
+Requests that exceed EXIFTOOL_TIMEOUT seconds kill their process, and a
+process that exits or crashes is replaced on the next request.
+"""
+import atexit
+import itertools
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXIFTOOL_POOL_SIZE = int(os.getenv("EXIFTOOL_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+EXIFTOOL_TIMEOUT = float(os.getenv("EXIFTOOL_TIMEOUT", "30"))
+
+class ExifToolError(Exception):
+    """exiftool could not process a request (timeout, crash or unusable arguments)."""
+
+class _Stream:
+    """Reads one pipe of an exiftool process in a thread and splits it at the ready markers."""
+
+    def __init__(self, pipe, name: str):
+        self._pipe = pipe
+        self._chunks: "queue.Queue[Optional[Tuple[int, bytes]]]" = queue.Queue()
+        threading.Thread(target=self._read, name=name, daemon=True).start()
+
+    def _read(self) -> None:
+        lines = []
+        try:
+            for line in iter(self._pipe.readline, b""):
+                stripped = line.rstrip(b"\r\n")
+                if stripped.startswith(b"{ready") and stripped.endswith(b"}"):
+                    self._chunks.put((int(stripped[6:-1] or 0), b"".join(lines)))
+                    lines = []
+                else:
+                    lines.append(line)
+        except (OSError, ValueError):
+            pass
+        # End of stream: the process has exited
+        self._chunks.put(None)
+
+    def next_chunk(self, deadline: float) -> Tuple[int, bytes]:
+        """Output of the next request; raises ExifToolError on timeout or exit."""
+        try:
+            chunk = self._chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise ExifToolError("exiftool did not answer in time")
+        if chunk is None:
+            self._chunks.put(None)
+            raise ExifToolError("exiftool exited unexpectedly")
+        return chunk
+
+class ExifToolProcess:
+    """One exiftool process in -stay_open mode; not thread safe, the pool hands it to one caller at a time."""
+
+    def __init__(self, executable: str = "exiftool"):
+        self._process = subprocess.Popen(
+            [executable, "-stay_open", "True", "-@", "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self._stdout = _Stream(self._process.stdout, "exiftool-stdout")
+        self._stderr = _Stream(self._process.stderr, "exiftool-stderr")
+        self._sequence = itertools.count(1)
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def execute(self, args: List[str], timeout: float = EXIFTOOL_TIMEOUT) -> Tuple[str, str]:
+        """
+        Run one exiftool command in this process.
+
+        Args:
+            args: Command line arguments, e.g. ["-json", "-g1", path]
+            timeout: Seconds to wait for the answer
+
+        Returns:
+            Tuple of stdout and stderr text
+
+        Raises:
+            ExifToolError: If an argument contains a newline, or the process timed out or exited
+        """
+        if any("\n" in arg or "\r" in arg for arg in args):
+            raise ExifToolError("exiftool arguments must not contain line breaks")
+        number = next(self._sequence)
+        request = "\n".join([*args, "-echo4", f"{{ready{number}}}", f"-execute{number}", ""])
+        deadline = time.monotonic() + timeout
+        try:
+            self._process.stdin.write(request.encode("utf-8"))
+            self._process.stdin.flush()
+            stdout = self._read(self._stdout, number, deadline)
+            stderr = self._read(self._stderr, number, deadline)
+        except (OSError, ExifToolError) as e:
+            self.kill()
+            raise ExifToolError(str(e)) from e
+        return stdout.decode("utf-8", errors="replace"), stderr.decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _read(stream: _Stream, number: int, deadline: float) -> bytes:
+        while True:
+            chunk_number, data = stream.next_chunk(deadline)
+            # Never return another request's output
+            if chunk_number == number:
+                return data
+
+    def close(self, timeout: float = 5) -> None:
+        """Ask exiftool to exit, killing it if it does not."""
+        if not self.alive:
+            return
+        try:
+            self._process.stdin.write(b"-stay_open\nFalse\n")
+            self._process.stdin.flush()
+            self._process.stdin.close()
+            self._process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self) -> None:
+        if self.alive:
+            self._process.kill()
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+
+class ExifToolPool:
+    """
+    Bounded pool of exiftool processes.
+
+    Processes are started on demand up to size; a caller waits while all of
+    them are busy. Dead processes are dropped and replaced when next needed.
+    """
+
+    def __init__(self, size: int = EXIFTOOL_POOL_SIZE, timeout: float = EXIFTOOL_TIMEOUT,
+                 executable: str = "exiftool"):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.executable = executable
+        self._idle: "queue.LifoQueue[ExifToolProcess]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._processes: List[ExifToolProcess] = []
+        self._started = self._replaced = self._requests = self._failed = 0
+
+    def _acquire(self) -> ExifToolProcess:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    process = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if process.alive:
+                    return process
+                self._forget(process)
+                with self._lock:
+                    self._replaced += 1
+            process = ExifToolProcess(self.executable)
+            with self._lock:
+                self._processes.append(process)
+                self._started += 1
+            return process
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, process: ExifToolProcess) -> None:
+        if process.alive:
+            self._idle.put(process)
+        else:
+            self._forget(process)
+            with self._lock:
+                self._replaced += 1
+        self._slots.release()
+
+    def _forget(self, process: ExifToolProcess) -> None:
+        with self._lock:
+            if process in self._processes:
+                self._processes.remove(process)
+
+    def execute(self, args: List[str], timeout: Optional[float] = None) -> Tuple[str, str]:
+        """
+        Run one exiftool command in a pooled process.
+
+        Args:
+            args: Command line arguments, e.g. ["-json", "-g1", path]
+            timeout: Seconds to wait for the answer (default: the pool's timeout)
+
+        Returns:
+            Tuple of stdout and stderr text
+
+        Raises:
+            ExifToolError: If the request timed out, the process crashed or the arguments are unusable
+            OSError: If exiftool cannot be started
+        """
+        process = self._acquire()
+        try:
+            with self._lock:
+                self._requests += 1
+            return process.execute(args, self.timeout if timeout is None else timeout)
+        except ExifToolError:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            self._release(process)
+
+    def close(self) -> None:
+        """Stop all idle processes; busy ones are stopped when they are returned."""
+        while True:
+            try:
+                process = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            process.close()
+            self._forget(process)
+
+    def stats(self) -> dict:
+        """Pool size, running processes and request counters."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "running": sum(1 for process in self._processes if process.alive),
+                "started": self._started,
+                "replaced": self._replaced,
+                "requests": self._requests,
+                "failed": self._failed,
+            }
+
+_pool: Optional[ExifToolPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ExifToolPool:
+    """The process-wide exiftool pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExifToolPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,136 @@
+"""
+Utility module for the content-addressed photo file storage.
+Uploaded files are stored under the SHA-256 hash of their content, fanned out
+into two levels of subdirectories (blobs/ab/cd/abcd....jpg), so identical
+uploads share one file and no single directory holds the whole collection.
+
+The hash is computed in a first pass over the upload, which FastAPI has
+already spooled to memory or a temporary file; the file is only written when
+no blob with that hash exists yet (under any extension), so a repeated upload
+writes no bytes.
+"""
+import hashlib
+import os
+import re
+import shutil
+from typing import BinaryIO, NamedTuple, Optional
+
+# Read and write size for hashing and copying
+CHUNK_SIZE = 1024 * 1024
+
+FILE_STORAGE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "file_storage")
+BLOBS_DIR = "blobs"
+
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+class StoredFile(NamedTuple):
+    """A file in the storage."""
+    content_hash: str
+    path: str
+    # Whether this call wrote the file (False: an identical file was already stored)
+    created: bool
+
+def file_extension(filename: str) -> str:
+    """Lower-case extension of an uploaded file name, or "" if it is missing or unusual."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION_RE.match(extension) else ""
+
+def hash_stream(fileobj: BinaryIO) -> str:
+    """
+    SHA-256 of a seekable file object's content.
+
+    Reads from the current position to the end and seeks back, so the
+    content can be read again.
+
+    Returns:
+        Hex digest
+    """
+    start = fileobj.tell()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    fileobj.seek(start)
+    return digest.hexdigest()
+
+def blob_path(content_hash: str, extension: str = "", storage_path: str = FILE_STORAGE_PATH) -> str:
+    """Path of the blob with the given hash."""
+    return os.path.join(storage_path, BLOBS_DIR, content_hash[:2], content_hash[2:4], content_hash + extension)
+
+def find_blob(content_hash: str, storage_path: str = FILE_STORAGE_PATH) -> Optional[str]:
+    """
+    Path of a stored blob with the given hash, whatever its extension.
+
+    Returns:
+        The path, or None if no blob with this hash is stored
+    """
+    directory = os.path.dirname(blob_path(content_hash, "", storage_path))
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return None
+    for name in sorted(names):
+        # Temporary and discarded files have further suffixes and never match
+        if name.startswith(content_hash) and (name == content_hash or _EXTENSION_RE.match(name[len(content_hash):])):
+            return os.path.join(directory, name)
+    return None
+
+def _write_blob(fileobj: BinaryIO, path: str) -> None:
+    """Copy fileobj from its start to path."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fileobj.seek(0)
+    # Write next to the final path and rename, so concurrent uploads never see a partial file
+    temp_path = f"{path}.{os.getpid()}.{id(fileobj)}.tmp"
+    try:
+        with open(temp_path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        fileobj.seek(0)
+
+def save_upload(fileobj: BinaryIO, filename: str, storage_path: str = FILE_STORAGE_PATH) -> StoredFile:
+    """
+    Store an uploaded file under its content hash.
+
+    The extension of the first upload is kept; uploading the same content
+    under another name or extension returns the blob already stored.
+
+    Args:
+        fileobj: Seekable file object positioned at the start of the content
+        filename: Original file name, for the extension
+        storage_path: File storage root
+
+    Returns:
+        The stored file; created is False if the same content was already stored
+    """
+    content_hash = hash_stream(fileobj)
+    existing = find_blob(content_hash, storage_path)
+    if existing is not None:
+        return StoredFile(content_hash, existing, False)
+    path = blob_path(content_hash, file_extension(filename), storage_path)
+    _write_blob(fileobj, path)
+    return StoredFile(content_hash, path, True)
+
+def restore_blob(fileobj: BinaryIO, stored: StoredFile) -> bool:
+    """
+    Write a stored file again if it has been removed meanwhile.
+
+    Args:
+        fileobj: Seekable file object with the uploaded content
+        stored: File returned by save_upload for that content
+
+    Returns:
+        Whether the file had to be written
+    """
+    if os.path.exists(stored.path):
+        return False
+    _write_blob(fileobj, stored.path)
+    return True
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a stored file, e.g. for files stored before content addressing."""
+    with open(path, "rb") as f:
+        return hash_stream(f)
@@ -0,0 +1,185 @@
+"""
+Utility module for geospatial photo queries.
+Provides geohash encoding, geohash prefix covers for bounding boxes and
+parsing of the bbox/near query parameters.
+
+Geohash prefixes let a plain b-tree index on photos.geohash answer viewport
+and radius queries without the PostGIS extension.
+"""
+import math
+from typing import List, Optional, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6371008.8
+GEOHASH_PRECISION = 12
+
+# (south, west, north, east) in degrees
+BoundingBox = Tuple[float, float, float, float]
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    Encode a coordinate as a geohash string.
+
+    Args:
+        latitude: Latitude in degrees
+        longitude: Longitude in degrees
+        precision: Number of geohash characters
+
+    Returns:
+        Geohash string
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+def _cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of a geohash cell at the given precision."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def geohash_cover(bbox: BoundingBox, max_cells: int = 32) -> List[str]:
+    """
+    Find geohash prefixes whose cells together cover a bounding box.
+
+    Uses the longest prefix length that needs at most max_cells cells, so each
+    prefix becomes one index range scan.
+
+    Args:
+        bbox: Bounding box (south, west, north, east); west <= east
+        max_cells: Maximum number of prefixes to return
+
+    Returns:
+        Sorted list of geohash prefixes (empty list means the whole world)
+    """
+    south, west, north, east = bbox
+    cover: List[str] = []
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        cell_height, cell_width = _cell_size(precision)
+        rows = math.floor((north + 90) / cell_height) - math.floor((south + 90) / cell_height) + 1
+        cols = math.floor((east + 180) / cell_width) - math.floor((west + 180) / cell_width) + 1
+        if rows * cols > max_cells:
+            break
+        cells = set()
+        for row in range(rows):
+            lat = min(south + row * cell_height, north)
+            for col in range(cols):
+                lon = min(west + col * cell_width, east)
+                cells.add(encode_geohash(lat, lon, precision))
+            cells.add(encode_geohash(lat, east, precision))
+        for col in range(cols):
+            cells.add(encode_geohash(north, min(west + col * cell_width, east), precision))
+        cells.add(encode_geohash(north, east, precision))
+        cover = sorted(cells)
+    return cover
+
+def split_antimeridian(bbox: BoundingBox) -> List[BoundingBox]:
+    """Split a box crossing the 180th meridian (west > east) into two boxes."""
+    south, west, north, east = bbox
+    if west <= east:
+        return [bbox]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+def radius_bbox(latitude: float, longitude: float, radius_m: float) -> List[BoundingBox]:
+    """
+    Bounding boxes enclosing a circle on the earth's surface.
+
+    Args:
+        latitude: Center latitude in degrees
+        longitude: Center longitude in degrees
+        radius_m: Radius in meters
+
+    Returns:
+        One box, or two when the circle crosses the 180th meridian
+    """
+    delta_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    south = max(latitude - delta_lat, -90.0)
+    north = min(latitude + delta_lat, 90.0)
+    if south <= -90.0 or north >= 90.0:
+        # The circle contains a pole, every longitude is in range
+        return [(south, -180.0, north, 180.0)]
+    delta_lon = math.degrees(radius_m / (EARTH_RADIUS_M * math.cos(math.radians(latitude))))
+    if delta_lon >= 180.0:
+        return [(south, -180.0, north, 180.0)]
+    west = longitude - delta_lon
+    east = longitude + delta_lon
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return split_antimeridian((south, west, north, east))
+
+def parse_bbox(value: str) -> BoundingBox:
+    """
+    Parse a bbox parameter in "min_lon,min_lat,max_lon,max_lat" order (as in GeoJSON).
+
+    Args:
+        value: Comma-separated bounding box
+
+    Returns:
+        Bounding box (south, west, north, east)
+
+    Raises:
+        ValueError: If the value is malformed or out of range
+    """
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox peab olema kujul min_lon,min_lat,max_lon,max_lat")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError("bbox koordinaadid on väljaspool lubatud vahemikku")
+    return south, west, north, east
+
+def parse_point(value: str) -> Tuple[float, float]:
+    """
+    Parse a near parameter in "lat,lon" order.
+
+    Args:
+        value: Comma-separated coordinate
+
+    Returns:
+        Tuple (latitude, longitude)
+
+    Raises:
+        ValueError: If the value is malformed or out of range
+    """
+    try:
+        latitude, longitude = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("near peab olema kujul lat,lon")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("near koordinaadid on väljaspool lubatud vahemikku")
+    return latitude, longitude
+
+def optional_geohash(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    """Geohash for a photo's coordinates, or None when either is missing."""
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(latitude, longitude)
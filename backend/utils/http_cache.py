@@ -0,0 +1,73 @@
+"""
+Utility module for HTTP conditional requests.
+Builds strong ETags and answers If-None-Match requests with 304 Not Modified
+before the response body is loaded or serialized.
+"""
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from the values identifying a representation.
+
+    Args:
+        parts: Values such as IDs, versions and update timestamps
+
+    Returns:
+        Quoted ETag value
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Uses the weak comparison required for If-None-Match, so a "W/" prefix
+    added by a proxy still matches.
+
+    Args:
+        if_none_match: Header value, possibly a comma-separated list or "*"
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def query_string_key(request: Request) -> str:
+    """Request query parameters in a canonical order, for listing ETags."""
+    return "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+
+def check_not_modified(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Set the ETag of a response and answer a matching conditional request.
+
+    Args:
+        request: Incoming request
+        response: Response whose headers are used for a full answer
+        etag: Current ETag, or None if the resource does not exist
+
+    Returns:
+        A 304 response if the client's copy is current, otherwise None
+    """
+    if etag is None:
+        return None
+    response.headers["ETag"] = etag
+    # Clients may store the response but must revalidate it before use
+    response.headers["Cache-Control"] = "no-cache"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
@@ -0,0 +1,50 @@
+"""
+Utility module for keyset (cursor) pagination.
+Encodes the sort key of the last row on a page into an opaque cursor string.
+"""
+import base64
+import json
+from typing import Dict, Any
+
+# Supported sort orders for photo listings
+PHOTO_ORDERS = ("id", "date")
+
+def encode_cursor(order: str, values: Dict[str, Any]) -> str:
+    """
+    Encode the sort key of the last returned row into an opaque cursor.
+
+    Args:
+        order: Sort order the cursor belongs to ("id" or "date")
+        values: Sort key values of the last row, e.g. {"id": 42, "date": "2024-05-01"}
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps({"o": order, **values}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, order: str) -> Dict[str, Any]:
+    """
+    Decode a cursor created by encode_cursor.
+
+    Args:
+        cursor: Cursor string from a previous response
+        order: Sort order of the current request
+
+    Returns:
+        Dictionary with the sort key values of the last row of the previous page
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another sort order
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Vigane kursor: {e}")
+
+    if not isinstance(values, dict) or not isinstance(values.get("id"), int):
+        raise ValueError("Vigane kursor")
+    if values.pop("o", None) != order:
+        raise ValueError(f"Kursor ei vasta järjestusele '{order}'")
+    return values
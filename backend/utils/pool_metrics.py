@@ -0,0 +1,117 @@
+"""
+Utility module with connection pool classes that record pool health.
+The pools time how long getting a connection takes (waiting for a free
+connection or opening a new one) and count checkout timeouts, so bursts
+that exhaust the pool are visible in the admin API instead of only as
+"QueuePool limit" errors.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+# Number of recent checkout wait times kept for the percentiles
+WAIT_SAMPLES = 1000
+
+class PoolWaitStats:
+    """Thread-safe counters of connection checkout waits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=WAIT_SAMPLES)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Wait statistics in milliseconds."""
+        with self._lock:
+            recent = sorted(self._recent)
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                "wait_ms_p95": round(recent[int(len(recent) * 0.95) - 1] * 1000, 3) if recent else 0.0,
+                "wait_ms_max": round(self.max_wait * 1000, 3),
+            }
+
+class _TimedPoolMixin:
+    """Times Pool._do_get, which blocks until a connection is available."""
+
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # Keep the statistics when the engine recreates its pool (dispose)
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    """NullPool (e.g. behind PgBouncer): the wait is the connect time."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+def pool_stats(pool: Optional[Pool]) -> Optional[Dict[str, Any]]:
+    """
+    Current state and wait statistics of an engine's pool.
+
+    Args:
+        pool: Pool of an engine (engine.pool), or None
+
+    Returns:
+        Dictionary of pool statistics, or None if there is no pool
+    """
+    if pool is None:
+        return None
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # overflow() is negative while fewer than size connections are open
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(wait_stats.snapshot())
+    return stats
@@ -0,0 +1,73 @@
+"""
+Utility module for read-your-writes consistency with read replicas.
+After a successful write request the client is remembered for a short
+window, during which its reads go to the primary instead of a replica that
+may not have replayed the write yet. Clients are recognized by a cookie,
+which works across worker processes, and by address within this process,
+for clients that do not send cookies (e.g. cross-origin fetch without
+credentials).
+"""
+import math
+from typing import Optional
+
+from starlette.requests import Request
+
+from utils.cache import TTLCache, MISSING
+
+COOKIE_NAME = "db_read_primary"
+# Methods that do not write
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+class ReadYourWrites:
+    """Remembers recently writing clients for a fixed window."""
+
+    def __init__(self, window: float, max_clients: int = 10000):
+        """
+        Initialize the tracker.
+
+        Args:
+            window: Seconds after a write during which the client reads from the primary
+            max_clients: Maximum number of client addresses remembered
+        """
+        self.window = window
+        self._clients = TTLCache(max_entries=max_clients, ttl=window)
+
+    def mark(self, client: Optional[str]) -> None:
+        """Remember a client address as a recent writer."""
+        if client:
+            self._clients.set(client, True)
+
+    def is_recent_writer(self, request: Request) -> bool:
+        """Whether the request comes from a client that wrote within the window."""
+        if request.cookies.get(COOKIE_NAME):
+            return True
+        client = request.client.host if request.client else None
+        return client is not None and self._clients.get(client) is not MISSING
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware marking clients after successful write requests.
+
+    Sets a cookie expiring after the window and remembers the client
+    address before the response reaches the client, so its next read
+    already goes to the primary.
+    """
+
+    def __init__(self, app, tracker: ReadYourWrites):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                client = scope.get("client")
+                self.tracker.mark(client[0] if client else None)
+                cookie = f"{COOKIE_NAME}=1; Max-Age={max(math.ceil(self.tracker.window), 1)}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
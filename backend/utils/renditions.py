@@ -0,0 +1,116 @@
+"""
+Utility module for generating downscaled renditions of photos.
+Every photo gets WebP and JPEG copies in a few sizes, so the gallery can load
+a small image per grid tile instead of the camera original. JPEG originals
+are decoded in draft mode, which lets libjpeg decode directly at 1/2, 1/4 or
+1/8 scale, so a 20 MP original is never fully decoded for a 2048 px preview.
+"""
+import math
+import os
+import shutil
+import logging
+from typing import Dict, Optional
+
+from PIL import ExifTags, Image, ImageOps
+
+from utils.file_storage import FILE_STORAGE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Longest side of each rendition in pixels
+RENDITION_SIZES = tuple(sorted(
+    (int(size) for size in os.getenv("RENDITION_SIZES", "256,1024,2048").split(",")), reverse=True
+))
+# Output formats and their Pillow save options
+RENDITION_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True},
+}
+
+# Renditions live under the static files mount (/static/renditions/...)
+RENDITIONS_DIR = "renditions"
+
+def rendition_dir(file_path: str) -> str:
+    """Directory of a photo's renditions, relative to the file storage."""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return f"{RENDITIONS_DIR}/{stem}"
+
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+def open_scaled(file_path: str, max_width: Optional[int], max_height: Optional[int]) -> Image.Image:
+    """
+    Open an image decoded at the smallest scale still covering a bounding box.
+
+    Args:
+        file_path: Path to the image
+        max_width: Width of the box as displayed (after EXIF rotation), None for no limit
+        max_height: Height of the box as displayed, None for no limit
+
+    Returns:
+        Loaded RGB image with EXIF orientation applied and the ICC profile kept
+    """
+    image = Image.open(file_path)
+    icc_profile = image.info.get("icc_profile")
+    width, height = image.size
+    if image.getexif().get(ExifTags.Base.Orientation) in _TRANSPOSED_ORIENTATIONS:
+        max_width, max_height = max_height, max_width
+    scale = min(max_width / width if max_width else 1, max_height / height if max_height else 1)
+    if scale < 1:
+        # Only JPEG supports draft decoding; other formats ignore the request
+        image.draft("RGB", (math.ceil(width * scale), math.ceil(height * scale)))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if icc_profile:
+        image.info["icc_profile"] = icc_profile
+    return image
+
+def save_image(image: Image.Image, path: str, extension: str) -> None:
+    """Save an image in one of RENDITION_FORMATS, keeping its ICC profile."""
+    image.save(path, icc_profile=image.info.get("icc_profile"), **RENDITION_FORMATS[extension])
+
+def _save_atomic(image: Image.Image, path: str, extension: str) -> None:
+    """Save to a temporary file first, so readers never see a partial image."""
+    temp_path = f"{path}.tmp"
+    save_image(image, temp_path, extension)
+    os.replace(temp_path, path)
+
+def generate_renditions(file_path: str, storage_path: str = FILE_STORAGE_PATH) -> Dict[str, Dict[str, str]]:
+    """
+    Generate all renditions of an image file.
+
+    Sizes are made from the largest down, each from the previous one, so the
+    original is decoded once. Images smaller than a size are not upscaled.
+
+    Args:
+        file_path: Path to the original image
+        storage_path: File storage root (served under /static)
+
+    Returns:
+        Paths relative to the file storage by size and format,
+        e.g. {"256": {"webp": "renditions/<name>/256.webp", "jpeg": ...}, ...}
+
+    Raises:
+        OSError: If the image cannot be read or a rendition cannot be written
+    """
+    relative_dir = rendition_dir(file_path)
+    os.makedirs(os.path.join(storage_path, relative_dir), exist_ok=True)
+
+    image = open_scaled(file_path, RENDITION_SIZES[0], RENDITION_SIZES[0])
+    renditions: Dict[str, Dict[str, str]] = {}
+    for size in RENDITION_SIZES:
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        renditions[str(size)] = {}
+        for extension in RENDITION_FORMATS:
+            relative_path = f"{relative_dir}/{size}.{extension}"
+            _save_atomic(image, os.path.join(storage_path, relative_path), extension)
+            renditions[str(size)][extension] = relative_path
+    return renditions
+
+def delete_renditions(file_path: str, storage_path: str = FILE_STORAGE_PATH) -> None:
+    """Delete the renditions of an image file, if any."""
+    directory = os.path.join(storage_path, rendition_dir(file_path))
+    if os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+        logger.debug(f"Kustutatud renditsioonid: {directory}")
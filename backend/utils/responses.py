@@ -0,0 +1,23 @@
+"""
+Utility module with the application's JSON response class.
+Uses orjson (in requirements.txt), which encodes large lists several times
+faster than the standard library; without it the standard encoder is used
+and a warning is printed at startup.
+"""
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    print("Warning: orjson not found. JSON responses use the slower standard encoder (pip install orjson).")
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson if available."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -207,7 +207,8 @@ const FotodeBrowser = () => {
           gps_longitude: data.gps_longitude,
           gps_altitude: data.gps_altitude,
           camera_make: data.camera_make,
-          camera_model: data.camera_model
+          camera_model: data.camera_model,
+          renditions: data.renditions
         },
         species: data.species || []
       });
@@ -221,12 +222,25 @@ const FotodeBrowser = () => {
     setSelectedPhoto(null);
   };
 
+  // Tee failihoidla juurkausta suhtes (uued failid on alamkaustades blobs/ab/cd/)
   const getRelativeFilePath = (absolutePath) => {
     if (!absolutePath) return '';
+    const marker = 'file_storage/';
+    const index = absolutePath.lastIndexOf(marker);
+    if (index !== -1) return absolutePath.slice(index + marker.length);
     const parts = absolutePath.split('/');
     return parts[parts.length - 1];
   };
 
+  // Eelvaate URL (renditions[size][format]); kui eelvaadet veel pole, siis originaalfail
+  const getImageUrl = (photo, size, format = 'jpeg') => {
+    const rendition = photo.renditions && photo.renditions[size];
+    if (rendition && rendition[format]) {
+      return `${STATIC_FILE_URL}/${rendition[format]}`;
+    }
+    return `${STATIC_FILE_URL}/${getRelativeFilePath(photo.file_path)}`;
+  };
+
   const handleAIIdentify = async () => {
     if (!selectedPhoto || !selectedPhoto.photo || !selectedPhoto.photo.id) return;
     
@@ -667,12 +681,16 @@ const FotodeBrowser = () => {
                 className="photo-card"
                 onClick={() => handlePhotoClick(photo.id)}
               >
-                <img 
-                  src={`${STATIC_FILE_URL}/${getRelativeFilePath(photo.file_path)}`} 
-                  alt="Looduspilt" 
-                  className="photo-thumbnail"
-                  onError={(e) => {e.target.src = '/placeholder.jpg'}}
-                />
+                <picture>
+                  <source srcSet={getImageUrl(photo, '256', 'webp')} type="image/webp" />
+                  <img 
+                    src={getImageUrl(photo, '256')} 
+                    alt="Looduspilt" 
+                    className="photo-thumbnail"
+                    loading="lazy"
+                    onError={(e) => {e.target.src = '/placeholder.jpg'}}
+                  />
+                </picture>
                 <div className="photo-info">
                   <p className="photo-date">{photo.date || 'Kuupäev puudub'}</p>
                   <p className="photo-location">{photo.location || 'Asukoht puudub'}</p>
@@ -705,11 +723,14 @@ const FotodeBrowser = () => {
             
             <div className="detail-content">
               <div className="detail-image">
-                <img 
-                  src={`${STATIC_FILE_URL}/${getRelativeFilePath(selectedPhoto.photo.file_path)}`} 
-                  alt="Looduspilt"
-                  onError={(e) => {e.target.src = '/placeholder.jpg'}} 
-                />
+                <picture>
+                  <source srcSet={getImageUrl(selectedPhoto.photo, '2048', 'webp')} type="image/webp" />
+                  <img 
+                    src={getImageUrl(selectedPhoto.photo, '2048')} 
+                    alt="Looduspilt"
+                    onError={(e) => {e.target.src = '/placeholder.jpg'}} 
+                  />
+                </picture>
                 
                 <div className="image-actions">
                   <button 
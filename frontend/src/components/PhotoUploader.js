@@ -2,6 +2,9 @@ import React, { useState, useEffect } from 'react';
 import './PhotoUploader.css';
 import { API_BASE_URL, API_ENDPOINTS } from '../config/config';
 
+// Metaandmete eelvaate jaoks saadetav faili algus (JPEG/HEIF päis mahub tavaliselt sinna)
+const METADATA_PREFIX_BYTES = 128 * 1024;
+
 /**
  * Lihtsate piltide üleslaadimise komponent.
  * Võimaldab laadida üles pilte ilma AI tuvastuseta.
@@ -34,18 +37,31 @@ const PhotoUploader = () => {
   };
 
   /**
-   * Loeb pildi metaandmeid, saates selle ajutisele API otspunktile
+   * Saadab metaandmete lugemiseks faili esimesed prefixSize baiti
+   */
+  const postMetadataPrefix = (file, prefixSize) => {
+    const formData = new FormData();
+    formData.append('file', file.slice(0, prefixSize), file.name);
+    formData.append('file_size', file.size);
+    return fetch(`${API_BASE_URL}${API_ENDPOINTS.PHOTOS}/extract-metadata`, {
+      method: 'POST',
+      body: formData,
+    });
+  };
+
+  /**
+   * Loeb pildi metaandmeid, saates API otspunktile ainult faili alguse (päise)
    */
   const fetchImageMetadata = async (file) => {
     try {
-      const formData = new FormData();
-      formData.append('file', file);
+      let response = await postMetadataPrefix(file, METADATA_PREFIX_BYTES);
 
-      // Saada fail serverile, et lugeda metaandmeid
-      const response = await fetch(`${API_BASE_URL}${API_ENDPOINTS.PHOTOS}/extract-metadata`, {
-        method: 'POST',
-        body: formData,
-      });
+      // Kui päis on pikem, saada üks kord nii palju, kui server vähemalt vajab
+      if (response.status === 422) {
+        const { detail } = await response.json();
+        const required = detail && detail.required_bytes ? detail.required_bytes : file.size;
+        response = await postMetadataPrefix(file, Math.max(required, METADATA_PREFIX_BYTES * 2));
+      }
 
       if (!response.ok) {
         throw new Error('Metaandmete lugemine ebaõnnestus');
@@ -123,8 +139,13 @@ const PhotoUploader = () => {
       }
     }
 
+    // Server kasutab eelvaate jaoks loetud metaandmeid uuesti, kui token sobib failiga
+    const uploadUrl = metaData && metaData.metadata_token
+      ? `${API_BASE_URL}${API_ENDPOINTS.UPLOAD}?metadata_token=${encodeURIComponent(metaData.metadata_token)}`
+      : `${API_BASE_URL}${API_ENDPOINTS.UPLOAD}`;
+
     try {
-      const response = await fetch(`${API_BASE_URL}${API_ENDPOINTS.UPLOAD}`, {
+      const response = await fetch(uploadUrl, {
         method: 'POST',
         body: formData,
       });